@@ -0,0 +1 @@
+# حزمة قياس الأداء دون اتصال (تعيد تشغيل بيانات مسجلة بدل الاتصال بـ Yahoo)
@@ -0,0 +1,224 @@
+"""
+bench.py
+--------
+قياس زمن وتخصيصات الذاكرة لكل مرحلة من مراحل الفحص على بيانات مسجلة
+(بدون شبكة)، ومقارنتها بخط أساس محفوظ لاكتشاف التراجعات.
+
+الاستخدام:
+    python -m benchmarks.bench                     # تشغيل ومقارنة مع baseline.json
+    python -m benchmarks.bench --update-baseline   # حفظ النتائج كخط أساس جديد
+    python -m benchmarks.bench --repeat 10 --tolerance 0.3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixtures import BENCH_SYMBOLS, available_symbols, replay
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# لا نعتبر الفرق تراجعًا إذا كان أقل من هذا (ضوضاء التوقيت في المراحل السريعة جدًا)
+MIN_ABS_MS = 0.5
+MIN_ABS_KB = 64.0
+
+
+def _measure(fn, repeat: int) -> dict:
+    """تشغيل fn عدة مرات: التوقيت بدون tracemalloc، ثم تمريرة منفصلة لقياس الذاكرة."""
+    sink = io.StringIO()
+    timings = []
+    with contextlib.redirect_stdout(sink):
+        fn()  # تسخين
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    allocated = sum(s.size_diff for s in after.compare_to(before, "filename") if s.size_diff > 0)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_kb": round(allocated / 1024, 1),
+    }
+
+
+def _synthetic_backtest(n_contracts: int = 500, n_snapshots: int = 60, n_signals: int = 20000, seed: int = 7):
+    """مسارات أسعار عشوائية حتمية (بشكل أعمدة الأرشيف) وإشارات عليها لقياس core/backtest."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    contract = np.repeat(np.arange(n_contracts), n_snapshots)
+    step = np.tile(np.arange(n_snapshots), n_contracts)
+    bid = np.round(2.0 * np.exp(np.cumsum(rng.normal(0, 0.08, (n_contracts, n_snapshots)), axis=1)).ravel(), 2)
+    paths = {
+        "ts": 1_790_000_000.0 + step * 3600.0,
+        "symbol": np.array([f"S{c % 50}" for c in contract], dtype=object),
+        "option_type": np.where(contract % 2, "call", "put").astype(object),
+        "expiration_date": np.where(contract % 3, "2026-11-20", "2026-09-18").astype(object),
+        "strike": 100.0 + contract // 100,
+        "bid": bid,
+        "ask": np.round(bid * 1.03, 2),
+        "last_price": bid,
+    }
+    pick = rng.integers(0, len(bid), n_signals)
+    signals = {name: paths[name][pick] for name in ("ts", "symbol", "option_type", "strike", "expiration_date")}
+    signals.update(entry=paths["ask"][pick], score=rng.random(n_signals),
+                   bucket=np.full(n_signals, "weekly", dtype=object), trend=np.full(n_signals, "up", dtype=object))
+    return signals, paths
+
+
+def run_benchmarks(symbols: list, repeat: int) -> dict:
+    from core.fetcher import get_weekly_and_monthly_expirations, fetch_options_for_expiration
+    from core.indicators import get_technical_indicators
+    from core.quotes import prefetch_quotes
+    from core.backtest import evaluate
+    from core.rerank import rerank
+    from core.scoring import pick_top_2_options
+    from core.strategies import find_straddle
+    from core.vol_targets import annotate
+    from core import gamma_exposure, iv_surface, unusual_activity
+    from core.top10 import process_symbol, get_top_10_across_symbols, build_top10_alert, reset_incremental_state
+
+    from core import negative_cache
+
+    # كل تكرار يجب أن يقوم بالعمل كاملًا، لا أن يتخطى ما سجله التكرار السابق
+    negative_cache.disable()
+
+    results = {}
+    with replay(symbols):
+        # تجهيز المدخلات خارج التوقيت
+        chains = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for symbol in symbols:
+                weekly, monthly = get_weekly_and_monthly_expirations(symbol)
+                contracts = []
+                for exp in (weekly, monthly):
+                    if exp:
+                        contracts += fetch_options_for_expiration(symbol, exp)
+                chains[symbol] = contracts
+            top10 = get_top_10_across_symbols("up", symbols)
+
+        def per_symbol(fn):
+            return lambda: [fn(s) for s in symbols]
+
+        results["get_weekly_and_monthly_expirations"] = _measure(per_symbol(get_weekly_and_monthly_expirations), repeat)
+        def cold(fn):
+            # بدون حالة الفحص السابق: كل العقود تُفلتر وتُقيّم من جديد
+            def run():
+                reset_incremental_state()
+                return fn()
+            return run
+
+        results["process_symbol"] = _measure(cold(per_symbol(lambda s: process_symbol(s, "up"))), repeat)
+        # الهيكل الزمني الكامل (كل التواريخ حتى 60 يوم) مقابل Weekly + Monthly
+        results["process_symbol_term_structure"] = _measure(
+            cold(per_symbol(lambda s: process_symbol(s, "up", max_dte=60))), repeat)
+        results["pick_top_2_options"] = _measure(
+            lambda: [pick_top_2_options([dict(c) for c in chains[s]], "up") for s in symbols], repeat)
+        results["find_straddle"] = _measure(lambda: [find_straddle(s, chains[s]) for s in symbols], repeat)
+        results["get_technical_indicators"] = _measure(per_symbol(get_technical_indicators), repeat)
+        results["build_top10_alert"] = _measure(lambda: build_top10_alert(top10), repeat * 10)
+        # سطح IV لكل الأسهم بدون كاش (كل تكرار يلائم من جديد)
+        results["iv_surface_universe"] = _measure(
+            lambda: (iv_surface.clear(), iv_surface.fit_universe(chains)), repeat)
+        # خطوط أساس النشاط من الصفر لكل الأسهم (تحديث EWMA + z لكل عقد)
+        results["unusual_activity"] = _measure(
+            lambda: (unusual_activity.reset(),
+                     [unusual_activity.observe(s, chains[s]) for s in symbols]), repeat)
+        # GEX / Gamma flip / Max pain لكل الأسهم بدون كاش
+        results["gamma_exposure_universe"] = _measure(
+            lambda: (gamma_exposure.clear(), gamma_exposure.compute_universe(chains)), repeat)
+        results["vol_targets"] = _measure(lambda: annotate([c for s in symbols for c in chains[s]]), repeat)
+        results["prefetch_quotes"] = _measure(lambda: prefetch_quotes(symbols), repeat)
+        results["end_to_end_scan"] = _measure(cold(lambda: get_top_10_across_symbols("up", symbols)), max(3, repeat // 2))
+        results["end_to_end_rescan"] = _measure(lambda: get_top_10_across_symbols("up", symbols), max(3, repeat // 2))
+        results["rerank"] = _measure(
+            lambda: rerank("up", {"scoring": {"weights": {"liquidity": 0.3, "spread": 0.4, "iv": 0.3}}}), repeat * 10)
+
+    signals, paths = _synthetic_backtest()
+    results["backtest_evaluate"] = _measure(lambda: evaluate(signals, paths), repeat)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, floors=None) -> list:
+    """
+    يُرجع قائمة التراجعات (المرحلة، المقياس، القيمة الأساسية، القيمة الحالية).
+    floors: أزواج (المقياس، أقل فرق مطلق يُعتبر تراجعًا).
+    """
+    floors = floors or (("median_ms", MIN_ABS_MS), ("peak_kb", MIN_ABS_KB))
+    regressions = []
+    for stage, current in results.items():
+        base = baseline.get(stage)
+        if not base:
+            continue
+        for metric, floor in floors:
+            old, new = base.get(metric, 0), current.get(metric, 0)
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append((stage, metric, old, new))
+    return regressions
+
+
+def print_report(results: dict, baseline: dict):
+    print(f"{'stage':<36}{'median ms':>12}{'p95 ms':>10}{'peak KB':>10}{'retained KB':>13}{'Δ median':>10}")
+    for stage, r in results.items():
+        base = baseline.get(stage, {}).get("median_ms")
+        delta = f"{(r['median_ms'] / base - 1) * 100:+.0f}%" if base else "—"
+        print(f"{stage:<36}{r['median_ms']:>12.3f}{r['p95_ms']:>10.3f}{r['peak_kb']:>10.1f}{r['retained_kb']:>13.1f}{delta:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء مراحل الفحص على بيانات مسجلة")
+    parser.add_argument("--symbols", nargs="*", help="الرموز (الافتراضي: كل اللقطات المتوفرة)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="نسبة التراجع المسموحة")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", action="store_true", help="طباعة النتائج كـ JSON")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols] if args.symbols else (available_symbols() or BENCH_SYMBOLS)
+    missing = [s for s in symbols if s not in available_symbols()]
+    if missing:
+        print(f"❌ لا توجد لقطات لـ: {', '.join(missing)} — شغّل python -m benchmarks.fixtures --synthesize")
+        return 2
+
+    results = run_benchmarks(symbols, args.repeat)
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, baseline)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ تم تحديث خط الأساس: {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for stage, metric, old, new in regressions:
+        print(f"⚠️ تراجع في {stage} ({metric}): {old} → {new}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
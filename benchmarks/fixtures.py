@@ -0,0 +1,280 @@
+"""
+fixtures.py
+-----------
+تسجيل وإعادة تشغيل بيانات السوق (تواريخ الانتهاء، التاريخ السعري، سلاسل الخيارات)
+لقياس الأداء دون اتصال بالشبكة.
+
+الاستخدام:
+    python -m benchmarks.fixtures --record SPY QQQ AAPL     # تسجيل حي من yfinance
+    python -m benchmarks.fixtures --synthesize               # توليد بيانات حتمية (بدون شبكة)
+    python -m benchmarks.fixtures --export snapshots/bench   # تحويلها لصيغة ReplayProvider
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# مجموعة تمثيلية: سلاسل عريضة (SPY/QQQ)، أسهم كبيرة، وأسهم بلا Weekly
+BENCH_SYMBOLS = ["SPY", "QQQ", "AAPL", "NVDA", "TSLA", "MSFT", "AMZN", "META", "JPM", "XOM", "HCA", "APD"]
+
+# الأعمدة التي نحتفظ بها من سلسلة yfinance
+CHAIN_COLUMNS = ["strike", "lastPrice", "bid", "ask", "volume", "openInterest", "impliedVolatility"]
+HISTORY_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# عدد الشموع لكل فترة يطلبها الكود
+PERIOD_BARS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252}
+
+
+def fixture_path(symbol: str) -> str:
+    return os.path.join(FIXTURES_DIR, f"{symbol.upper()}.json.gz")
+
+
+def save_fixture(fixture: dict):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    with gzip.open(fixture_path(fixture["symbol"]), "wt", encoding="utf-8") as f:
+        json.dump(fixture, f, separators=(",", ":"))
+
+
+def load_fixture(symbol: str) -> dict:
+    with gzip.open(fixture_path(symbol), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def available_symbols() -> list:
+    if not os.path.isdir(FIXTURES_DIR):
+        return []
+    return sorted(n[:-len(".json.gz")] for n in os.listdir(FIXTURES_DIR) if n.endswith(".json.gz"))
+
+
+def _frame_to_columns(df: pd.DataFrame, columns: list) -> dict:
+    out = {}
+    for col in columns:
+        if col in df.columns:
+            values = df[col].astype(float).tolist()
+            out[col] = [None if math.isnan(v) else v for v in values]
+    return out
+
+
+# ==================== التسجيل الحي ====================
+
+def record_fixture(symbol: str, max_expirations: int = 12) -> dict:
+    """تسجيل لقطة حية لسهم واحد من yfinance."""
+    import yfinance as yf
+
+    ticker = yf.Ticker(symbol)
+    expirations = list(ticker.options or [])[:max_expirations]
+    hist = ticker.history(period="1y")
+
+    chains = {}
+    for exp in expirations:
+        opt = ticker.option_chain(exp)
+        chains[exp] = {
+            "calls": _frame_to_columns(opt.calls, CHAIN_COLUMNS),
+            "puts": _frame_to_columns(opt.puts, CHAIN_COLUMNS),
+        }
+
+    return {
+        "symbol": symbol,
+        "recorded_on": datetime.today().date().isoformat(),
+        "source": "yfinance",
+        "expirations": expirations,
+        "history": {
+            "dates": [d.strftime("%Y-%m-%d") for d in hist.index],
+            **_frame_to_columns(hist, HISTORY_COLUMNS),
+        },
+        "chains": chains,
+    }
+
+
+# ==================== التوليد الحتمي ====================
+
+_SYNTH_PROFILE = {
+    # symbol: (spot, base_iv, liquidity, wide_chain, has_weeklies)
+    "SPY": (570.0, 0.14, 40.0, True, True),
+    "QQQ": (490.0, 0.19, 25.0, True, True),
+    "AAPL": (225.0, 0.24, 12.0, False, True),
+    "NVDA": (120.0, 0.48, 20.0, False, True),
+    "TSLA": (250.0, 0.55, 15.0, False, True),
+    "MSFT": (415.0, 0.22, 6.0, False, True),
+    "AMZN": (185.0, 0.30, 8.0, False, True),
+    "META": (560.0, 0.33, 5.0, False, True),
+    "JPM": (210.0, 0.22, 2.0, False, True),
+    "XOM": (115.0, 0.24, 1.5, False, True),
+    "HCA": (390.0, 0.27, 0.3, False, False),
+    "APD": (300.0, 0.23, 0.2, False, False),
+}
+
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.vectorize(math.erf)(x / math.sqrt(2.0)))
+
+
+def _bs_price(spot, strikes, t, iv, is_call, r=0.04):
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(spot / strikes) + (r + 0.5 * iv ** 2) * t) / (iv * sqrt_t)
+    d2 = d1 - iv * sqrt_t
+    if is_call:
+        return spot * _norm_cdf(d1) - strikes * math.exp(-r * t) * _norm_cdf(d2)
+    return strikes * math.exp(-r * t) * _norm_cdf(-d2) - spot * _norm_cdf(-d1)
+
+
+def _third_friday(year: int, month: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(4 - first.weekday()) % 7 + 14)
+
+
+def _synthetic_expirations(today: date, wide: bool, weeklies: bool) -> list:
+    exps = set()
+    d = today
+    horizon = today + timedelta(days=60)
+    while d <= horizon:
+        if weeklies and d.weekday() == 4:
+            exps.add(d)
+        # السلاسل العريضة لها انتهاءات يومية (إثنين/أربعاء/جمعة) في أول ثلاثة أسابيع
+        if wide and d <= today + timedelta(days=21) and d.weekday() in (0, 2, 4):
+            exps.add(d)
+        d += timedelta(days=1)
+    year, month = today.year, today.month
+    for _ in range(4):
+        tf = _third_friday(year, month)
+        if tf >= today:
+            exps.add(tf)
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return [e.isoformat() for e in sorted(exps)][:14 if wide else 9]
+
+
+def synthesize_fixture(symbol: str, today: date = None, seed: int = 2026) -> dict:
+    """توليد لقطة واقعية الشكل وحتمية لسهم واحد (للاستخدام عند غياب الشبكة)."""
+    today = today or datetime.today().date()
+    spot0, base_iv, liquidity, wide, weeklies = _SYNTH_PROFILE.get(symbol, (100.0, 0.30, 1.0, False, True))
+    rng = np.random.default_rng(seed + sum(ord(ch) for ch in symbol))
+
+    # تاريخ سعري لمدة سنة (مسار عشوائي ينتهي عند spot0)
+    n_bars = PERIOD_BARS["1y"]
+    rets = rng.normal(0.0004, base_iv / math.sqrt(252), n_bars)
+    closes = spot0 * np.exp(np.cumsum(rets) - np.sum(rets))
+    opens = closes * (1 + rng.normal(0, 0.003, n_bars))
+    highs = np.maximum(opens, closes) * (1 + np.abs(rng.normal(0, 0.006, n_bars)))
+    lows = np.minimum(opens, closes) * (1 - np.abs(rng.normal(0, 0.006, n_bars)))
+    volumes = rng.lognormal(math.log(5e6 * liquidity), 0.3, n_bars).round()
+    bar_dates = pd.bdate_range(end=today, periods=n_bars)
+
+    spot = float(closes[-1])
+    step = 1.0 if wide else (0.5 if spot < 50 else 2.5 if spot < 300 else 5.0)
+    strikes = np.arange(math.floor(spot * 0.70 / step) * step, spot * 1.30, step)
+    moneyness = np.log(strikes / spot)
+
+    expirations = _synthetic_expirations(today, wide, weeklies)
+    chains = {}
+    for exp in expirations:
+        dte = (date.fromisoformat(exp) - today).days
+        t = max(dte, 0.5) / 365.0
+        near_term = 1.0 + 1.5 * math.exp(-dte / 10.0)
+        iv = base_iv * (1.0 - 0.35 * moneyness + 1.8 * moneyness ** 2) * (1.0 + 0.1 * math.exp(-dte / 5.0))
+        sides = {}
+        for side, is_call in (("calls", True), ("puts", False)):
+            mid = np.maximum(_bs_price(spot, strikes, t, iv, is_call), 0.01)
+            activity = np.exp(-(moneyness / (0.04 + 0.02 * math.sqrt(dte + 1))) ** 2)
+            volume = np.round(liquidity * 800 * near_term * activity * rng.lognormal(0, 0.6, len(strikes)))
+            oi = np.round(liquidity * 4000 * activity * rng.lognormal(0, 0.5, len(strikes)))
+            half_spread = np.maximum(0.005, mid * (0.01 + 0.05 / math.sqrt(liquidity + 0.1)) * (1.5 - activity))
+            bid = np.round(np.maximum(mid - half_spread, 0.0), 2)
+            ask = np.round(mid + half_spread, 2)
+            volume[volume == 0] = np.nan  # yfinance يعيد NaN للعقود التي لم تتداول
+            frame = pd.DataFrame({
+                "strike": strikes, "lastPrice": np.round(mid, 2), "bid": bid, "ask": ask,
+                "volume": volume, "openInterest": oi, "impliedVolatility": np.round(iv, 5),
+            })
+            sides[side] = _frame_to_columns(frame, CHAIN_COLUMNS)
+        chains[exp] = sides
+
+    return {
+        "symbol": symbol,
+        "recorded_on": today.isoformat(),
+        "source": "synthetic",
+        "expirations": expirations,
+        "history": {
+            "dates": [d.strftime("%Y-%m-%d") for d in bar_dates],
+            "Open": opens.tolist(), "High": highs.tolist(), "Low": lows.tolist(),
+            "Close": closes.tolist(), "Volume": volumes.tolist(),
+        },
+        "chains": chains,
+    }
+
+
+# ==================== إعادة التشغيل ====================
+
+def export_snapshots(root: str, symbols: list = None) -> str:
+    """تحويل اللقطات (JSON) إلى صيغة ReplayProvider العمودية داخل root."""
+    from core.providers import write_snapshot
+
+    for symbol in symbols or available_symbols():
+        fx = load_fixture(symbol)
+        hist = fx["history"]
+        bars = pd.DataFrame({col: hist[col] for col in HISTORY_COLUMNS if col in hist},
+                            index=pd.to_datetime(hist["dates"]), dtype=float)
+        chains = {
+            exp: (pd.DataFrame(side["calls"], columns=CHAIN_COLUMNS, dtype=float),
+                  pd.DataFrame(side["puts"], columns=CHAIN_COLUMNS, dtype=float))
+            for exp, side in fx["chains"].items()
+        }
+        write_snapshot(root, symbol, fx["recorded_on"], fx["expirations"], bars, chains)
+    return root
+
+
+@contextmanager
+def replay(symbols: list = None):
+    """
+    تشغيل core/ على اللقطات عبر ReplayProvider. تاريخ الجلسة هو تاريخ التسجيل،
+    لذلك تبقى نتائج الفحص وتوقيتاته ثابتة مهما تغيّر يوم التشغيل.
+    """
+    from core.providers import ReplayProvider, set_provider
+
+    symbols = symbols or available_symbols()
+    with tempfile.TemporaryDirectory(prefix="maz-replay-") as root:
+        export_snapshots(root, symbols)
+        session = date.fromisoformat(load_fixture(symbols[0])["recorded_on"])
+        previous = set_provider(ReplayProvider(root, session=session))
+        try:
+            yield root
+        finally:
+            set_provider(previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="تسجيل/توليد لقطات بيانات لقياس الأداء")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--record", nargs="*", metavar="SYMBOL", help="تسجيل حي من yfinance")
+    group.add_argument("--synthesize", nargs="*", metavar="SYMBOL", help="توليد بيانات حتمية")
+    group.add_argument("--export", metavar="DIR", help="تحويل اللقطات إلى صيغة ReplayProvider")
+    args = parser.parse_args()
+
+    if args.export:
+        export_snapshots(args.export)
+        print(f"✅ تم التصدير إلى {args.export}")
+        return
+
+    if args.record is not None:
+        for symbol in args.record or BENCH_SYMBOLS:
+            save_fixture(record_fixture(symbol))
+            print(f"✅ تم تسجيل {symbol}")
+    else:
+        for symbol in args.synthesize or BENCH_SYMBOLS:
+            save_fixture(synthesize_fixture(symbol))
+            print(f"✅ تم توليد {symbol}")
+
+
+if __name__ == "__main__":
+    main()
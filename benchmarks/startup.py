@@ -0,0 +1,137 @@
+"""
+startup.py
+----------
+قياس زمن الإقلاع البارد لنقاط الدخول (main.py، واجهة Streamlit، gui.py، المراقب):
+كل قياس عملية Python جديدة، مع تفصيل أثقل الوحدات المستوردة من -X importtime.
+
+الاستخدام:
+    python -m benchmarks.startup                     # تشغيل ومقارنة مع startup_baseline.json
+    python -m benchmarks.startup --update-baseline
+    python -m benchmarks.startup --targets main alerts --repeat 10
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.bench import compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+# زمن بدء العملية متذبذب؛ لا نعتبر الفرق تراجعًا إذا كان أقل من هذا
+MIN_ABS_MS = 20.0
+
+# الهدف -> (الكود المنفذ، الحزمة المطلوبة لتشغيله أو None)
+TARGETS = {
+    "interpreter": ("pass", None),
+    "main": ("import main", None),
+    "main_scan_stack": ("import main; main.get_top_10_across_symbols", None),
+    "alerts": ("import core.alerts", None),
+    "watcher": ("import watcher", None),
+    "frontend": ("import frontend", "streamlit"),
+    "gui": ("import gui", "tkinter"),
+}
+
+
+def _parse_importtime(stderr: str):
+    """(إجمالي زمن الاستيراد بالمللي ثانية، أثقل الوحدات في المستوى الأول)."""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # المستوى الأول: مسافة واحدة فقط بعد الفاصل
+            top_level.append((name.strip(), int(cumulative) / 1000))
+    total = sum(ms for _, ms in top_level)
+    heaviest = sorted(top_level, key=lambda x: x[1], reverse=True)[:5]
+    return total, [f"{name} {ms:.1f}ms" for name, ms in heaviest]
+
+
+def measure_target(code: str, repeat: int) -> dict:
+    timings = []
+    import_ms, heaviest = 0.0, []
+    for i in range(repeat + 1):  # التشغيل الأول يبني ملفات .pyc ولا يُحسب
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=ROOT, capture_output=True, text=True, timeout=120)
+        elapsed = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+            return {"error": error}
+        if i:
+            timings.append(elapsed)
+            import_ms, heaviest = _parse_importtime(proc.stderr)
+
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 1),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 1),
+        "import_ms": round(import_ms, 1),
+        "heaviest": heaviest,
+    }
+
+
+def run_startup(targets: list, repeat: int) -> dict:
+    results = {}
+    for name in targets:
+        code, requirement = TARGETS[name]
+        if requirement and importlib.util.find_spec(requirement) is None:
+            results[name] = {"skipped": f"{requirement} not installed"}
+            continue
+        results[name] = measure_target(code, repeat)
+    return results
+
+
+def print_report(results: dict, baseline: dict):
+    print(f"{'target':<18}{'median ms':>11}{'p95 ms':>9}{'import ms':>11}{'Δ median':>10}  heaviest imports")
+    for name, r in results.items():
+        if "median_ms" not in r:
+            print(f"{name:<18}  {r.get('skipped') or '❌ ' + r.get('error', '')}")
+            continue
+        base = baseline.get(name, {}).get("median_ms")
+        delta = f"{(r['median_ms'] / base - 1) * 100:+.0f}%" if base else "—"
+        print(f"{name:<18}{r['median_ms']:>11.1f}{r['p95_ms']:>9.1f}{r['import_ms']:>11.1f}{delta:>10}  "
+              + ", ".join(r["heaviest"][:3]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن الإقلاع البارد لنقاط الدخول")
+    parser.add_argument("--targets", nargs="*", choices=list(TARGETS), help="الافتراضي: الكل")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="نسبة التراجع المسموحة")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", action="store_true", help="طباعة النتائج كـ JSON")
+    args = parser.parse_args()
+
+    results = run_startup(args.targets or list(TARGETS), args.repeat)
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_report(results, baseline)
+
+    if args.update_baseline:
+        measured = {name: r for name, r in results.items() if "median_ms" in r}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({**baseline, **measured}, f, indent=2, ensure_ascii=False)
+        print(f"✅ تم تحديث خط الأساس: {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, floors=(("median_ms", MIN_ABS_MS),))
+    for name, metric, old, new in regressions:
+        print(f"⚠️ تراجع في {name} ({metric}): {old} → {new}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
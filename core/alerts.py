@@ -4,37 +4,33 @@ alerts.py
 وظيفة هذا الملف: إرسال التنبيهات إلى التليقرام.
 """
 
-import os
-import requests
-from dotenv import load_dotenv
-
-# تحميل متغيرات البيئة
-load_dotenv()
-
-# الحصول على إعدادات التليقرام
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+from core import metrics
+from core.settings import get_settings
 
 
+@metrics.timed("alerts")
 def send_telegram_message(message: str):
     """
     إرسال رسالة إلى التليقرام مع تقسيم الرسائل الطويلة تلقائيًا.
     """
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+    settings = get_settings()
+    if not settings.telegram_bot_token or not settings.telegram_chat_id:
         error_msg = "❌ خطأ: لم يتم تعيين TELEGRAM_BOT_TOKEN أو TELEGRAM_CHAT_ID في ملف .env"
         print(error_msg)
         return {"error": error_msg}
 
     try:
+        import requests
+
         # تقسيم الرسائل الطويلة (حد التليقرام 4096 حرف)
         max_length = 4000  # نستخدم 4000 لترك هامش أمان
         messages = [message[i:i + max_length] for i in range(0, len(message), max_length)]
         
         results = []
         for i, msg_part in enumerate(messages):
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+            url = f"https://api.telegram.org/bot{settings.telegram_bot_token}/sendMessage"
             payload = {
-                "chat_id": TELEGRAM_CHAT_ID,
+                "chat_id": settings.telegram_chat_id,
                 "text": msg_part,
                 "parse_mode": "HTML"
             }
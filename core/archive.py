@@ -0,0 +1,341 @@
+"""
+archive.py
+----------
+أرشيف مضغوط بالأعمدة لكل سلسلة خيارات يجلبها الفحص، لتاريخ IV وتغير OI والاختبار الخلفي
+ولمعرفة "لماذا اختار الفحص هذا العقد أمس".
+
+التفعيل بمتغير البيئة MAZ_ARCHIVE_DIR (مثلًا archive). يتطلب pyarrow.
+
+التخزين: ملفات Arrow IPC مضغوطة (lz4 افتراضيًا) مقسمة حسب يوم السوق والسهم:
+
+    archive/date=2026-10-19/symbol=AAPL/seg-143015-4242-000001.arrow
+    archive/date=2026-10-18/symbol=AAPL/compacted.arrow        (بعد compact)
+
+- record_chain() يضيف السلسلة إلى مخزن في الذاكرة فقط (رخيص، آمن بين الخيوط).
+- flush() يكتب مقطعًا واحدًا لكل (يوم، سهم): في نهاية كل فحص Top 10، عند امتلاء المخزن،
+  وعند خروج البرنامج.
+- read() يفتح الملفات عبر memory map ويفك ضغط الأعمدة المطلوبة فقط (الإسقاط يتم في قارئ IPC
+  قبل فك الضغط)، مع تخطي الأقسام خارج نطاق الأيام/الأسهم دون فتحها. الأعمدة المقروءة تُنسخ
+  إلى الذاكرة عند فك ضغطها (memory map لا يعني zero-copy مع lz4).
+- compact() يدمج مقاطع الأيام المنتهية في ملف واحد لكل قسم.
+
+الاستخدام:
+    python -m core.archive --summary
+    python -m core.archive --compact
+    python -m core.archive --read AAPL --start 2026-10-01
+"""
+
+import argparse
+import atexit
+import itertools
+import os
+import threading
+import time
+from datetime import date
+
+import numpy as np
+
+from core import metrics
+from core.settings import get_settings
+
+SCHEMA_FIELDS = [
+    ("ts", "float64"),                 # وقت الجلب (epoch ثواني)
+    ("symbol", "string"),
+    ("expiration_date", "string"),
+    ("option_type", "string"),
+    ("strike", "float64"),
+    ("bid", "float64"),
+    ("ask", "float64"),
+    ("last_price", "float64"),
+    ("volume", "float64"),
+    ("open_interest", "float64"),
+    ("implied_volatility", "float64"),
+    ("underlying_price", "float64"),
+]
+
+# أعمدة سلسلة المزود -> أعمدة الأرشيف
+CHAIN_COLUMNS = {
+    "strike": "strike",
+    "bid": "bid",
+    "ask": "ask",
+    "lastPrice": "last_price",
+    "volume": "volume",
+    "openInterest": "open_interest",
+    "impliedVolatility": "implied_volatility",
+}
+
+FLUSH_ROWS = 200_000          # كتابة تلقائية عند تجاوز هذا العدد من الصفوف في الذاكرة
+COMPACTED_FILE = "compacted.arrow"
+
+_lock = threading.Lock()
+_buffer = {}                  # (day, symbol) -> [columns dict, ...]
+_buffered_rows = 0
+_seq = itertools.count(1)
+_atexit_registered = False
+_warned = False
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("أرشيف السلاسل يتطلب pyarrow (pip install pyarrow)") from e
+    return pa
+
+
+def _schema(pa):
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in SCHEMA_FIELDS])
+
+
+def archive_dir() -> str:
+    return get_settings().archive_dir
+
+
+def is_enabled() -> bool:
+    """الأرشيف مفعل إذا حُدد MAZ_ARCHIVE_DIR وكان pyarrow متاحًا (تحذير واحد فقط إن لم يكن)."""
+    global _warned
+    if not archive_dir():
+        return False
+    try:
+        _pyarrow()
+    except RuntimeError as e:
+        if not _warned:
+            print(f"⚠️ {e} — تم تعطيل الأرشيف")
+            _warned = True
+        return False
+    return True
+
+
+def _partition_dir(root: str, day: str, symbol: str) -> str:
+    return os.path.join(root, f"date={day}", f"symbol={symbol}")
+
+
+# ---------------------------------------------------------------- الكتابة
+
+def _chain_columns(frame, n: int) -> dict:
+    columns = {}
+    for source, name in CHAIN_COLUMNS.items():
+        if frame is not None and source in frame:
+            columns[name] = frame[source].to_numpy(dtype=float, na_value=np.nan)
+        else:
+            columns[name] = np.full(n, np.nan)
+    return columns
+
+
+def record_chain(symbol: str, expiration: str, calls, puts, underlying_price: float, day: date = None):
+    """إضافة سلسلة (calls/puts كما يُرجعها المزود) إلى المخزن؛ لا شيء إذا كان الأرشيف معطلًا."""
+    global _buffered_rows, _atexit_registered
+    if not is_enabled():
+        return
+
+    n_calls = 0 if calls is None else len(calls)
+    n_puts = 0 if puts is None else len(puts)
+    n = n_calls + n_puts
+    if not n:
+        return
+
+    calls_cols, puts_cols = _chain_columns(calls, n_calls), _chain_columns(puts, n_puts)
+    columns = {name: np.concatenate([calls_cols[name], puts_cols[name]]) for name in CHAIN_COLUMNS.values()}
+    columns["ts"] = np.full(n, time.time())
+    columns["symbol"] = [symbol] * n
+    columns["expiration_date"] = [expiration] * n
+    columns["option_type"] = ["call"] * n_calls + ["put"] * n_puts
+    columns["underlying_price"] = np.full(n, float(underlying_price or np.nan))
+
+    if day is None:
+        from core.providers import get_provider
+        day = get_provider().today()
+
+    with _lock:
+        _buffer.setdefault((day.isoformat(), symbol), []).append(columns)
+        _buffered_rows += n
+        full = _buffered_rows >= FLUSH_ROWS
+        if not _atexit_registered:
+            atexit.register(flush)
+            _atexit_registered = True
+    metrics.incr("archive.rows_buffered", n)
+
+    if full:
+        flush()
+
+
+def _write_table(path: str, table, compression: str):
+    pa = _pyarrow()
+    tmp = path + ".tmp"
+    options = pa.ipc.IpcWriteOptions(compression=compression or None)
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+@metrics.timed("archive_flush")
+def flush() -> int:
+    """كتابة المخزن إلى القرص (مقطع لكل قسم). يُرجع عدد الصفوف المكتوبة."""
+    global _buffered_rows
+    with _lock:
+        pending = dict(_buffer)
+        _buffer.clear()
+        _buffered_rows = 0
+    if not pending:
+        return 0
+
+    pa = _pyarrow()
+    schema = _schema(pa)
+    root = archive_dir()
+    compression = get_settings().archive_compression
+    stamp = time.strftime("%H%M%S")
+    written = 0
+
+    for (day, symbol), parts in pending.items():
+        table = pa.Table.from_batches([
+            pa.RecordBatch.from_pydict(columns, schema=schema) for columns in parts
+        ], schema=schema)
+        directory = _partition_dir(root, day, symbol)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_table(os.path.join(directory, f"seg-{stamp}-{os.getpid()}-{next(_seq):06d}.arrow"), table, compression)
+        except OSError as e:
+            print(f"⚠️ فشل حفظ أرشيف {symbol} ({day}): {e}")
+            metrics.incr("errors.archive")
+            continue
+        written += table.num_rows
+
+    metrics.incr("archive.rows_written", written)
+    return written
+
+
+# ---------------------------------------------------------------- القراءة
+
+def _in_range(day: str, start, end) -> bool:
+    return (start is None or day >= str(start)) and (end is None or day <= str(end))
+
+
+def partitions(symbol: str = None, start=None, end=None, root: str = None) -> list:
+    """[(day, symbol, [ملفات])] مرتبة، مع التقسيم حسب أسماء المجلدات فقط."""
+    root = root or archive_dir()
+    if not root or not os.path.isdir(root):
+        return []
+    symbols = {symbol} if isinstance(symbol, str) else symbol
+    symbols = {s.upper() for s in symbols} if symbols else None
+
+    found = []
+    for day_dir in sorted(os.listdir(root)):
+        if not day_dir.startswith("date=") or not _in_range(day_dir[5:], start, end):
+            continue
+        day_path = os.path.join(root, day_dir)
+        for symbol_dir in sorted(os.listdir(day_path)):
+            name = symbol_dir[len("symbol="):]
+            if not symbol_dir.startswith("symbol=") or (symbols and name not in symbols):
+                continue
+            path = os.path.join(day_path, symbol_dir)
+            files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".arrow"))
+            if files:
+                found.append((day_dir[5:], name, files))
+    return found
+
+
+def _read_file(path: str, columns: list = None):
+    pa = _pyarrow()
+    source = pa.memory_map(path, "r")
+    if not columns:
+        return pa.ipc.open_file(source).read_all()
+    # الإسقاط قبل فك الضغط: included_fields يجعل القارئ يتخطى مخازن الأعمدة الأخرى كليًا
+    # (read_all().select() كان يفك ضغط كل الأعمدة ثم يرمي معظمها)
+    schema = pa.ipc.open_file(source).schema
+    fields = sorted({schema.get_field_index(name) for name in columns})
+    table = pa.ipc.open_file(source, options=pa.ipc.IpcReadOptions(included_fields=fields)).read_all()
+    return table.select(columns)
+
+
+def read(symbol=None, start=None, end=None, columns: list = None, root: str = None):
+    """
+    جدول pyarrow لكل الصفوف المؤرشفة ضمن النطاق.
+    symbol: رمز أو قائمة رموز (الافتراضي: الكل)؛ start/end: أيام (date أو "YYYY-MM-DD") شاملة.
+    columns: أعمدة محددة فقط، بالترتيب المطلوب (الأعمدة الأخرى لا تُقرأ ولا تُفك من الضغط).
+    """
+    pa = _pyarrow()
+    schema = _schema(pa)
+    if columns:
+        schema = pa.schema([schema.field(c) for c in columns])
+    tables = [_read_file(path, columns) for _, _, files in partitions(symbol, start, end, root) for path in files]
+    if not tables:
+        return schema.empty_table()
+    return pa.concat_tables(tables)
+
+
+def read_arrays(symbol=None, start=None, end=None, columns: list = None, root: str = None) -> dict:
+    """نفس read() لكن كأعمدة numpy (النصوص كمصفوفات object)."""
+    table = read(symbol, start, end, columns, root)
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+# ---------------------------------------------------------------- الصيانة
+
+def compact(before=None, root: str = None) -> int:
+    """
+    دمج مقاطع كل قسم في ملف واحد للأيام السابقة لـ before (الافتراضي: اليوم).
+    يُرجع عدد الأقسام المدمجة.
+    """
+    root = root or archive_dir()
+    before = str(before or date.today())
+    compression = get_settings().archive_compression
+    pa = _pyarrow()
+    compacted = 0
+    for day, symbol, files in partitions(root=root):
+        if day >= before or len(files) < 2:
+            continue
+        table = pa.concat_tables([_read_file(path) for path in files]).combine_chunks()
+        directory = os.path.dirname(files[0])
+        target = os.path.join(directory, COMPACTED_FILE)
+        try:
+            _write_table(target + ".new", table, compression)
+            os.replace(target + ".new", target)
+            for path in files:
+                if path != target:
+                    os.remove(path)
+        except OSError as e:
+            print(f"⚠️ فشل دمج أرشيف {symbol} ({day}): {e}")
+            continue
+        compacted += 1
+    return compacted
+
+
+def summary(root: str = None) -> dict:
+    found = partitions(root=root)
+    files = [path for _, _, paths in found for path in paths]
+    return {
+        "days": len({day for day, _, _ in found}),
+        "partitions": len(found),
+        "files": len(files),
+        "bytes": sum(os.path.getsize(path) for path in files),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="أرشيف سلاسل الخيارات")
+    parser.add_argument("--root", help="مجلد الأرشيف (الافتراضي: MAZ_ARCHIVE_DIR)")
+    parser.add_argument("--summary", action="store_true")
+    parser.add_argument("--compact", action="store_true", help="دمج مقاطع الأيام السابقة")
+    parser.add_argument("--read", metavar="SYMBOL", help="طباعة آخر صفوف سهم")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    args = parser.parse_args()
+
+    root = args.root or archive_dir()
+    if not root:
+        parser.error("حدد --root أو MAZ_ARCHIVE_DIR")
+    if args.compact:
+        print(f"✅ تم دمج {compact(root=root)} قسم")
+    if args.read:
+        table = read(args.read, args.start, args.end, root=root)
+        print(table.slice(max(0, table.num_rows - 20)).to_pandas().to_string())
+        print(f"({table.num_rows} صف)")
+    if args.summary or not (args.compact or args.read):
+        info = summary(root)
+        print(f"📦 {info['days']} يوم، {info['partitions']} قسم، {info['files']} ملف، "
+              f"{info['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
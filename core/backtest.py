@@ -0,0 +1,378 @@
+"""
+backtest.py
+-----------
+اختبار خلفي لقاعدة TP/SL (core/utils.option_tp_sl) على إشارات تاريخية ومسارات أسعار
+العقود من أرشيف السلاسل (core/archive).
+
+الإشارات:
+- signals_from_archive(): إعادة إنتاج اختيار الفحص لكل لقطة مؤرشفة (نفس القواعد:
+  مستويات التوسع، نطاق الاختيار، التقييم، أفضل عقدين) — دفعة واحدة لكل اللقطات.
+- signals_from_jsonl(): سجلات الفحص المحفوظة من main.py --format jsonl.
+
+التقييم (evaluate): لكل إشارة مسار سعر العقد في اللقطات التالية (البيع بالـ bid افتراضيًا)،
+والنتيجة أول ما يحدث: TP أو SL، وإلا الانتهاء (expiry) أو ما زالت مفتوحة (open).
+المسارات تُفرد في مصفوفات مسطحة وأول لمس يُحسب بـ np.minimum.reduceat، على دفعات محدودة
+الحجم — بدون حلقة Python لكل إشارة.
+
+الاستخدام:
+    python -m core.backtest --start 2026-10-01 --end 2026-10-31
+    python -m core.backtest --symbols AAPL MSFT --trend up --by symbol bucket decile
+    python -m core.backtest --signals scan.jsonl --price mid --tp 1.5 --sl 0.7
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from core import metrics
+from core.expiry_calendar import DTE_BUCKETS, LONG_DTE_BUCKET
+from core.rerank import top_per_group
+from core.rules import get_rules
+from core.utils import SL_MULTIPLIER, TP_MULTIPLIER
+
+# صفوف نفس السهم المتباعدة بأكثر من هذا (ثواني) تُعتبر لقطتين (فحصين) مختلفتين
+SNAPSHOT_GAP_S = 30
+
+# أقصى عدد نقاط مسار تُفرد في الذاكرة دفعة واحدة
+CHUNK_POINTS = 2_000_000
+
+OUTCOMES = ("tp", "sl", "expiry", "open")
+_RULE_FIELDS = ("bid", "ask", "volume", "open_interest", "implied_volatility", "strike", "underlying_price")
+
+
+_BUCKET_LIMITS = np.array([limit for limit, _ in DTE_BUCKETS])
+_BUCKET_NAMES = np.array([name for _, name in DTE_BUCKETS] + [LONG_DTE_BUCKET], dtype=object)
+
+
+def _dte_buckets(days: np.ndarray) -> np.ndarray:
+    """شريحة DTE لكل عقد (نفس core.expiry_calendar.dte_bucket، متجهة)."""
+    return _BUCKET_NAMES[np.searchsorted(_BUCKET_LIMITS, days, side="left")]
+
+
+def _codes(values: np.ndarray):
+    """(الرموز المتميزة، رقم كل قيمة) — ترقيم متجه للأعمدة النصية."""
+    uniques, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return uniques, codes
+
+
+def _epoch_days(expirations: np.ndarray) -> np.ndarray:
+    uniques, codes = _codes(expirations)
+    return uniques.astype("datetime64[D]").astype(np.int64)[codes]
+
+
+def _take(columns: dict, index: np.ndarray) -> dict:
+    return {name: np.asarray(values)[index] for name, values in columns.items()}
+
+
+# ---------------------------------------------------------------- الإشارات
+
+@metrics.timed("backtest_signals")
+def signals_from_archive(arrays: dict, trends=("up", "down"), per_snapshot: int = 2) -> dict:
+    """
+    إشارات الفحص لكل لقطة في أعمدة الأرشيف (archive.read_arrays):
+    أفضل per_snapshot عقود لكل (لقطة، اتجاه) بنفس منطق process_symbol.
+    """
+    if not len(arrays.get("ts", ())):
+        return _empty_signals()
+
+    symbols, symbol_codes = _codes(arrays["symbol"])
+    order = np.lexsort((arrays["ts"], symbol_codes))  # ثابت: ترتيب الجلب يُحفظ داخل اللقطة
+    a = _take(arrays, order)
+    symbol_codes = symbol_codes[order]
+    ts = a["ts"].astype(float)
+
+    new_snapshot = np.r_[True, (symbol_codes[1:] != symbol_codes[:-1]) | (np.diff(ts) > SNAPSHOT_GAP_S)]
+    snapshot = np.cumsum(new_snapshot) - 1
+    n_snapshots = int(snapshot[-1]) + 1
+
+    # فحصا الصعود والهبوط المتتاليان يجلبان نفس السلسلة: آخر سعر لكل عقد في اللقطة فقط
+    keys = np.stack([snapshot, _codes(a["option_type"])[1], _codes(a["expiration_date"])[1],
+                     np.unique(a["strike"], return_inverse=True)[1].reshape(-1)], axis=1)
+    _, first_from_end = np.unique(keys[::-1], axis=0, return_index=True)
+    keep = np.sort(len(ts) - 1 - first_from_end)
+    a, symbol_codes, ts, snapshot = _take(a, keep), symbol_codes[keep], ts[keep], snapshot[keep]
+
+    rule_arrays = {field: a[field].astype(float) for field in _RULE_FIELDS}
+    rule_arrays["option_type"] = a["option_type"].astype(object)
+    rule_arrays["incomplete"] = np.isnan(rule_arrays["strike"])
+    rule_arrays["days"] = _epoch_days(a["expiration_date"]) - (ts // 86400).astype(np.int64)
+
+    # الأسهم بلا تخصيص تشترك في نفس القواعد، فتُقيّم معًا
+    groups = {}
+    for code, symbol in enumerate(symbols):
+        base = get_rules(symbol)
+        groups.setdefault(id(base), (base, []))[1].append(code)
+
+    signals = []
+    for trend in trends:
+        tiers = np.full(len(ts), -1)
+        eligible = np.zeros(len(ts), dtype=bool)
+        scores = np.zeros(len(ts))
+        for rules, codes in groups.values():
+            mask = np.isin(symbol_codes, codes)
+            subset = {key: values[mask] for key, values in rule_arrays.items()}
+            tiers[mask] = rules.tolerance_tiers(subset, trend, subset["underlying_price"])
+            eligible[mask] = rules.in_pick_range(subset, trend)
+            scores[mask] = rules.score(subset)
+
+        # أول مستوى توسع يُنتج مجموعة غير فارغة، لكل لقطة على حدة
+        passing = tiers >= 0
+        best_tier = np.full(n_snapshots, np.iinfo(np.int64).max)
+        np.minimum.at(best_tier, snapshot[passing], tiers[passing])
+        eligible &= passing & (tiers == best_tier[snapshot])
+
+        picked = np.sort(top_per_group(np.flatnonzero(eligible), scores, snapshot, per_snapshot))
+        picked_days = rule_arrays["days"][picked]
+        signals.append({
+            "ts": ts[picked],
+            "symbol": a["symbol"][picked].astype(object),
+            "option_type": a["option_type"][picked].astype(object),
+            "strike": rule_arrays["strike"][picked],
+            "expiration_date": a["expiration_date"][picked].astype(object),
+            "entry": rule_arrays["ask"][picked],
+            "score": scores[picked],
+            "bucket": _dte_buckets(picked_days),
+            "trend": np.full(len(picked), trend, dtype=object),
+        })
+
+    return {name: np.concatenate([s[name] for s in signals]) for name in signals[0]}
+
+
+def _empty_signals() -> dict:
+    return {
+        "ts": np.empty(0), "symbol": np.empty(0, dtype=object), "option_type": np.empty(0, dtype=object),
+        "strike": np.empty(0), "expiration_date": np.empty(0, dtype=object), "entry": np.empty(0),
+        "score": np.empty(0), "bucket": np.empty(0, dtype=object), "trend": np.empty(0, dtype=object),
+    }
+
+
+def signals_from_jsonl(path: str, record: str = "symbol") -> dict:
+    """
+    إشارات من ملف JSONL لأداة الفحص (core/scan_output).
+    record="symbol": أفضل عقدين لكل سهم في كل فحص؛ "top": الترتيب النهائي فقط.
+    """
+    frame = pd.read_json(path, lines=True, dtype=False)
+    if frame.empty:
+        return _empty_signals()
+    frame = frame[frame["record"] == record]
+    ts = (pd.to_datetime(frame["scanned_at"], utc=True) - pd.Timestamp(0, tz="UTC")).dt.total_seconds().to_numpy()
+    days = _epoch_days(frame["expiration_date"].to_numpy()) - (ts // 86400).astype(np.int64)
+    return {
+        "ts": ts,
+        "symbol": frame["underlying_symbol"].to_numpy(dtype=object),
+        "option_type": frame["option_type"].to_numpy(dtype=object),
+        "strike": frame["strike"].to_numpy(dtype=float),
+        "expiration_date": frame["expiration_date"].to_numpy(dtype=object),
+        "entry": frame["ask"].to_numpy(dtype=float),
+        "score": frame["score"].to_numpy(dtype=float),
+        "bucket": _dte_buckets(days),
+        "trend": frame["trend"].to_numpy(dtype=object),
+    }
+
+
+# ---------------------------------------------------------------- التقييم
+
+def _contract_ids(paths: dict, signals: dict):
+    """رقم موحد لكل عقد (سهم، نوع، انتهاء، strike) في المسارات والإشارات معًا."""
+    n = len(paths["ts"])
+    ids = []
+    for name in ("symbol", "option_type", "expiration_date"):
+        _, codes = _codes(np.concatenate([np.asarray(paths[name], dtype=object),
+                                          np.asarray(signals[name], dtype=object)]))
+        ids.append(codes)
+    _, strike_codes = np.unique(np.concatenate([paths["strike"], signals["strike"]]), return_inverse=True)
+    ids.append(strike_codes)
+    _, contract = np.unique(np.stack(ids, axis=1), axis=0, return_inverse=True)
+    contract = contract.reshape(-1).astype(np.int64)
+    return contract[:n], contract[n:]
+
+
+def _exit_prices(paths: dict, price: str) -> np.ndarray:
+    if price == "mid":
+        return (paths["bid"] + paths["ask"]) / 2
+    if price == "last":
+        return paths["last_price"]
+    return paths["bid"]
+
+
+def _first_hits(prices, starts, lengths, tp, sl):
+    """(أول لمس TP، أول لمس SL، آخر سعر صالح) كفهارس صفوف، على دفعات محدودة الحجم."""
+    n = len(starts)
+    none = len(prices)
+    first_tp = np.full(n, none)
+    first_sl = np.full(n, none)
+    last_valid = np.full(n, -1)
+
+    nonempty = np.flatnonzero(lengths > 0)
+    cumulative = np.cumsum(lengths[nonempty])
+    bounds = np.searchsorted(cumulative, np.arange(CHUNK_POINTS, cumulative[-1] if len(cumulative) else 0,
+                                                   CHUNK_POINTS), side="right")
+    for chunk in np.split(nonempty, bounds):
+        if not len(chunk):
+            continue
+        chunk_lengths = lengths[chunk]
+        offsets = np.cumsum(chunk_lengths) - chunk_lengths
+        segment = np.repeat(np.arange(len(chunk)), chunk_lengths)
+        rows = starts[chunk][segment] + (np.arange(len(segment)) - offsets[segment])
+
+        p = prices[rows]
+        valid = p > 0  # NaN أو bid صفري = لا يوجد سعر بيع في هذه اللقطة
+        first_tp[chunk] = np.minimum.reduceat(np.where(valid & (p >= tp[chunk][segment]), rows, none), offsets)
+        first_sl[chunk] = np.minimum.reduceat(np.where(valid & (p <= sl[chunk][segment]), rows, none), offsets)
+        last_valid[chunk] = np.maximum.reduceat(np.where(valid, rows, -1), offsets)
+    return first_tp, first_sl, last_valid
+
+
+@metrics.timed("backtest_evaluate")
+def evaluate(signals: dict, paths: dict, price: str = "bid",
+             tp_mult: float = TP_MULTIPLIER, sl_mult: float = SL_MULTIPLIER) -> pd.DataFrame:
+    """
+    نتيجة كل إشارة على مسار عقدها بعد وقت الإشارة.
+    الدخول بسعر ask للإشارة، والخروج بسعر price (bid / mid / last) في أول لقطة يلمس فيها
+    TP أو SL؛ وإلا آخر سعر قبل الانتهاء (expiry) أو آخر سعر متاح (open).
+    """
+    n = len(signals["ts"])
+    entry = np.asarray(signals["entry"], dtype=float)
+    tp = np.round(entry * tp_mult, 2)
+    sl = np.round(entry * sl_mult, 2)
+    signal_ts = np.asarray(signals["ts"], dtype=float)
+
+    if n and len(paths["ts"]):
+        path_contract, signal_contract = _contract_ids(paths, signals)
+        path_ts = np.asarray(paths["ts"], dtype=float)
+        order = np.lexsort((path_ts, path_contract))
+        path_ts = path_ts[order]
+        prices = _exit_prices(paths, price).astype(float)[order]
+
+        # (عقد، ثانية) في عدد صحيح واحد مرتب: بداية المسار ونهايته بـ searchsorted
+        origin = np.floor(min(path_ts[0], signal_ts.min()))
+        position = path_contract[order] << 32 | (path_ts - origin).astype(np.int64)
+        starts = np.searchsorted(position, signal_contract << 32 | (signal_ts - origin).astype(np.int64), side="right")
+        ends = np.searchsorted(position, (signal_contract + 1) << 32, side="left")
+        lengths = ends - starts
+        first_tp, first_sl, last_valid = _first_hits(prices, starts, lengths, tp, sl)
+        last_day = int(path_ts.max() // 86400)
+    else:
+        prices, path_ts = np.empty(0), np.empty(0)
+        lengths = np.zeros(n, dtype=np.int64)
+        first_tp = first_sl = np.zeros(n, dtype=np.int64)
+        last_valid = np.full(n, -1)
+        last_day = 0
+
+    none = len(prices)
+    tp_first = (first_tp < none) & (first_tp < first_sl)
+    sl_first = (first_sl < none) & ~tp_first
+    # بلا لمس: انتهى العقد إذا كانت بيانات الأرشيف تتجاوز يوم انتهائه، وإلا ما زال مفتوحًا
+    expiration_day = _epoch_days(signals["expiration_date"]) if n else np.empty(0, dtype=np.int64)
+    expired = ~(tp_first | sl_first) & (expiration_day < last_day)
+    outcome = np.select([tp_first, sl_first, expired], ["tp", "sl", "expiry"], "open").astype(object)
+
+    # سعر الخروج: سعر اللمس، أو آخر سعر متاح؛ عقد منتهٍ بلا أي سعر بعد الإشارة = بلا قيمة
+    exit_row = np.where(tp_first, first_tp, np.where(sl_first, first_sl, last_valid))
+    has_exit = exit_row >= 0
+    exit_price = np.where(expired, 0.0, np.nan)
+    exit_price[has_exit] = prices[exit_row[has_exit]]
+    exit_ts = np.full(n, np.nan)
+    exit_ts[has_exit] = path_ts[exit_row[has_exit]]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = exit_price / entry - 1
+
+    return pd.DataFrame({
+        "symbol": signals["symbol"],
+        "trend": signals["trend"],
+        "bucket": signals["bucket"],
+        "option_type": signals["option_type"],
+        "strike": signals["strike"],
+        "expiration_date": signals["expiration_date"],
+        "entry_ts": signal_ts,
+        "entry": entry,
+        "score": signals["score"],
+        "tp": tp,
+        "sl": sl,
+        "outcome": outcome,
+        "exit_price": exit_price,
+        "return": returns,
+        "holding_hours": (exit_ts - signal_ts) / 3600,
+        "path_len": lengths,
+    })
+
+
+def summarize(results: pd.DataFrame, by="symbol") -> pd.DataFrame:
+    """
+    ملخص لكل مجموعة: عدد الإشارات، نسبة كل نتيجة، ومتوسط العائد ونسبة الربح للصفقات المغلقة.
+    by: عمود أو قائمة أعمدة؛ "decile" = عُشر التقييم (10 = الأعلى).
+    """
+    frame = results.copy()
+    by = [by] if isinstance(by, str) else list(by)
+    if "decile" in by and len(frame):
+        frame["decile"] = pd.qcut(frame["score"].rank(method="first"), min(10, len(frame)), labels=False) + 1
+    closed = frame["outcome"] != "open"
+    for outcome in OUTCOMES:
+        frame[f"{outcome}_rate"] = frame["outcome"] == outcome
+    frame["closed_return"] = frame["return"].where(closed)
+    frame["win"] = (frame["return"] > 0).astype(float).where(closed)
+
+    summary = frame.groupby(by).agg(
+        signals=("outcome", "size"),
+        **{f"{o}_rate": (f"{o}_rate", "mean") for o in OUTCOMES},
+        avg_return=("closed_return", "mean"),
+        win_rate=("win", "mean"),
+        avg_hold_hours=("holding_hours", "mean"),
+    )
+    return summary.round(3)
+
+
+def run_backtest(symbols=None, start=None, end=None, trends=("up", "down"), signals_path: str = None,
+                 price: str = "bid", tp_mult: float = TP_MULTIPLIER, sl_mult: float = SL_MULTIPLIER,
+                 root: str = None) -> pd.DataFrame:
+    """تحميل المسارات من الأرشيف، بناء الإشارات، وتقييمها."""
+    from core import archive
+
+    paths = archive.read_arrays(symbols, start, end, root=root)
+    if signals_path:
+        signals = signals_from_jsonl(signals_path)
+        keep = np.isin(signals["trend"], list(trends))
+        signals = {name: values[keep] for name, values in signals.items()}
+    else:
+        signals = signals_from_archive(paths, trends)
+    print(f"📼 {len(paths['ts'])} صف من الأرشيف، {len(signals['ts'])} إشارة")
+    return evaluate(signals, paths, price, tp_mult, sl_mult)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="اختبار خلفي لقاعدة TP/SL على الأرشيف")
+    parser.add_argument("--root", help="مجلد الأرشيف (الافتراضي: MAZ_ARCHIVE_DIR)")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--start", help="أول يوم (YYYY-MM-DD)")
+    parser.add_argument("--end", help="آخر يوم (YYYY-MM-DD)")
+    parser.add_argument("--trend", choices=["up", "down", "both"], default="both")
+    parser.add_argument("--signals", help="ملف JSONL من main.py --format jsonl بدل إعادة إنتاج الإشارات")
+    parser.add_argument("--price", choices=["bid", "mid", "last"], default="bid", help="سعر الخروج")
+    parser.add_argument("--tp", type=float, default=TP_MULTIPLIER, help="هدف الربح كمضاعف لسعر الدخول")
+    parser.add_argument("--sl", type=float, default=SL_MULTIPLIER, help="وقف الخسارة كمضاعف لسعر الدخول")
+    parser.add_argument("--by", nargs="*", default=["symbol", "bucket", "decile"],
+                        help="ملخص لكل عمود (symbol / bucket / decile / trend)")
+    parser.add_argument("--output", help="حفظ نتيجة كل إشارة كملف CSV")
+    args = parser.parse_args()
+
+    trends = ("up", "down") if args.trend == "both" else (args.trend,)
+    results = run_backtest(args.symbols, args.start, args.end, trends, args.signals,
+                           args.price, args.tp, args.sl, args.root)
+    if results.empty:
+        print("لا توجد إشارات في النطاق المحدد")
+        return
+
+    print(f"\n📊 الإجمالي (TP ×{args.tp} / SL ×{args.sl}, الخروج بـ {args.price})")
+    print(results["outcome"].value_counts(normalize=True).round(3).to_string())
+    for column in args.by:
+        print(f"\n— حسب {column} —")
+        print(summarize(results, column).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n✅ تم حفظ {len(results)} نتيجة في {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,29 +4,26 @@ discord_alerts.py
 إرسال التنبيهات إلى قنوات Discord عبر Webhooks.
 """
 
-import os
-import requests
-from dotenv import load_dotenv
-
-# تحميل متغيرات البيئة
-load_dotenv()
-
-# الحصول على Webhook URL من .env
-DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
+from core import metrics
+from core.settings import get_settings
 
 
+@metrics.timed("alerts")
 def send_discord_message_simple(message: str) -> dict:
     """
     إرسال رسالة بسيطة (بدون Embed) إلى Discord.
     """
-    if not DISCORD_WEBHOOK_URL:
+    webhook_url = get_settings().discord_webhook_url
+    if not webhook_url:
         error_msg = "❌ خطأ: لم يتم تعيين DISCORD_WEBHOOK_URL في ملف .env"
         print(error_msg)
         return {"error": error_msg}
 
     try:
+        import requests
+
         payload = {"content": message[:2000]}  # حد Discord للـ content
-        response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
+        response = requests.post(webhook_url, json=payload, timeout=10)
         
         if response.status_code in [200, 204]:
             print("✅ تم إرسال الرسالة إلى Discord بنجاح!")
@@ -42,16 +39,20 @@ def send_discord_message_simple(message: str) -> dict:
         return {"error": error_msg}
 
 
+@metrics.timed("alerts")
 def send_discord_message(message: str, title: str = "Option Scanner Alert") -> dict:
     """
     إرسال رسالة إلى Discord عبر Webhook (بنمط Embed).
     """
-    if not DISCORD_WEBHOOK_URL:
+    webhook_url = get_settings().discord_webhook_url
+    if not webhook_url:
         error_msg = "❌ خطأ: لم يتم تعيين DISCORD_WEBHOOK_URL في ملف .env"
         print(error_msg)
         return {"error": error_msg}
 
     try:
+        import requests
+
         # تنسيق الرسالة كـ Embed
         embed = {
             "title": title,
@@ -61,7 +62,7 @@ def send_discord_message(message: str, title: str = "Option Scanner Alert") -> d
         }
         
         payload = {"embeds": [embed]}
-        response = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
+        response = requests.post(webhook_url, json=payload, timeout=10)
         result = response.json() if response.status_code != 204 else {"ok": True}
         
         if response.status_code in [200, 204]:
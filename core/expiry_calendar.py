@@ -0,0 +1,101 @@
+"""
+expiry_calendar.py
+------------------
+تقويم البورصة الأمريكية: العطل الرسمية (NYSE) وتواريخ الانتهاء الشهرية القياسية.
+كل سنة تُحسب مرة واحدة فقط ثم تُقرأ من الذاكرة.
+
+الانتهاء الشهري القياسي = الجمعة الثالثة من الشهر، وإذا كانت عطلة
+(مثل Good Friday أو Juneteenth) ينتقل الانتهاء إلى الخميس الذي قبلها.
+
+شرائح DTE (الأيام حتى الانتهاء) تُستخدم لتصنيف العقود في الفحص والاختبار الخلفي.
+"""
+
+from datetime import date, timedelta
+from functools import lru_cache
+
+# شرائح الأيام حتى الانتهاء: (الحد الأعلى الشامل، الاسم)؛ ما بعد آخر حد = LONG_DTE_BUCKET
+DTE_BUCKETS = ((7, "weekly"), (21, "near"), (45, "monthly"), (100, "quarterly"))
+LONG_DTE_BUCKET = "long"
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """اليوم رقم n من نوع weekday في الشهر (n=-1 للأخير)."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    """السبت → الجمعة، الأحد → الإثنين."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def good_friday(year: int) -> date:
+    """الجمعة العظيمة (خوارزمية عيد الفصح الغريغوري)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day) - timedelta(days=2)
+
+
+@lru_cache(maxsize=None)
+def market_holidays(year: int) -> frozenset:
+    """عطل NYSE الكاملة لسنة معينة."""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),    # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),    # Presidents' Day
+        good_friday(year),
+        _nth_weekday(year, 5, 0, -1),   # Memorial Day
+        _observed(date(year, 7, 4)),    # Independence Day
+        _nth_weekday(year, 9, 0, 1),    # Labor Day
+        _nth_weekday(year, 11, 3, 4),   # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # رأس السنة: لا تعويض إذا وقع يوم السبت
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(holidays)
+
+
+def is_trading_day(d: date) -> bool:
+    return d.weekday() < 5 and d not in market_holidays(d.year)
+
+
+@lru_cache(maxsize=None)
+def monthly_expiries(year: int) -> frozenset:
+    """تواريخ الانتهاء الشهرية القياسية لسنة كاملة."""
+    expiries = set()
+    for month in range(1, 13):
+        d = _nth_weekday(year, month, 4, 3)
+        while not is_trading_day(d):
+            d -= timedelta(days=1)
+        expiries.add(d)
+    return frozenset(expiries)
+
+
+def is_standard_monthly(d: date) -> bool:
+    return d in monthly_expiries(d.year)
+
+
+def dte_bucket(days: int) -> str:
+    """اسم شريحة DTE لعقد ينتهي بعد days يوم."""
+    for limit, name in DTE_BUCKETS:
+        if days <= limit:
+            return name
+    return LONG_DTE_BUCKET
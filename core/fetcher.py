@@ -1,136 +1,225 @@
 """
 fetcher.py
 ----------
-جلب تواريخ انتهاء الخيارات وبيانات العقود من yfinance.
+جلب تواريخ انتهاء الخيارات وبيانات العقود من مصدر البيانات الحالي (yfinance افتراضيًا).
 """
 
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Optional, Tuple
 
+from core import archive, metrics, negative_cache, quotes, singleflight
+from core.expiry_calendar import is_standard_monthly
+from core.providers import get_provider
+from core.settings import get_settings
+
+
+# كاش يومي لكل سهم: symbol -> {"day", "expirations", "resolved"}
+# قائمة الانتهاءات لا تتغير خلال اليوم، فيكفي طلب واحد لكل سهم في اليوم.
+_expiration_cache = {}
+
+
+def _cached_entry(symbol: str) -> Optional[dict]:
+    entry = _expiration_cache.get(symbol)
+    if entry and entry["day"] == get_provider().today():
+        return entry
+    return None
+
+
+def clear_expiration_cache():
+    _expiration_cache.clear()
+
 
 def get_expirations(symbol: str) -> List[str]:
     """
     يُرجع قائمة بتواريخ انتهاء الخيارات المتاحة للسهم.
+    النتيجة تُخزن حتى تغيّر اليوم؛ الأخطاء لا تُخزن.
     """
+    entry = _cached_entry(symbol)
+    if entry:
+        metrics.cache_hit("expirations")
+        return entry["expirations"]
+    metrics.cache_miss("expirations")
+
     try:
-        ticker = yf.Ticker(symbol)
-        expirations = ticker.options  # tuple of strings in 'YYYY-MM-DD'
-        return list(expirations) if expirations else []
+        with metrics.timer("expirations"):
+            expirations = get_provider().get_expirations(symbol)
     except Exception as e:
+        metrics.incr("errors.expirations")
+        negative_cache.record(symbol, "error")
         print(f"❌ خطأ في جلب تواريخ الانتهاء لـ {symbol}: {e}")
         return []
 
+    _expiration_cache[symbol] = {"day": get_provider().today(), "expirations": expirations, "resolved": None}
+    return expirations
+
+
+def _resolve_weekly_and_monthly(expirations: List[str], today) -> Tuple[Optional[str], Optional[str]]:
+    dates = sorted(datetime.strptime(d, "%Y-%m-%d").date() for d in expirations)
+
+    # البحث عن Weekly (ضمن 7 أيام)
+    weekly = None
+    for d in dates:
+        days_diff = (d - today).days
+        if 0 <= days_diff <= 7:
+            weekly = d.strftime("%Y-%m-%d")
+            break
+
+    # البحث عن Monthly: أول انتهاء شهري قياسي (الجمعة الثالثة، أو الخميس قبلها إذا كانت عطلة)
+    monthly = None
+    for d in dates:
+        if d >= today and is_standard_monthly(d):
+            monthly = d.strftime("%Y-%m-%d")
+            break
+
+    # احتياطي: الجمعة الثالثة أو الرابعة (للرموز ذات التقويم غير القياسي)
+    if monthly is None:
+        for d in dates:
+            if d.weekday() == 4 and (d.day - 1) // 7 + 1 in [3, 4]:
+                monthly = d.strftime("%Y-%m-%d")
+                break
+
+    return weekly, monthly
+
 
 def get_weekly_and_monthly_expirations(symbol: str) -> Tuple[Optional[str], Optional[str]]:
     """
     يُرجع تاريخين:
     - weekly: أقرب انتهاء (خلال 7 أيام)
-    - monthly: انتهاء يوم الجمعة الثالث (أو الرابع) من الشهر
+    - monthly: أول انتهاء شهري قياسي (الجمعة الثالثة من الشهر)
+    بعد أول استدعاء في اليوم تصبح النتيجة مجرد قراءة من القاموس.
     """
     expirations = get_expirations(symbol)
     if not expirations:
         return None, None
 
+    entry = _cached_entry(symbol)
+    if entry and entry["resolved"] is not None:
+        return entry["resolved"]
+
     try:
-        today = datetime.today().date()
-        dates = [datetime.strptime(d, "%Y-%m-%d").date() for d in expirations]
-        dates.sort()
-        
-        # البحث عن Weekly (ضمن 7 أيام)
-        weekly = None
-        for d in dates:
-            days_diff = (d - today).days
-            if 0 <= days_diff <= 7:
-                weekly = d.strftime("%Y-%m-%d")
-                break
-        
-        # البحث عن Monthly (الجمعة الثالثة أو الرابعة)
-        monthly = None
-        for d in dates:
-            if d.weekday() == 4:  # الجمعة
-                # التحقق إذا كانت الجمعة الثالثة أو الرابعة من الشهر
-                first_day = d.replace(day=1)
-                # حساب رقم الأسبوع في الشهر
-                week_number = (d.day - 1) // 7 + 1
-                if week_number in [3, 4]:
-                    monthly = d.strftime("%Y-%m-%d")
-                    break
-        
-        return weekly, monthly
+        resolved = _resolve_weekly_and_monthly(expirations, get_provider().today())
     except Exception as e:
         print(f"❌ خطأ في تصنيف التواريخ لـ {symbol}: {e}")
         return None, None
 
+    if entry:
+        entry["resolved"] = resolved
+    return resolved
+
+
+def get_expirations_within(symbol: str, max_dte: int) -> List[str]:
+    """
+    كل تواريخ الانتهاء من اليوم حتى max_dte يوم (مرتبة)، لوضع الهيكل الزمني الكامل.
+    تُقرأ من نفس الكاش اليومي لـ get_expirations.
+    """
+    today = get_provider().today()
+    within = []
+    for d in sorted(get_expirations(symbol)):
+        try:
+            days = (datetime.strptime(d, "%Y-%m-%d").date() - today).days
+        except ValueError:
+            continue
+        if 0 <= days <= max_dte:
+            within.append(d)
+    return within
+
 
-def fetch_options_for_expiration(symbol: str, expiration: str) -> list:
+def _current_price(symbol: str) -> float:
+    # السعر الحالي من مرحلة الأسعار المجمّعة، وإلا آخر سعر تداول للرمز وحده
+    current_price = quotes.get_cached_spot(symbol)
+    if current_price is None:
+        with metrics.timer("spot"):
+            current_price = get_provider().get_spot(symbol)
+    return current_price
+
+
+# أعمدة سلسلة المزود المستخدمة والقيمة الافتراضية إذا غاب العمود
+_CHAIN_FIELDS = (("strike", 0), ("bid", 0), ("ask", 0), ("volume", 0),
+                 ("openInterest", 0), ("impliedVolatility", 0.0))
+
+
+def _chain_contracts(symbol: str, expiration: str, option_type: str, frame, current_price: float) -> list:
+    """
+    عقود جانب واحد من السلسلة. القيم تُقرأ عمودًا عمودًا (tolist) بدل iterrows،
+    وهو ما يجعل جلب عشرات تواريخ الانتهاء في وضع الهيكل الزمني رخيصًا.
+    """
+    n = len(frame)
+    columns = [frame[source].tolist() if source in frame else [default] * n for source, default in _CHAIN_FIELDS]
+    return [
+        {
+            "underlying_symbol": symbol,
+            "option_type": option_type,
+            "strike": strike,
+            "expiration_date": expiration,
+            "bid": bid,
+            "ask": ask,
+            "volume": volume,
+            "open_interest": oi,
+            "implied_volatility": iv,
+            "underlying_price": current_price  # ← السعر الحقيقي الآن!
+        }
+        for strike, bid, ask, volume, oi, iv in zip(*columns)
+    ]
+
+
+# الطلبات المتزامنة لنفس السلسلة تشترك في جلب واحد؛ كل منتظر يأخذ نسخة من العقود
+_chain_flights = singleflight.Group("chains", share=lambda contracts: [dict(c) for c in contracts])
+
+
+def fetch_options_for_expiration(symbol: str, expiration: str, current_price: float = None) -> list:
     """
     جلب جميع عقود Call و Put لتاريخ انتهاء معين.
     يُضمن أن كل عقد يحتوي على السعر الحالي للسهم (underlying_price).
+    الاستدعاءات المتزامنة لنفس (السهم، التاريخ، السعر) تنتظر الجلب الجاري بدل تكراره.
     """
+    return _chain_flights.do((symbol, expiration, current_price),
+                             _fetch_options_for_expiration, symbol, expiration, current_price)
+
+
+def _fetch_options_for_expiration(symbol: str, expiration: str, current_price: float = None) -> list:
     try:
-        ticker = yf.Ticker(symbol)
-        
-        # جلب السعر الحالي بدقة (آخر سعر تداول)
-        hist = ticker.history(period="1d")
-        if not hist.empty:
-            current_price = hist['Close'].iloc[-1]
-        else:
-            # إذا فشل، نحاول period="5d"
-            hist = ticker.history(period="5d")
-            current_price = hist['Close'].iloc[-1] if not hist.empty else 0.0
-
-        opt_chain = ticker.option_chain(expiration)
-        calls = opt_chain.calls
-        puts = opt_chain.puts
-
-        contracts = []
-        
-        # معالجة عقود Call
-        for _, row in calls.iterrows():
-            strike = row.get('strike', 0)
-            bid = row.get('bid', 0)
-            ask = row.get('ask', 0)
-            volume = row.get('volume', 0)
-            oi = row.get('openInterest', 0)
-            iv = row.get('impliedVolatility', 0.0)
-
-            contracts.append({
-                "underlying_symbol": symbol,
-                "option_type": "call",
-                "strike": strike,
-                "expiration_date": expiration,
-                "bid": bid,
-                "ask": ask,
-                "volume": volume,
-                "open_interest": oi,
-                "implied_volatility": iv,
-                "underlying_price": current_price  # ← السعر الحقيقي الآن!
-            })
-        
-        # معالجة عقود Put
-        for _, row in puts.iterrows():
-            strike = row.get('strike', 0)
-            bid = row.get('bid', 0)
-            ask = row.get('ask', 0)
-            volume = row.get('volume', 0)
-            oi = row.get('openInterest', 0)
-            iv = row.get('impliedVolatility', 0.0)
-
-            contracts.append({
-                "underlying_symbol": symbol,
-                "option_type": "put",
-                "strike": strike,
-                "expiration_date": expiration,
-                "bid": bid,
-                "ask": ask,
-                "volume": volume,
-                "open_interest": oi,
-                "implied_volatility": iv,
-                "underlying_price": current_price  # ← السعر الحقيقي الآن!
-            })
-            
+        provider = get_provider()
+        if current_price is None:
+            current_price = _current_price(symbol)
+
+        with metrics.timer("chains"):
+            calls, puts = provider.get_chain(symbol, expiration)
+        archive.record_chain(symbol, expiration, calls, puts, current_price)
+
+        # معالجة عقود Call ثم Put
+        contracts = _chain_contracts(symbol, expiration, "call", calls, current_price)
+        contracts += _chain_contracts(symbol, expiration, "put", puts, current_price)
+
+        metrics.incr("contracts.fetched", len(contracts))
         return contracts
     except Exception as e:
+        metrics.incr("errors.chains")
+        negative_cache.record(symbol, "error")
         print(f"❌ خطأ في جلب خيارات {symbol} بتاريخ {expiration}: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+def fetch_options_for_expirations(symbol: str, expirations: List[str], workers: int = None) -> list:
+    """
+    جلب عدة تواريخ انتهاء بالتوازي كقائمة عقود واحدة (بترتيب التواريخ)، بسعر سهم واحد لكلها.
+    المنظّم المشترك (core/governor) يضبط معدل الطلبات، فـ workers يحدد التداخل فقط.
+    """
+    if not expirations:
+        return []
+    try:
+        current_price = _current_price(symbol)
+    except Exception as e:
+        metrics.incr("errors.chains")
+        negative_cache.record(symbol, "error")
+        print(f"❌ خطأ في جلب سعر {symbol}: {e}")
+        return []
+
+    workers = min(workers or get_settings().chain_workers, len(expirations))
+    fetch = lambda expiration: fetch_options_for_expiration(symbol, expiration, current_price)
+    if workers <= 1:
+        chains = [fetch(expiration) for expiration in expirations]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chains") as executor:
+            chains = list(executor.map(fetch, expirations))
+    return [c for chain in chains for c in chain]
@@ -0,0 +1,218 @@
+"""
+gamma_exposure.py
+-----------------
+تموضع جاما لدى صناع السوق (GEX) و Max Pain لكل سهم من السلاسل التي يجلبها الفحص أصلًا
+(كل الـ Strikes بالـ OI، بدل رميها بعد اختيار أفضل العقود).
+
+- GEX لكل عقد (بالدولار لكل حركة 1% في السهم):
+      gamma × OI × 100 × S² × 0.01      موجب للـ Call وسالب للـ Put
+  (الافتراض المعتاد: صناع السوق طويلون Calls وقصيرون Puts). gamma من Black-Scholes بـ IV العقد.
+- GEX حسب الـ Strike: مجموع العقود لكل Strike (np.bincount)، وصافي GEX = مجموع الكل.
+- Gamma flip: مستوى السهم الذي تنقلب عنده إشارة صافي GEX؛ يُقيَّم صافي GEX على
+  شبكة أسعار حول السعر الحالي (مصفوفة مستويات × عقود)، ثم شبكة أدق داخل أقرب تقاطع للصفر
+  واستكمال خطي.
+- Max pain لكل تاريخ انتهاء: الـ Strike الذي يقل عنده إجمالي قيمة العقود عند الانتهاء،
+  لكل الـ Strikes دفعة واحدة بمجاميع تراكمية على الـ OI المرتب حسب الـ Strike.
+
+كل عقد يأخذ gamma_flip و max_pain (لتاريخ انتهائه) حتى تظهر في مخرجات الفحص.
+
+الكاش: نتيجة لكل سهم مع بصمة السلسلة (rules.chain_version)؛ لا يعاد الحساب إلا إذا تغيرت.
+
+الاستخدام:
+    profile = compute_symbol("SPY", contracts)
+    profile["net_gex"], profile["gamma_flip"], profile["max_pain"]["2026-10-23"]
+    compute_universe({"SPY": [...], "QQQ": [...]})
+"""
+
+import math
+import threading
+
+import numpy as np
+
+from core import metrics
+from core.rules import chain_version, to_arrays
+
+CONTRACT_SIZE = 100
+MIN_DAYS = 0.5
+FLIP_RANGE = 0.2      # شبكة Gamma flip: ±20% حول السعر الحالي
+FLIP_STEPS = 81
+REFINE_STEPS = 21
+
+FIELDS = ("gamma_flip", "max_pain")
+
+_lock = threading.Lock()
+_profiles = {}  # symbol -> آخر نتيجة
+
+
+def _gamma(spot, strike, t, sigma):
+    """جاما Black-Scholes بفائدة صفرية (spot قد يكون مصفوفة مستويات × عقود)."""
+    vol_t = sigma * np.sqrt(t)
+    d1 = (np.log(spot / strike) + 0.5 * vol_t * vol_t) / vol_t
+    return np.exp(-0.5 * d1 * d1) / (math.sqrt(2 * math.pi) * spot * vol_t)
+
+
+def _exposure(a: dict):
+    """(العقود الصالحة، الإشارة × OI، strike، t، sigma) لحساب GEX."""
+    strike, sigma = a["strike"], a["implied_volatility"]
+    oi = np.nan_to_num(a["open_interest"])
+    with np.errstate(invalid="ignore"):
+        valid = (oi > 0) & (strike > 0) & (sigma > 0) & np.isfinite(sigma) & (a["days"] >= 0)
+    sign = np.where(a["option_type"] == "call", 1.0, -1.0)
+    t = np.maximum(a["days"], MIN_DAYS) / 365
+    return valid, (sign * oi)[valid], strike[valid], t[valid], sigma[valid]
+
+
+def _net_gex(levels, signed_oi, strike, t, sigma):
+    """صافي GEX عند كل مستوى سعر في levels (متجه)."""
+    spot = levels[:, None]
+    with np.errstate(all="ignore"):
+        gamma = np.nan_to_num(_gamma(spot, strike, t, sigma))
+    return (gamma * signed_oi).sum(axis=1) * CONTRACT_SIZE * levels ** 2 * 0.01
+
+
+def _gamma_flip(spot, signed_oi, strike, t, sigma):
+    """أقرب مستوى للسعر الحالي ينقلب عنده صافي GEX (None إذا لم ينقلب داخل الشبكة)."""
+    levels = spot * np.linspace(1 - FLIP_RANGE, 1 + FLIP_RANGE, FLIP_STEPS)
+    net = _net_gex(levels, signed_oi, strike, t, sigma)
+    crossing = np.flatnonzero(np.sign(net[:-1]) * np.sign(net[1:]) < 0)
+    if not len(crossing):
+        return None
+    i = crossing[np.argmin(np.abs(levels[crossing] - spot))]
+    # تمريرة ثانية أدق داخل فترة التقاطع
+    levels = np.linspace(levels[i], levels[i + 1], REFINE_STEPS)
+    net = _net_gex(levels, signed_oi, strike, t, sigma)
+    i = min(int(np.flatnonzero(np.sign(net[:-1]) * np.sign(net[1:]) <= 0)[0]), len(levels) - 2)
+    flip = levels[i] - net[i] * (levels[i + 1] - levels[i]) / (net[i + 1] - net[i])
+    return round(float(flip), 2)
+
+
+def _pain_curve(strike, call_oi, put_oi):
+    """(Strikes، إجمالي قيمة العقود عند الانتهاء لو أُغلق السهم عند كل Strike) بمجاميع تراكمية."""
+    strikes, idx = np.unique(strike, return_inverse=True)
+    calls = np.bincount(idx, weights=call_oi, minlength=len(strikes))
+    puts = np.bincount(idx, weights=put_oi, minlength=len(strikes))
+    # Calls تحت الـ Strike: Σ oi × (K - k)؛ Puts فوقه: Σ oi × (k - K)
+    call_pain = strikes * np.cumsum(calls) - np.cumsum(calls * strikes)
+    put_tail, put_tail_k = np.cumsum(puts[::-1])[::-1], np.cumsum((puts * strikes)[::-1])[::-1]
+    put_pain = put_tail_k - strikes * put_tail
+    return strikes, call_pain + put_pain
+
+
+def _max_pain(a: dict) -> dict:
+    """{تاريخ الانتهاء: الـ Strike الذي يقل عنده إجمالي قيمة العقود عند الانتهاء}."""
+    oi = np.nan_to_num(a["open_interest"])
+    usable = (oi > 0) & np.isfinite(a["strike"]) & (a["days"] >= 0)
+    is_call = a["option_type"] == "call"
+    call_oi, put_oi = np.where(is_call, oi, 0.0), np.where(is_call, 0.0, oi)
+    expirations = a["expiration_date"]
+    result = {}
+    for exp in np.unique(expirations[usable]):
+        rows = usable & (expirations == exp)
+        strikes, pain = _pain_curve(a["strike"][rows], call_oi[rows], put_oi[rows])
+        result[str(exp)] = float(strikes[np.argmin(pain)])
+    return result
+
+
+def _build_profile(symbol: str, version: int, a: dict) -> dict:
+    spot = float(np.nanmedian(a["underlying_price"])) if len(a["underlying_price"]) else float("nan")
+    _, signed_oi, strike, t, sigma = _exposure(a)
+    with np.errstate(all="ignore"):
+        gex = np.nan_to_num(_gamma(spot, strike, t, sigma)) * signed_oi * CONTRACT_SIZE * spot ** 2 * 0.01
+    strikes, by_strike = np.unique(strike, return_inverse=True)
+    gex_by_strike = np.bincount(by_strike, weights=gex, minlength=len(strikes))
+    calls = signed_oi > 0
+    ok = spot > 0 and len(gex)
+    return {
+        "symbol": symbol,
+        "version": version,
+        "spot": spot,
+        "strikes": strikes,
+        "gex_by_strike": gex_by_strike,
+        "net_gex": float(gex.sum()) if ok else 0.0,
+        "call_gex": float(gex[calls].sum()) if ok else 0.0,
+        "put_gex": float(gex[~calls].sum()) if ok else 0.0,
+        "gamma_flip": _gamma_flip(spot, signed_oi, strike, t, sigma) if ok else None,
+        "max_pain": _max_pain(a),
+    }
+
+
+def _annotate(contracts: list, profile: dict):
+    max_pain = profile["max_pain"]
+    for c in contracts:
+        c["gamma_flip"] = profile["gamma_flip"]
+        c["max_pain"] = max_pain.get(c.get("expiration_date"))
+
+
+@metrics.timed("gamma_exposure")
+def compute_symbol(symbol: str, contracts: list, today=None) -> dict:
+    """
+    GEX حسب الـ Strike و Gamma flip و Max pain لسلسلة السهم، ويضيف gamma_flip و max_pain لكل عقد.
+    إذا لم تتغير السلسلة منذ آخر حساب تُعاد النتيجة المحفوظة كما هي.
+    """
+    if not contracts:
+        return None
+    a = to_arrays(contracts, today)
+    version = chain_version(a)
+    with _lock:
+        profile = _profiles.get(symbol)
+    if profile is not None and profile["version"] == version:
+        metrics.cache_hit("gamma_exposure")
+    else:
+        metrics.cache_miss("gamma_exposure")
+        a["expiration_date"] = np.array([c.get("expiration_date") or "" for c in contracts], dtype=object)
+        profile = _build_profile(symbol, version, a)
+        with _lock:
+            _profiles[symbol] = profile
+    _annotate(contracts, profile)
+    return profile
+
+
+def compute_universe(chains: dict, today=None) -> dict:
+    """نتائج كل الأسهم {symbol: contracts} (الأسهم التي لم تتغير سلسلتها من الكاش)."""
+    profiles = {}
+    for symbol, contracts in chains.items():
+        profile = compute_symbol(symbol, contracts, today)
+        if profile is not None:
+            profiles[symbol] = profile
+    return profiles
+
+
+def get_profile(symbol: str) -> dict:
+    """آخر نتيجة محسوبة للسهم (None إذا لم يُفحص بعد)."""
+    with _lock:
+        return _profiles.get(symbol)
+
+
+def clear():
+    with _lock:
+        _profiles.clear()
+
+
+def _dollars(value: float) -> str:
+    sign = "-" if value < 0 else "+"
+    for unit, scale in (("B", 1e9), ("M", 1e6), ("K", 1e3)):
+        if abs(value) >= scale:
+            return f"{sign}${abs(value) / scale:,.2f}{unit}"
+    return f"{sign}${abs(value):,.0f}"
+
+
+def format_block(profile: dict, expirations=()) -> str:
+    """قسم تموضع جاما في تنبيه الإشارة (فارغ إذا لا توجد نتيجة)."""
+    if not profile:
+        return ""
+    regime = "موجب (تقلب مكبوح)" if profile["net_gex"] >= 0 else "سالب (تقلب مضخّم)"
+    lines = [
+        "\n🧲 تموضع جاما (GEX):",
+        f"- صافي GEX: {_dollars(profile['net_gex'])} لكل 1% — {regime}",
+    ]
+    if profile["gamma_flip"] is not None:
+        side = "فوق" if profile["spot"] >= profile["gamma_flip"] else "تحت"
+        lines.append(f"- Gamma flip: {profile['gamma_flip']} (السعر {side}ه)")
+    if len(profile["strikes"]):
+        top = int(np.argmax(np.abs(profile["gex_by_strike"])))
+        lines.append(f"- أكبر تركّز: Strike {profile['strikes'][top]} "
+                     f"({_dollars(float(profile['gex_by_strike'][top]))})")
+    for exp in expirations:
+        if exp in profile["max_pain"]:
+            lines.append(f"- Max pain ({exp}): {profile['max_pain'][exp]}")
+    return "\n".join(lines) + "\n"
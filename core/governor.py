@@ -0,0 +1,275 @@
+"""
+governor.py
+-----------
+منظّم مشترك لكل طلبات yfinance:
+
+- Token bucket يتكيف مع الخنق: يخفض المعدل للنصف عند 429 ويرفعه تدريجيًا مع النجاح (AIMD).
+- مهلة قصوى لكل استدعاء حتى لا يوقف طلب معلّق الفحص بالكامل. الخيط المعلّق لا يمكن إيقافه،
+  فإذا تعلّق ربع خيوط المجموعة تُستبدل بمجموعة جديدة وتُترك القديمة تنتهي وحدها.
+- إعادة المحاولة مع تأخير أسي عشوائي (full jitter).
+- قاطع دائرة لكل سهم: بعد عدة إخفاقات متتالية نتوقف عن طلبه لفترة تهدئة، ثم نسمح بمحاولة
+  اختبار واحدة فقط (half-open) حتى تنجح أو تفشل.
+
+كل سهم فشل أو تم تخطيه يُسجل في degraded_symbols() ليظهر في تقرير الفحص.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from core import metrics
+from core.settings import get_settings
+
+HUNG_REPLACE_FRACTION = 0.25  # نسبة الخيوط المعلّقة التي تُستبدل عندها مجموعة الخيوط
+
+
+class RateLimitError(Exception):
+    """Yahoo أعاد 429 / Too Many Requests."""
+
+
+class CallTimeout(Exception):
+    """تجاوز الاستدعاء المهلة المحددة."""
+
+
+class CircuitOpenError(Exception):
+    """قاطع الدائرة مفتوح لهذا السهم."""
+
+
+# أخطاء منطقية لا فائدة من إعادة محاولتها (مثل تاريخ انتهاء غير موجود)
+_NON_RETRYABLE = (ValueError, KeyError, TypeError, IndexError)
+
+
+def _is_throttle(e: Exception) -> bool:
+    text = f"{type(e).__name__} {e}".lower()
+    return isinstance(e, RateLimitError) or "ratelimit" in text or "429" in text or "too many requests" in text
+
+
+class AdaptiveTokenBucket:
+    """Token bucket بمعدل متغير: زيادة جمعية عند النجاح، ونقص ضربي عند الخنق."""
+
+    def __init__(self, rate: float = 5.0, capacity: float = 10.0, min_rate: float = 0.5,
+                 max_rate: float = 20.0, increase: float = 0.2, decrease: float = 0.5):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """انتظار توكن واحد."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class CircuitBreaker:
+    """
+    قاطع دائرة لكل مفتاح (سهم): closed → open → half-open → closed.
+    في half-open يمر مستدعٍ واحد فقط (probe) ويُرفض الباقون حتى يسجل نجاحًا أو فشلًا؛
+    إذا لم يسجل شيئًا خلال cooldown يُسمح بمحاولة اختبار جديدة.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = {}  # key -> {"failures": int, "opened_at": float | None, "probe_at": float | None}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            state = self._state.get(key)
+            if not state or state["opened_at"] is None:
+                return True
+            now = time.monotonic()
+            if now - state["opened_at"] < self.cooldown:
+                return False
+            if state["probe_at"] is not None and now - state["probe_at"] < self.cooldown:
+                return False  # محاولة الاختبار ما زالت جارية
+            # half-open: محاولة واحدة؛ النجاح يغلق القاطع والفشل يعيده مفتوحًا
+            state["probe_at"] = now
+            return True
+
+    def record_success(self, key: str):
+        with self._lock:
+            self._state.pop(key, None)
+
+    def record_failure(self, key: str):
+        with self._lock:
+            state = self._state.setdefault(key, {"failures": 0, "opened_at": None, "probe_at": None})
+            state["failures"] += 1
+            if state["failures"] >= self.failure_threshold:
+                state["opened_at"] = time.monotonic()
+                state["probe_at"] = None
+
+    def open_keys(self) -> list:
+        with self._lock:
+            return [k for k, s in self._state.items() if s["opened_at"] is not None]
+
+
+class Governor:
+    def __init__(self, timeout: float = 10.0, retries: int = 2, backoff_base: float = 0.5,
+                 backoff_cap: float = 8.0, max_workers: int = 16,
+                 bucket: AdaptiveTokenBucket = None, breaker: CircuitBreaker = None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.bucket = bucket or AdaptiveTokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_workers = max_workers
+        self._executor = self._new_executor()
+        self._pool_hung = 0   # استدعاءات معلّقة تشغل خيوط المجموعة الحالية
+        self._hung = 0        # كل الاستدعاءات المعلّقة (بما فيها المجموعات المتروكة)
+        self._degraded = {}  # key -> (reason, timestamp)
+        self._lock = threading.Lock()
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="yf-call")
+
+    def _submit(self, fn, *args, **kwargs):
+        with self._lock:
+            executor = self._executor
+        return executor, executor.submit(fn, *args, **kwargs)
+
+    def _abandon(self, executor, future):
+        """
+        استدعاء تجاوز المهلة وما زال يعمل (future.cancel() لا يوقف خيطًا جاريًا).
+        إذا وصل عدد الخيوط المعلّقة في المجموعة الحالية إلى HUNG_REPLACE_FRACTION منها
+        تُستبدل بمجموعة جديدة؛ القديمة تُغلق بدون انتظار وتنتهي خيوطها عند عودة استدعاءاتها.
+        """
+        threshold = max(1, int(self.max_workers * HUNG_REPLACE_FRACTION))
+        old = None
+        with self._lock:
+            self._hung += 1
+            if executor is self._executor:
+                self._pool_hung += 1
+                if self._pool_hung >= threshold:
+                    old, self._executor, self._pool_hung = self._executor, self._new_executor(), 0
+        metrics.incr("governor.abandoned")
+        future.add_done_callback(lambda _: self._release(executor))
+        if old is not None:
+            metrics.incr("governor.pool_replaced")
+            old.shutdown(wait=False)
+
+    def _release(self, executor):
+        with self._lock:
+            self._hung -= 1
+            if executor is self._executor:
+                self._pool_hung -= 1
+
+    def hung_calls(self) -> int:
+        """عدد الاستدعاءات التي تجاوزت المهلة وما زالت تعمل."""
+        with self._lock:
+            return self._hung
+
+    def _mark_degraded(self, key, reason: str):
+        if key is None:
+            return
+        with self._lock:
+            self._degraded[key] = (reason, time.time())
+
+    def degraded_symbols(self, since: float = None) -> dict:
+        """الرموز التي فشلت أو تم تخطيها: {symbol: reason}، اختياريًا منذ وقت معين."""
+        with self._lock:
+            return {k: reason for k, (reason, ts) in self._degraded.items() if since is None or ts >= since}
+
+    def call(self, key, fn, *args, timeout: float = None, retries: int = None, **kwargs):
+        """
+        تنفيذ fn(*args, **kwargs) تحت المنظّم. key هو رمز السهم (لقاطع الدائرة)،
+        أو None للطلبات المجمّعة التي لا تخص سهمًا واحدًا.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+
+        if key is not None and not self.breaker.allow(key):
+            metrics.incr("governor.circuit_open")
+            self._mark_degraded(key, "circuit_open")
+            raise CircuitOpenError(f"circuit open for {key}")
+
+        last_error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                metrics.incr("governor.retries")
+                time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+
+            # انتظار التوكن لا يُحسب من المهلة (أقصاه 1/min_rate ثانية)
+            self.bucket.acquire()
+            deadline = time.monotonic() + timeout
+            executor, future = self._submit(fn, *args, **kwargs)
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                if not future.cancel():
+                    self._abandon(executor, future)
+                metrics.incr("governor.timeouts")
+                last_error = CallTimeout(f"call exceeded {timeout:.1f}s")
+                continue
+            except _NON_RETRYABLE:
+                # المصدر ردّ (الخطأ في الطلب نفسه): ينهي محاولة الاختبار في half-open
+                if key is not None:
+                    self.breaker.record_success(key)
+                raise
+            except Exception as e:
+                last_error = e
+                if _is_throttle(e):
+                    metrics.incr("governor.throttled")
+                    self.bucket.on_throttle()
+                continue
+
+            self.bucket.on_success()
+            if key is not None:
+                self.breaker.record_success(key)
+            return result
+
+        if key is not None:
+            self.breaker.record_failure(key)
+        if isinstance(last_error, CallTimeout):
+            reason = "timeout"
+        elif _is_throttle(last_error):
+            reason = "throttled"
+        else:
+            reason = "error"
+        self._mark_degraded(key, reason)
+        raise last_error
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> Governor:
+    """المنظّم المشترك (يُنشأ عند أول استخدام، والإعدادات من core.settings)."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            settings = get_settings()
+            _governor = Governor(
+                timeout=settings.call_timeout,
+                retries=settings.call_retries,
+                bucket=AdaptiveTokenBucket(rate=settings.rate_limit),
+            )
+        return _governor
@@ -1,12 +1,14 @@
 """
 indicators.py
 -------------
-حساب المؤشرات الفنية الأساسية باستخدام yfinance.
+حساب المؤشرات الفنية الأساسية من مصدر البيانات الحالي.
 """
 
-import yfinance as yf
 import pandas as pd
 
+from core import metrics, singleflight
+from core.providers import get_provider
+
 
 def calculate_rsi(data: pd.Series, window: int = 14) -> float:
     """حساب مؤشر RSI"""
@@ -24,15 +26,23 @@ def calculate_ma(data: pd.Series, window: int) -> float:
     return ma.iloc[-1] if not ma.empty else 0.0
 
 
+_flights = singleflight.Group("indicators", share=dict)
+
+
 def get_technical_indicators(symbol: str) -> dict:
     """
     جلب المؤشرات الفنية للسهم.
+    الاستدعاءات المتزامنة لنفس السهم تنتظر الحساب الجاري بدل تكراره.
     Returns:
         dict: {'rsi': float, 'ma50': float, 'ma200': float, 'price': float}
     """
+    return _flights.do(symbol, _get_technical_indicators, symbol)
+
+
+def _get_technical_indicators(symbol: str) -> dict:
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="6mo")  # نحتاج 6 أشهر لحساب MA200
+        with metrics.timer("history"):
+            hist = get_provider().get_bars(symbol, "6mo")  # نحتاج 6 أشهر لحساب MA200
         
         if hist.empty or len(hist) < 50:
             return {"rsi": 50.0, "ma50": 0.0, "ma200": 0.0, "price": 0.0}
@@ -4,9 +4,11 @@ iv_analyzer.py
 تحليل التقلب الضمني (Implied Volatility) وتاريخه.
 """
 
-import yfinance as yf
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+from core.fetcher import get_expirations
+from core.providers import get_provider
 
 
 def get_historical_iv(symbol: str, days: int = 365) -> list:
@@ -15,22 +17,20 @@ def get_historical_iv(symbol: str, days: int = 365) -> list:
     ملاحظة: yfinance لا يوفر IV مباشرة، لذا نستخدم تقريبًا عبر خيارات الماضي.
     """
     try:
-        ticker = yf.Ticker(symbol)
+        provider = get_provider()
         # نحاول جلب خيارات لأقرب تاريخ متاح
-        expirations = ticker.options
+        expirations = get_expirations(symbol)
         if not expirations:
             return []
         
         iv_history = []
-        today = datetime.today().date()
+        today = provider.today()
         cutoff_date = today - timedelta(days=days)
         
         # نأخذ أول 3 تواريخ انتهاء كعينة
         for exp in expirations[:3]:
             try:
-                opt = ticker.option_chain(exp)
-                calls = opt.calls
-                puts = opt.puts
+                calls, puts = provider.get_chain(symbol, exp)
                 
                 # جمع IV من العقود ذات السيولة
                 for df in [calls, puts]:
@@ -62,6 +62,19 @@ def calculate_iv_rank(current_iv: float, iv_history: list) -> float:
     return round(rank * 100, 1)  # بنسبة مئوية
 
 
+def calculate_iv_ranks(ivs: list) -> list:
+    """
+    IV Rank لكل قيمة نسبةً إلى القائمة نفسها — نفس calculate_iv_rank(iv, ivs) لكل عنصر،
+    لكن بترتيب واحد + searchsorted بدل مرور كامل على القائمة لكل عقد.
+    """
+    if not ivs:
+        return []
+    values = np.array([np.nan if iv is None else iv for iv in ivs], dtype=float)
+    lower = np.searchsorted(np.sort(values), values, side="left").tolist()
+    return [0.5 if np.isnan(iv) else round(count / len(ivs) * 100, 1)
+            for iv, count in zip(values.tolist(), lower)]
+
+
 def get_iv_analysis(symbol: str, current_iv: float) -> dict:
     """تحليل IV مع التنبيهات"""
     iv_history = get_historical_iv(symbol)
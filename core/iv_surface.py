@@ -0,0 +1,263 @@
+"""
+iv_surface.py
+-------------
+سطح التقلب الضمني لكل سهم من سلاسل الفحص نفسها، لمعرفة هل IV العقد غالٍ أم رخيص
+مقارنة بسهمه بدل مقارنته بهدف ثابت (iv_target = 0.40) لكل الأسهم.
+
+النموذج: ابتسامة تربيعية لكل تاريخ انتهاء في اللوغاريتم المعياري للـ Strike
+
+    iv(k) = a + b·k + c·k²      حيث k = ln(K / S) / √T
+
+- a: IV عند السعر (ATM)، b: الميل (skew)، c: الانحناء.
+- النقاط: جانب OTM فقط (Put تحت السعر، Call فوقه) بأسعار حية و IV معقولة،
+  بوزن log(1 + volume + OI). الانتهاءات ذات النقاط القليلة تُثبّت بتنظيم (ridge)
+  على b و c فتقترب من ابتسامة مسطحة.
+- الملاءمة لكل المجموعات (سهم × تاريخ) دفعة واحدة: مجاميع المعادلات الطبيعية بـ np.bincount
+  ثم np.linalg.solve على مصفوفات 3×3 مكدسة، مع تمريرة ثانية تستبعد النقاط الشاذة.
+- iv_residual = IV العقد - IV السطح عند نفس k: موجب = غالٍ (rich)، سالب = رخيص (cheap).
+
+الكاش: سطح لكل سهم مع بصمة السلسلة (rules.chain_version)؛ لا تُعاد الملاءمة إلا إذا تغيرت.
+
+الاستخدام:
+    surface = fit_symbol("AAPL", contracts)      # يضيف iv_fit و iv_residual لكل عقد
+    fit_universe({"AAPL": [...], "MSFT": [...]})  # كل الأسهم بتمريرة واحدة
+    iv_at("AAPL", [220, 230], [4, 32])           # IV السطح لأي Strike وأيام
+"""
+
+import threading
+
+import numpy as np
+
+from core import metrics
+from core.rules import chain_version, to_arrays
+
+MIN_IV, MAX_IV = 0.01, 5.0
+MAX_LOG_MONEYNESS = 0.5     # |ln(K/S)| أكبر من هذا لا يدخل الملاءمة
+RIDGE = 1e-3                # تنظيم b و c (نسبةً لمجموع الأوزان)
+OUTLIER_SIGMA = 3.0         # التمريرة الثانية تستبعد ما يبعد أكثر من هذا × RMSE
+MIN_DAYS = 0.5
+FAIR_BAND = 0.005           # ±نصف نقطة IV حول السطح = "عادل"
+
+FIELDS = ("iv_fit", "iv_residual")
+
+_lock = threading.Lock()
+_surfaces = {}  # symbol -> آخر سطح
+
+
+def _log_moneyness(a: dict):
+    """(k المعياري، ln(K/S)، T بالسنوات) لكل عقد."""
+    t = np.maximum(a["days"], MIN_DAYS) / 365
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_m = np.log(a["strike"] / a["underlying_price"])
+    return log_m / np.sqrt(t), log_m, t
+
+
+def _fit_points(a: dict, log_m: np.ndarray) -> np.ndarray:
+    """وزن كل نقطة في الملاءمة (0 = لا تدخل)."""
+    iv = a["implied_volatility"]
+    is_call = a["option_type"] == "call"
+    with np.errstate(invalid="ignore"):
+        usable = (
+            (iv > MIN_IV) & (iv < MAX_IV) & (a["bid"] > 0) & (a["ask"] >= a["bid"]) & ~a["incomplete"]
+            & (np.abs(log_m) <= MAX_LOG_MONEYNESS)
+            & np.where(is_call, log_m >= 0, log_m <= 0)
+        )
+    activity = np.nan_to_num(a["volume"]) + np.nan_to_num(a["open_interest"])
+    return np.where(usable, np.log1p(np.maximum(activity, 0)) + 1, 0.0)
+
+
+def _solve(k: np.ndarray, iv: np.ndarray, w: np.ndarray, group: np.ndarray, n_groups: int):
+    """مربعات صغرى موزونة لكل المجموعات: (coef (G,3)، عدد النقاط، RMSE)."""
+    iv = np.where(w > 0, iv, 0.0)
+    k = np.where(w > 0, k, 0.0)
+    sums = [np.bincount(group, w * k ** p, n_groups) for p in range(5)]
+    rhs = np.stack([np.bincount(group, w * k ** p * iv, n_groups) for p in range(3)], axis=1)
+    s0, s1, s2, s3, s4 = sums
+    ridge = RIDGE * s0
+    matrix = np.stack([
+        np.stack([s0, s1, s2], axis=1),
+        np.stack([s1, s2 + ridge, s3], axis=1),
+        np.stack([s2, s3, s4 + ridge], axis=1),
+    ], axis=1)
+
+    coef = np.full((n_groups, 3), np.nan)
+    ok = s0 > 0
+    if ok.any():
+        coef[ok] = np.linalg.solve(matrix[ok], rhs[ok][..., None])[..., 0]
+
+    fitted = coef[group, 0] + coef[group, 1] * k + coef[group, 2] * k * k
+    sq_error = np.bincount(group, w * (iv - np.where(w > 0, fitted, 0.0)) ** 2, n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rmse = np.sqrt(sq_error / s0)
+    points = np.bincount(group, w > 0, n_groups).astype(np.int64)
+    return coef, points, rmse
+
+
+def fit_groups(a: dict, group: np.ndarray, n_groups: int) -> dict:
+    """
+    ملاءمة ابتسامة لكل مجموعة (عادةً سهم × تاريخ انتهاء) على أعمدة to_arrays().
+    يُرجع coef/points/rmse لكل مجموعة و iv_fit/iv_residual لكل عقد (NaN حيث لا يوجد سطح).
+    """
+    k, log_m, _ = _log_moneyness(a)
+    w = _fit_points(a, log_m)
+    iv = a["implied_volatility"]
+
+    coef, points, rmse = _solve(k, iv, w, group, n_groups)
+    # تمريرة ثانية بدون النقاط الشاذة (أسعار قديمة أو IV خاطئ من المزود)
+    with np.errstate(invalid="ignore"):
+        fitted = coef[group, 0] + coef[group, 1] * k + coef[group, 2] * k * k
+        outlier = np.abs(iv - fitted) > OUTLIER_SIGMA * np.maximum(rmse[group], 0.005)
+    if (outlier & (w > 0)).any():
+        coef, points, rmse = _solve(k, iv, np.where(outlier, 0.0, w), group, n_groups)
+
+    with np.errstate(invalid="ignore"):
+        iv_fit = coef[group, 0] + coef[group, 1] * k + coef[group, 2] * k * k
+        valid = np.isfinite(iv_fit) & np.isfinite(k) & (iv_fit > 0)
+        iv_fit = np.where(valid, iv_fit, np.nan)
+    return {"coef": coef, "points": points, "rmse": rmse, "iv_fit": iv_fit, "iv_residual": iv - iv_fit}
+
+
+def _build_surface(symbol: str, version: int, a: dict, group_days: np.ndarray, fit: dict, rows) -> dict:
+    spot = a["underlying_price"][rows]
+    return {
+        "symbol": symbol,
+        "version": version,
+        "spot": float(np.nanmedian(spot)) if len(spot) else float("nan"),
+        "days": group_days,
+        "atm_iv": fit["coef"][:, 0],
+        "skew": fit["coef"][:, 1],
+        "curvature": fit["coef"][:, 2],
+        "points": fit["points"],
+        "rmse": fit["rmse"],
+        "iv_fit": fit["iv_fit"][rows].tolist(),
+        "iv_residual": fit["iv_residual"][rows].tolist(),
+    }
+
+
+def _annotate(contracts: list, surface: dict):
+    for c, iv_fit, residual in zip(contracts, surface["iv_fit"], surface["iv_residual"]):
+        c["iv_fit"] = None if iv_fit != iv_fit else iv_fit
+        c["iv_residual"] = None if residual != residual else residual
+
+
+@metrics.timed("iv_surface")
+def fit_symbol(symbol: str, contracts: list, today=None) -> dict:
+    """
+    سطح السهم من سلسلته الكاملة (كل الأنواع والتواريخ)، ويضيف iv_fit و iv_residual لكل عقد.
+    إذا لم تتغير السلسلة منذ آخر ملاءمة يُعاد استخدام السطح المحفوظ كما هو.
+    """
+    if not contracts:
+        return None
+    a = to_arrays(contracts, today)
+    version = chain_version(a)
+    with _lock:
+        surface = _surfaces.get(symbol)
+    if surface is not None and surface["version"] == version:
+        metrics.cache_hit("iv_surface")
+    else:
+        metrics.cache_miss("iv_surface")
+        group_days, group = np.unique(a["days"], return_inverse=True)
+        fit = fit_groups(a, group, len(group_days))
+        surface = _build_surface(symbol, version, a, group_days, fit, slice(None))
+        with _lock:
+            _surfaces[symbol] = surface
+    _annotate(contracts, surface)
+    return surface
+
+
+@metrics.timed("iv_surface_universe")
+def fit_universe(chains: dict, today=None) -> dict:
+    """
+    أسطح كل الأسهم {symbol: contracts} بتمريرة ملاءمة واحدة (مجموعات سهم × تاريخ).
+    الأسهم التي لم تتغير سلسلتها تؤخذ من الكاش ولا تدخل الملاءمة.
+    """
+    surfaces, pending = {}, []
+    for symbol, contracts in chains.items():
+        if not contracts:
+            continue
+        a = to_arrays(contracts, today)
+        version = chain_version(a)
+        with _lock:
+            cached = _surfaces.get(symbol)
+        if cached is not None and cached["version"] == version:
+            metrics.cache_hit("iv_surface")
+            surfaces[symbol] = cached
+            _annotate(contracts, cached)
+        else:
+            metrics.cache_miss("iv_surface")
+            pending.append((symbol, contracts, a, version))
+    if not pending:
+        return surfaces
+
+    lengths = [len(contracts) for _, contracts, _, _ in pending]
+    merged = {key: np.concatenate([a[key] for _, _, a, _ in pending]) for key in pending[0][2]}
+    symbol_idx = np.repeat(np.arange(len(pending)), lengths)
+    keys = np.stack([symbol_idx, merged["days"]], axis=1)
+    group_keys, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.ravel()
+    fit = fit_groups(merged, group, len(group_keys))
+
+    start = 0
+    for i, (symbol, contracts, a, version) in enumerate(pending):
+        rows = slice(start, start + lengths[i])
+        own = group_keys[:, 0] == i
+        own_fit = {
+            "coef": fit["coef"][own], "points": fit["points"][own], "rmse": fit["rmse"][own],
+            "iv_fit": fit["iv_fit"], "iv_residual": fit["iv_residual"],
+        }
+        surface = _build_surface(symbol, version, merged, group_keys[own, 1], own_fit, rows)
+        with _lock:
+            _surfaces[symbol] = surface
+        surfaces[symbol] = surface
+        _annotate(contracts, surface)
+        start += lengths[i]
+    return surfaces
+
+
+def get_surface(symbol: str) -> dict:
+    """آخر سطح محسوب للسهم (None إذا لم يُفحص بعد)."""
+    with _lock:
+        return _surfaces.get(symbol)
+
+
+def iv_at(symbol: str, strikes, days, spot: float = None) -> np.ndarray:
+    """
+    IV السطح لأي (Strike، أيام): المعاملات تُستكمل خطيًا بين تواريخ الانتهاء المُلاءمة
+    وتُثبّت عند الطرفين. NaN إذا لم يوجد سطح.
+    """
+    strikes = np.asarray(strikes, dtype=float)
+    days = np.broadcast_to(np.asarray(days, dtype=float), strikes.shape)
+    surface = get_surface(symbol)
+    if surface is None:
+        return np.full(strikes.shape, np.nan)
+    fitted = np.isfinite(surface["atm_iv"])
+    if not fitted.any():
+        return np.full(strikes.shape, np.nan)
+    spot = spot or surface["spot"]
+    known = surface["days"][fitted]
+    a, b, c = (np.interp(days, known, surface[name][fitted]) for name in ("atm_iv", "skew", "curvature"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.log(strikes / spot) / np.sqrt(np.maximum(days, MIN_DAYS) / 365)
+    return a + b * k + c * k * k
+
+
+def clear():
+    with _lock:
+        _surfaces.clear()
+
+
+def richness(residual: float) -> str:
+    """غالٍ / رخيص / عادل حسب الفرق عن السطح (هامش FAIR_BAND)."""
+    if residual > FAIR_BAND:
+        return "غالٍ"
+    if residual < -FAIR_BAND:
+        return "رخيص"
+    return "عادل"
+
+
+def format_residual(contract: dict) -> str:
+    """وصف IV العقد مقابل سطح سهمه (فارغ إذا لم يُحسب)."""
+    residual = contract.get("iv_residual")
+    if residual is None:
+        return ""
+    return f"IV مقابل السطح: {round(residual * 100, 1) + 0.0:+.1f} نقطة ({richness(residual)})"
@@ -0,0 +1,155 @@
+"""
+level_watch.py
+--------------
+محرك مراقبة المستويات السعرية لكل الأسهم.
+
+- مستويات كل سهم محفوظة في قائمة مرتبة، وكل تحديث سعري يُقيّم ببحث ثنائي (bisect)
+  على المستويات القريبة فقط، لا على كل المستويات.
+- لكل مستوى نحفظ جهة السعر (فوق/تحت). التنبيه يُطلق فقط عند:
+  * العبور (cross_up / cross_down): تتغير الجهة بعد تجاوز هامش التخلف (hysteresis)،
+    فلا يتكرر التنبيه مع تذبذب السعر حول المستوى.
+  * دخول النطاق (near): السعر ضمن ±band من المستوى، ولا يُعاد إلا بعد خروج السعر
+    إلى ما بعد rearm_band.
+
+الاستخدام:
+    watch = LevelWatch.from_price_levels()
+    events = watch.update({"SPY": 489.7, "QQQ": 601.2})
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List
+
+
+class _SymbolLevels:
+    __slots__ = ("levels", "sides", "armed", "disarmed", "last_price")
+
+    def __init__(self, levels: List[float]):
+        self.levels = sorted(set(float(l) for l in levels if l and l > 0))
+        self.sides = [0] * len(self.levels)      # +1 فوق المستوى، -1 تحته، 0 غير معروف
+        self.armed = [True] * len(self.levels)   # هل تنبيه "near" جاهز للإطلاق
+        self.disarmed = set()                    # فهارس المستويات التي تنتظر إعادة التسليح
+        self.last_price = None
+
+
+class LevelWatch:
+    def __init__(self, band: float = 0.01, rearm_band: float = 0.02, hysteresis: float = 0.001):
+        """
+        band: نطاق "near" (±1% كما في check_price_alerts)
+        rearm_band: يجب أن يبتعد السعر أكثر من هذا لإعادة تسليح تنبيه "near"
+        hysteresis: هامش العبور — لا تتغير الجهة إلا إذا تجاوز السعر المستوى بهذه النسبة
+        """
+        self.band = band
+        self.rearm_band = max(rearm_band, band)
+        self.hysteresis = hysteresis
+        self._symbols: Dict[str, _SymbolLevels] = {}
+
+    @classmethod
+    def from_price_levels(cls, levels: dict = None, **kwargs) -> "LevelWatch":
+        """بناء المحرك من data/price_levels (أو من قاموس بنفس التنسيق)."""
+        if levels is None:
+            from data.price_levels import price_levels as levels
+        watch = cls(**kwargs)
+        for symbol, symbol_levels in levels.items():
+            watch.set_levels(symbol, symbol_levels)
+        return watch
+
+    def set_levels(self, symbol: str, levels: List[float]):
+        """استبدال مستويات سهم (تُعاد تهيئة حالته مع أول سعر قادم)."""
+        self._symbols[symbol.upper()] = _SymbolLevels(levels)
+
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    def level_count(self) -> int:
+        return sum(len(s.levels) for s in self._symbols.values())
+
+    def _side(self, price: float, level: float, current: int) -> int:
+        if price > level * (1 + self.hysteresis):
+            return 1
+        if price < level * (1 - self.hysteresis):
+            return -1
+        return current  # داخل هامش التخلف: نحتفظ بالجهة السابقة
+
+    def _update_symbol(self, symbol: str, state: _SymbolLevels, price: float, events: list):
+        levels = state.levels
+        if not levels:
+            return
+        previous = state.last_price
+
+        # 1) العبور: فقط المستويات بين السعر السابق والحالي (مع هامش التخلف) قد تتغير جهتها
+        if previous is None:
+            for i, level in enumerate(levels):
+                state.sides[i] = self._side(price, level, 0)
+        else:
+            low, high = min(previous, price), max(previous, price)
+            start = bisect_left(levels, low / (1 + self.hysteresis))
+            end = bisect_right(levels, high / (1 - self.hysteresis))
+            for i in range(start, end):
+                old = state.sides[i]
+                new = self._side(price, levels[i], old)
+                if new != old:
+                    state.sides[i] = new
+                    if old != 0:
+                        events.append({
+                            "symbol": symbol, "level": levels[i], "price": price, "prev_price": previous,
+                            "type": "cross_up" if new > 0 else "cross_down",
+                        })
+
+        # 2) إعادة تسليح المستويات التي ابتعد عنها السعر بما يكفي
+        for i in list(state.disarmed):
+            if abs(price - levels[i]) > levels[i] * self.rearm_band:
+                state.armed[i] = True
+                state.disarmed.discard(i)
+
+        # 3) دخول النطاق: |price - level| <= band * level  ⇔  level ∈ [p/(1+band), p/(1-band)]
+        start = bisect_left(levels, price / (1 + self.band))
+        end = bisect_right(levels, price / (1 - self.band))
+        for i in range(start, end):
+            if state.armed[i] and abs(price - levels[i]) <= levels[i] * self.band:
+                state.armed[i] = False
+                state.disarmed.add(i)
+                events.append({
+                    "symbol": symbol, "level": levels[i], "price": price, "prev_price": previous,
+                    "type": "near",
+                })
+
+        state.last_price = price
+
+    def update(self, prices: Dict[str, float]) -> List[dict]:
+        """
+        تقييم دفعة من الأسعار {symbol: price}. يُرجع قائمة الأحداث الجديدة فقط.
+        الرموز بلا مستويات أو الأسعار غير الصالحة تُتجاهل.
+        """
+        events = []
+        for symbol, price in prices.items():
+            state = self._symbols.get(symbol.upper())
+            if state is None or price is None or not price > 0:
+                continue
+            self._update_symbol(symbol.upper(), state, float(price), events)
+        return events
+
+    # ==================== حفظ الحالة ====================
+
+    def state(self) -> dict:
+        """حالة قابلة للتحويل إلى JSON (لاستئناف المراقبة بعد إعادة التشغيل)."""
+        return {
+            symbol: {"levels": s.levels, "sides": s.sides, "armed": s.armed, "last_price": s.last_price}
+            for symbol, s in self._symbols.items()
+        }
+
+    def restore(self, saved: dict):
+        """استعادة الحالة للرموز التي لم تتغير مستوياتها."""
+        for symbol, data in saved.items():
+            state = self._symbols.get(symbol)
+            if state is None or state.levels != data.get("levels"):
+                continue
+            state.sides = list(data["sides"])
+            state.armed = list(data["armed"])
+            state.disarmed = {i for i, armed in enumerate(state.armed) if not armed}
+            state.last_price = data.get("last_price")
+
+
+def format_level_event(event: dict) -> str:
+    """نص تنبيه مختصر لحدث مستوى."""
+    labels = {"cross_up": "⬆️ اختراق صاعد", "cross_down": "⬇️ كسر هابط", "near": "🔔 اقتراب من"}
+    return f"{labels.get(event['type'], event['type'])} {event['symbol']} — المستوى {event['level']} (السعر {event['price']:.2f})"
@@ -0,0 +1,302 @@
+"""
+metrics.py
+----------
+قياسات خفيفة لمراحل الفحص: مؤقتات، عدّادات، ونسب إصابة الكاش.
+
+- عند التعطيل (الافتراضي) كل استدعاء هو فحص متغير واحد وإرجاع كائن ثابت.
+- التفعيل: MAZ_METRICS=1 أو metrics.enable()
+- التصدير: سطر JSON لكل فحص (MAZ_METRICS_JSONL=path) ونص Prometheus عبر serve_prometheus()
+  على MAZ_METRICS_HOST:MAZ_METRICS_PORT (الافتراضي 127.0.0.1:9108).
+
+الاستخدام:
+    from core import metrics
+    with metrics.timer("chains"):
+        ...
+    metrics.incr("contracts.fetched", len(contracts))
+    metrics.cache_hit("expirations")
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+from core.settings import get_settings
+
+_enabled = get_settings().metrics_enabled
+_jsonl_path = get_settings().metrics_jsonl
+
+_lock = threading.Lock()
+_timers = {}       # name -> [count, total_seconds, max_seconds]  (منذ بدء العملية)
+_counters = {}     # name -> int
+_current = None    # الفحص المسجَّل حاليًا (واحد للعملية كلها): {"label", "started", "timers", "counters"}
+_recent = deque(maxlen=20)
+_server = None
+
+
+def enable(jsonl_path: str = None):
+    global _enabled, _jsonl_path
+    _enabled = True
+    if jsonl_path:
+        _jsonl_path = jsonl_path
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# ==================== التسجيل ====================
+
+def observe(name: str, seconds: float):
+    """إضافة مدة (بالثواني) إلى مؤقت."""
+    if not _enabled:
+        return
+    with _lock:
+        for timers in (_timers, _current["timers"] if _current else None):
+            if timers is None:
+                continue
+            entry = timers.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+
+def incr(name: str, n: int = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+        if _current:
+            _current["counters"][name] = _current["counters"].get(name, 0) + n
+
+
+def cache_hit(cache: str):
+    incr(f"cache.{cache}.hit")
+
+
+def cache_miss(cache: str):
+    incr(f"cache.{cache}.miss")
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def timer(name: str):
+    """مؤقت كـ context manager. عند التعطيل يُرجع كائنًا ثابتًا بلا تكلفة تُذكر."""
+    return _Timer(name) if _enabled else _NOOP
+
+
+def timed(name: str):
+    """نفس timer() كـ decorator."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def scan(label: str):
+    """
+    تحديد حدود فحص كامل. كل ما يُسجَّل داخله يُجمع في تقرير واحد يُحفظ في
+    recent_scans() ويُكتب كسطر JSON.
+
+    يُسجَّل فحص واحد فقط في كل لحظة للعملية كلها (وليس لكل خيط)، لأن مراحل الفحص تعمل في
+    خيوط العمال. الفحوص المتداخلة أو المتزامنة من خيوط أخرى (المراقب، جلسات Streamlit)
+    لا تحصل على تقرير خاص، وما تسجله يُحسب ضمن الفحص الجاري.
+    """
+    global _current
+    if not _enabled:
+        yield
+        return
+
+    with _lock:
+        owner = _current is None
+        if owner:
+            _current = {"label": label, "started": time.time(), "timers": {}, "counters": {}}
+    if not owner:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            record = _scan_record(_current, time.perf_counter() - start)
+            _current = None
+            _recent.append(record)
+        if _jsonl_path:
+            _append_jsonl(_jsonl_path, record)
+
+
+# ==================== القراءة والتصدير ====================
+
+def _cache_ratios(counters: dict) -> dict:
+    ratios = {}
+    for name in counters:
+        if name.startswith("cache.") and name.endswith(".hit"):
+            cache = name[len("cache."):-len(".hit")]
+            hits = counters[name]
+            misses = counters.get(f"cache.{cache}.miss", 0)
+            ratios[cache] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+    return ratios
+
+
+def _scan_record(current: dict, duration: float) -> dict:
+    return {
+        "label": current["label"],
+        "started": round(current["started"], 3),
+        "duration_s": round(duration, 4),
+        "stages": {
+            name: {"calls": c, "total_s": round(total, 4), "max_s": round(mx, 4)}
+            for name, (c, total, mx) in sorted(current["timers"].items(), key=lambda kv: -kv[1][1])
+        },
+        "counters": dict(current["counters"]),
+        "cache_hit_ratio": _cache_ratios(current["counters"]),
+    }
+
+
+def recent_scans() -> list:
+    with _lock:
+        return list(_recent)
+
+
+def last_scan() -> dict:
+    with _lock:
+        return _recent[-1] if _recent else {}
+
+
+def snapshot() -> dict:
+    """الإجماليات منذ بدء العملية."""
+    with _lock:
+        return {
+            "timers": {name: {"calls": c, "total_s": round(t, 4), "max_s": round(m, 4)}
+                       for name, (c, t, m) in _timers.items()},
+            "counters": dict(_counters),
+            "cache_hit_ratio": _cache_ratios(_counters),
+        }
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _recent.clear()
+
+
+def _append_jsonl(path: str, record: dict):
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️ تعذّر كتابة القياسات إلى {path}: {e}")
+
+
+def export_jsonl(path: str):
+    """كتابة آخر الفحوص المسجلة كسطور JSON."""
+    for record in recent_scans():
+        _append_jsonl(path, record)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus() -> str:
+    """تصدير القياسات بصيغة Prometheus النصية."""
+    snap = snapshot()
+    last = last_scan()
+    lines = [
+        "# HELP maz_stage_seconds_total Total time spent per scan stage.",
+        "# TYPE maz_stage_seconds_total counter",
+    ]
+    for name, t in snap["timers"].items():
+        lines.append(f'maz_stage_seconds_total{{stage="{_label(name)}"}} {t["total_s"]}')
+    lines += ["# HELP maz_stage_calls_total Number of timed calls per stage.",
+              "# TYPE maz_stage_calls_total counter"]
+    for name, t in snap["timers"].items():
+        lines.append(f'maz_stage_calls_total{{stage="{_label(name)}"}} {t["calls"]}')
+    lines += ["# HELP maz_events_total Event counters.", "# TYPE maz_events_total counter"]
+    for name, value in snap["counters"].items():
+        lines.append(f'maz_events_total{{name="{_label(name)}"}} {value}')
+    lines += ["# HELP maz_cache_hit_ratio Cache hit ratio since start.", "# TYPE maz_cache_hit_ratio gauge"]
+    for cache, ratio in snap["cache_hit_ratio"].items():
+        lines.append(f'maz_cache_hit_ratio{{cache="{_label(cache)}"}} {ratio}')
+    if last:
+        lines += ["# HELP maz_last_scan_seconds Duration of the last scan and its stages.",
+                  "# TYPE maz_last_scan_seconds gauge",
+                  f'maz_last_scan_seconds{{scan="{_label(last["label"])}",stage="total"}} {last["duration_s"]}']
+        for name, t in last["stages"].items():
+            lines.append(f'maz_last_scan_seconds{{scan="{_label(last["label"])}",stage="{_label(name)}"}} {t["total_s"]}')
+    return "\n".join(lines) + "\n"
+
+
+def serve_prometheus(port: int = None, host: str = None):
+    """
+    تشغيل نقطة /metrics في خيط خلفي (مرة واحدة لكل عملية).
+    host/port الافتراضيان من الإعدادات؛ 0.0.0.0 يجب أن يُطلب صراحة.
+    """
+    global _server
+    if _server is not None:
+        return _server
+    settings = get_settings()
+    host = settings.metrics_host if host is None else host
+    port = settings.metrics_port if port is None else port
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("/metrics", ""):
+                self.send_error(404)
+                return
+            body = to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,140 @@
+"""
+negative_cache.py
+-----------------
+كاش للنتائج السلبية: الرموز التي لم تُنتج أي عقد مناسب تُسجل مع السبب،
+وتُتخطى في الفحوص التالية حتى تنتهي صلاحية التسجيل.
+
+الأسباب:
+- no_expirations: لا توجد انتهاءات (أو لا Weekly ولا Monthly)
+- no_liquid_strikes: لا توجد عقود تمر من الفلترة (لكل اتجاه على حدة)
+- error: خطأ أثناء الجلب
+
+كل تكرار متتالٍ لنفس السبب يضاعف مدة التخطي حتى حد أقصى،
+وأي نتيجة إيجابية تمسح التسجيل فورًا.
+"""
+
+import json
+import os
+import threading
+import time
+
+from core import metrics
+from core.settings import get_settings
+
+# المدة الأساسية والحد الأقصى (بالثواني) لكل سبب
+NEGATIVE_TTL = {
+    "no_expirations": 6 * 3600,
+    "no_liquid_strikes": 20 * 60,
+    "error": 2 * 60,
+}
+MAX_TTL = {
+    "no_expirations": 3 * 24 * 3600,
+    "no_liquid_strikes": 6 * 3600,
+    "error": 30 * 60,
+}
+
+_enabled = get_settings().negative_cache_enabled
+_lock = threading.Lock()
+_entries = {}  # "SYMBOL" أو "SYMBOL:trend" -> {"reason", "strikes", "recorded_at", "expires_at"}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def _key(symbol: str, trend: str = None) -> str:
+    return f"{symbol}:{trend}" if trend else symbol
+
+
+def _active(key: str, now: float):
+    entry = _entries.get(key)
+    if entry and entry["expires_at"] > now:
+        return entry
+    return None
+
+
+def should_skip(symbol: str, trend: str = None):
+    """
+    يُرجع (True, reason) إذا كان للسهم تسجيل سلبي ساري (على مستوى السهم أو هذا الاتجاه).
+    """
+    if not _enabled:
+        return False, None
+    now = time.time()
+    with _lock:
+        for key in (_key(symbol), _key(symbol, trend)) if trend else (_key(symbol),):
+            entry = _active(key, now)
+            if entry:
+                metrics.cache_hit("negative")
+                return True, entry["reason"]
+    metrics.cache_miss("negative")
+    return False, None
+
+
+def has_active(symbol: str) -> bool:
+    """هل يوجد تسجيل ساري على مستوى السهم (بغض النظر عن الاتجاه)؟"""
+    with _lock:
+        return _active(_key(symbol), time.time()) is not None
+
+
+def record(symbol: str, reason: str, trend: str = None):
+    """تسجيل نتيجة سلبية. التكرار بنفس السبب يضاعف المدة."""
+    if not _enabled:
+        return
+    key = _key(symbol, trend)
+    now = time.time()
+    with _lock:
+        previous = _entries.get(key)
+        strikes = previous["strikes"] + 1 if previous and previous["reason"] == reason else 1
+        ttl = min(MAX_TTL[reason], NEGATIVE_TTL[reason] * 2 ** (strikes - 1))
+        _entries[key] = {"reason": reason, "strikes": strikes, "recorded_at": now, "expires_at": now + ttl}
+    metrics.incr(f"negative.{reason}")
+
+
+def clear(symbol: str = None, trend: str = None):
+    """مسح تسجيل سهم (بعد نتيجة إيجابية)، أو كل الكاش إذا لم يُحدد سهم."""
+    with _lock:
+        if symbol is None:
+            _entries.clear()
+            return
+        _entries.pop(_key(symbol), None)
+        if trend:
+            _entries.pop(_key(symbol, trend), None)
+
+
+def entries() -> dict:
+    """التسجيلات السارية حاليًا."""
+    now = time.time()
+    with _lock:
+        return {k: dict(v) for k, v in _entries.items() if v["expires_at"] > now}
+
+
+def save(path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries(), f)
+
+
+def load(path: str):
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ تعذّر تحميل الكاش السلبي من {path}: {e}")
+        return
+    restore(stored)
+
+
+def restore(stored: dict):
+    """استعادة تسجيلات محفوظة (مثل ناتج entries()) مع تجاهل المنتهية."""
+    now = time.time()
+    with _lock:
+        for key, entry in stored.items():
+            if entry.get("expires_at", 0) > now:
+                _entries[key] = entry
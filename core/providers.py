@@ -0,0 +1,318 @@
+"""
+providers.py
+------------
+واجهة موحّدة لمصادر بيانات السوق (تواريخ الانتهاء، السعر الحالي، الشموع، سلاسل الخيارات).
+
+- YFinanceProvider: البيانات الحية من Yahoo (الافتراضي).
+- ReplayProvider: إعادة تشغيل لقطات مسجلة بصيغة عمودية مضغوطة تُقرأ عبر memory-map.
+
+اختيار المصدر:
+    set_provider(ReplayProvider("snapshots/2026-10-19"))
+أو عبر متغيرات البيئة:
+    MARKET_DATA_PROVIDER=replay  MARKET_DATA_REPLAY_DIR=snapshots/2026-10-19
+
+صيغة اللقطة (مجلد لكل سهم):
+    <root>/<SYMBOL>/meta.json          تواريخ الانتهاء وإزاحات كل سلسلة داخل الأعمدة
+    <root>/<SYMBOL>/chain.<col>.npy    عمود واحد لكل حقل، كل السلاسل متتالية
+    <root>/<SYMBOL>/bars.<col>.npy     الشموع اليومية (bars.date.npy بصيغة datetime64[D])
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.settings import get_settings
+
+if TYPE_CHECKING:  # pandas يُستورد فقط عند جلب الشموع أو السلاسل
+    import pandas as pd
+
+CHAIN_COLUMNS = ["strike", "lastPrice", "bid", "ask", "volume", "openInterest", "impliedVolatility"]
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# عدد الشموع اليومية لكل فترة بصيغة yfinance
+PERIOD_BARS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504}
+
+QUOTE_CHUNK = 10  # رموز لكل دفعة yf.download في get_quotes
+
+
+class MarketDataProvider:
+    """الواجهة الأساسية. أي مصدر جديد (وسيط، ملفات...) يطبّق هذه الدوال."""
+
+    name = "base"
+
+    def today(self) -> date:
+        """تاريخ الجلسة الحالية (للمصادر المسجلة: تاريخ التسجيل)."""
+        return datetime.today().date()
+
+    def get_expirations(self, symbol: str) -> List[str]:
+        raise NotImplementedError
+
+    def get_spot(self, symbol: str) -> float:
+        raise NotImplementedError
+
+    def get_bars(self, symbol: str, period: str = "6mo") -> pd.DataFrame:
+        raise NotImplementedError
+
+    def get_chain(self, symbol: str, expiration: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """يُرجع (calls, puts) كـ DataFrame بأعمدة yfinance."""
+        raise NotImplementedError
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        """
+        آخر سعر ومتوسط حجم التداول اليومي (آخر 5 أيام) لعدة رموز.
+        المصادر التي تدعم الطلب المجمّع تعيد تعريف هذه الدالة.
+        """
+        quotes = {}
+        for symbol in symbols:
+            quotes[symbol] = _quote_from_bars(self.get_bars(symbol, "5d"))
+        return quotes
+
+
+def _quote_from_bars(bars: pd.DataFrame) -> dict:
+    bars = bars.dropna(subset=["Close"]) if "Close" in bars.columns else bars.iloc[0:0]
+    if bars.empty:
+        return {"price": 0.0, "avg_volume": 0.0}
+    avg_volume = float(bars["Volume"].mean()) if "Volume" in bars.columns else 0.0
+    return {"price": float(bars["Close"].iloc[-1]), "avg_volume": avg_volume}
+
+
+class YFinanceProvider(MarketDataProvider):
+    """البيانات الحية من yfinance. كل طلب يمر عبر المنظّم المشترك (core/governor)."""
+
+    name = "yfinance"
+
+    def _ticker(self, symbol: str):
+        import yfinance as yf
+        return yf.Ticker(symbol)
+
+    def _call(self, symbol, fn, *args, **kwargs):
+        from core.governor import get_governor
+        return get_governor().call(symbol, fn, *args, **kwargs)
+
+    def get_expirations(self, symbol: str) -> List[str]:
+        # tuple of strings in 'YYYY-MM-DD'
+        expirations = self._call(symbol, lambda: self._ticker(symbol).options)
+        return list(expirations) if expirations else []
+
+    def get_spot(self, symbol: str) -> float:
+        # آخر سعر تداول، وإذا فشل نحاول period="5d"
+        hist = self._call(symbol, lambda: self._ticker(symbol).history(period="1d"))
+        if hist.empty:
+            hist = self._call(symbol, lambda: self._ticker(symbol).history(period="5d"))
+        return float(hist['Close'].iloc[-1]) if not hist.empty else 0.0
+
+    def get_bars(self, symbol: str, period: str = "6mo") -> pd.DataFrame:
+        return self._call(symbol, lambda: self._ticker(symbol).history(period=period))
+
+    def get_chain(self, symbol: str, expiration: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        opt_chain = self._call(symbol, lambda: self._ticker(symbol).option_chain(expiration))
+        return opt_chain.calls, opt_chain.puts
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        """
+        yf.download على دفعات من QUOTE_CHUNK رمزًا بدل history() لكل رمز.
+        yf.download يرسل طلبًا لكل رمز، لذلك كل دفعة تأخذ توكنًا من المنظّم وتُنفَّذ بلا خيوط
+        (threads=False) بمهلة تتناسب مع حجمها وبلا إعادة محاولة: إعادة دفعة انتهت مهلتها تعني
+        تنزيلًا ثانيًا كاملًا بينما الأول ما زال يعمل. الدفعة الفاشلة لا تُرجع أسعارًا لرموزها
+        (تبقى لجلب السعر لكل سهم لاحقًا).
+        """
+        timeout = get_settings().call_timeout
+        quotes = {}
+        for start in range(0, len(symbols), QUOTE_CHUNK):
+            chunk = list(symbols[start:start + QUOTE_CHUNK])
+            try:
+                data = self._call(None, _download_quotes, chunk, timeout=timeout * len(chunk), retries=0)
+            except Exception as e:
+                print(f"⚠️ فشل جلب أسعار {len(chunk)} رموز ({chunk[0]}…): {e}")
+                continue
+            quotes.update(_quotes_from_download(data, chunk))
+        return quotes
+
+
+def _download_quotes(symbols: List[str]) -> pd.DataFrame:
+    """
+    دفعة yf.download واحدة. yfinance يبتلع أخطاء كل رمز (ومنها 429) ويسجلها في shared._ERRORS،
+    فنرفع الخنق كـ RateLimitError حتى يخفض المنظّم المعدل.
+    """
+    import yfinance as yf
+    from core.governor import RateLimitError, _is_throttle
+
+    data = yf.download(symbols, period="5d", group_by="ticker", threads=False, progress=False, auto_adjust=False)
+    errors = getattr(getattr(yf, "shared", None), "_ERRORS", None) or {}
+    throttled = [symbol for symbol, error in errors.items() if _is_throttle(Exception(str(error)))]
+    if throttled:
+        raise RateLimitError(f"Too Many Requests ({', '.join(throttled)})")
+    return data
+
+
+def _quotes_from_download(data: pd.DataFrame, symbols: List[str]) -> Dict[str, dict]:
+    import pandas as pd
+
+    quotes = {}
+    for symbol in symbols:
+        if data is None or data.empty:
+            bars = pd.DataFrame()
+        elif isinstance(data.columns, pd.MultiIndex):
+            bars = data[symbol] if symbol in data.columns.get_level_values(0) else pd.DataFrame()
+        else:
+            bars = data  # رمز واحد: أعمدة مسطحة
+        quotes[symbol] = _quote_from_bars(bars)
+    return quotes
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    يقرأ لقطات مسجلة من القرص. الأعمدة تُفتح بـ mmap_mode="r" مرة واحدة لكل سهم،
+    وكل سلسلة هي مجرد شريحة (slice) منها، لذلك لا يُقرأ من القرص إلا ما يُستخدم فعلًا.
+    """
+
+    name = "replay"
+
+    def __init__(self, root: str, session: Optional[date] = None):
+        self.root = root
+        self._session = session
+        self._symbols = {}
+
+    def _load(self, symbol: str) -> Optional[dict]:
+        symbol = symbol.upper()
+        if symbol not in self._symbols:
+            folder = os.path.join(self.root, symbol)
+            meta_path = os.path.join(folder, "meta.json")
+            if not os.path.exists(meta_path):
+                self._symbols[symbol] = None
+            else:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                meta["chain"] = {col: np.load(os.path.join(folder, f"chain.{col}.npy"), mmap_mode="r")
+                                 for col in meta["chain_columns"]}
+                meta["bars"] = {col: np.load(os.path.join(folder, f"bars.{col}.npy"), mmap_mode="r")
+                                for col in ["date"] + meta["bar_columns"]}
+                self._symbols[symbol] = meta
+        return self._symbols[symbol]
+
+    def today(self) -> date:
+        if self._session:
+            return self._session
+        # نأخذ تاريخ التسجيل من أول سهم متاح حتى يكون التشغيل حتميًا
+        for name in sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []:
+            meta = self._load(name)
+            if meta:
+                self._session = date.fromisoformat(meta["recorded_on"])
+                return self._session
+        return super().today()
+
+    def get_expirations(self, symbol: str) -> List[str]:
+        meta = self._load(symbol)
+        return list(meta["expirations"]) if meta else []
+
+    def get_spot(self, symbol: str) -> float:
+        meta = self._load(symbol)
+        if not meta or len(meta["bars"]["Close"]) == 0:
+            return 0.0
+        return float(meta["bars"]["Close"][-1])
+
+    def get_bars(self, symbol: str, period: str = "6mo") -> pd.DataFrame:
+        import pandas as pd
+
+        meta = self._load(symbol)
+        if not meta:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        bars = meta["bars"]
+        n = PERIOD_BARS.get(period, len(bars["date"]))
+        index = pd.DatetimeIndex(np.asarray(bars["date"][-n:]), name="Date")
+        return pd.DataFrame({col: np.asarray(bars[col][-n:]) for col in meta["bar_columns"]}, index=index)
+
+    def get_chain(self, symbol: str, expiration: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        import pandas as pd
+
+        meta = self._load(symbol)
+        if not meta or expiration not in meta["offsets"]:
+            raise ValueError(f"Expiration `{expiration}` cannot be found.")
+        frames = []
+        for side in ("calls", "puts"):
+            start, end = meta["offsets"][expiration][side]
+            frames.append(pd.DataFrame({col: meta["chain"][col][start:end] for col in meta["chain_columns"]}))
+        return frames[0], frames[1]
+
+
+def write_snapshot(root: str, symbol: str, recorded_on: str, expirations: List[str],
+                   bars: pd.DataFrame, chains: dict):
+    """
+    كتابة لقطة سهم واحد بالصيغة العمودية.
+    chains: {expiration: (calls_df, puts_df)}
+    """
+    import pandas as pd
+
+    folder = os.path.join(root, symbol.upper())
+    os.makedirs(folder, exist_ok=True)
+
+    offsets = {}
+    columns = {col: [] for col in CHAIN_COLUMNS}
+    position = 0
+    for exp in expirations:
+        if exp not in chains:
+            continue
+        offsets[exp] = {}
+        for side, df in zip(("calls", "puts"), chains[exp]):
+            n = len(df)
+            for col in CHAIN_COLUMNS:
+                values = df[col].to_numpy(dtype=np.float64, na_value=np.nan) if col in df.columns else np.full(n, np.nan)
+                columns[col].append(values)
+            offsets[exp][side] = [position, position + n]
+            position += n
+
+    for col, parts in columns.items():
+        np.save(os.path.join(folder, f"chain.{col}.npy"), np.concatenate(parts) if parts else np.empty(0))
+
+    bar_columns = [col for col in BAR_COLUMNS if col in bars.columns]
+    dates = pd.DatetimeIndex(bars.index).tz_localize(None) if getattr(bars.index, "tz", None) else pd.DatetimeIndex(bars.index)
+    np.save(os.path.join(folder, "bars.date.npy"), dates.values.astype("datetime64[D]"))
+    for col in bar_columns:
+        np.save(os.path.join(folder, f"bars.{col}.npy"), bars[col].to_numpy(dtype=np.float64))
+
+    with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "symbol": symbol.upper(),
+            "recorded_on": recorded_on,
+            "expirations": [e for e in expirations if e in offsets],
+            "offsets": offsets,
+            "chain_columns": CHAIN_COLUMNS,
+            "bar_columns": bar_columns,
+        }, f)
+
+
+def record_snapshot(root: str, symbol: str, source: "MarketDataProvider" = None, max_expirations: int = 12):
+    """تسجيل لقطة من أي مصدر (الافتراضي: المصدر الحالي) لإعادة تشغيلها لاحقًا."""
+    source = source or get_provider()
+    expirations = source.get_expirations(symbol)[:max_expirations]
+    chains = {exp: source.get_chain(symbol, exp) for exp in expirations}
+    write_snapshot(root, symbol, source.today().isoformat(), expirations, source.get_bars(symbol, "1y"), chains)
+
+
+# ==================== المصدر الحالي ====================
+
+_provider = None
+
+
+def get_provider() -> MarketDataProvider:
+    """المصدر المستخدم في core/ — يُنشأ عند أول استدعاء حسب الإعدادات (core.settings)."""
+    global _provider
+    if _provider is None:
+        settings = get_settings()
+        if settings.market_data_provider.lower() == "replay":
+            _provider = ReplayProvider(settings.market_data_replay_dir)
+        else:
+            _provider = YFinanceProvider()
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider) -> MarketDataProvider:
+    """تغيير المصدر، ويُرجع المصدر السابق لإعادته لاحقًا."""
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
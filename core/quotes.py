@@ -0,0 +1,87 @@
+"""
+quotes.py
+---------
+مرحلة الأسعار المجمّعة: جلب آخر سعر لكل رموز الفحص بطلبات مجمّعة قبل جلب السلاسل،
+ثم استبعاد الرموز غير المناسبة (سعر أو حجم تداول) قبل تنزيل أي سلسلة.
+"""
+
+import time
+
+from core import metrics
+from core.providers import get_provider
+
+# صلاحية السعر المخزن (بالثواني) — كافية لفحص كامل دون أن تصبح الأسعار قديمة
+QUOTE_TTL = 120
+
+# حدود افتراضية إذا لم تُحدد في user_settings["universe_filters"]
+DEFAULT_UNIVERSE_FILTERS = {
+    "min_price": 5.0,          # أقل من ذلك لا توجد عقود قريبة من المال بسعر ≥ 0.5
+    "max_price": 2000.0,       # أعلى من ذلك عقود ATM تتجاوز حد الـ Ask (20)
+    "min_avg_volume": 500000,  # متوسط حجم تداول السهم اليومي
+}
+
+_quotes = {}  # symbol -> {"price", "avg_volume", "fetched_at"}
+
+
+def prefetch_quotes(symbols: list) -> dict:
+    """جلب أسعار كل الرموز عبر get_quotes() المجمّعة وتخزينها لاستخدام مرحلة السلاسل."""
+    if not symbols:
+        return {}
+    try:
+        with metrics.timer("quotes"):
+            quotes = get_provider().get_quotes(list(symbols))
+    except Exception as e:
+        print(f"⚠️ فشل جلب الأسعار المجمّعة: {e}")
+        metrics.incr("errors.quotes")
+        return {}
+
+    now = time.time()
+    for symbol, quote in quotes.items():
+        _quotes[symbol] = dict(quote, fetched_at=now)
+    return quotes
+
+
+def get_cached_spot(symbol: str):
+    """السعر من المرحلة المجمّعة، أو None إذا لم يُجلب أو انتهت صلاحيته."""
+    quote = _quotes.get(symbol)
+    if not quote or quote["price"] <= 0 or time.time() - quote["fetched_at"] > QUOTE_TTL:
+        metrics.cache_miss("quotes")
+        return None
+    metrics.cache_hit("quotes")
+    return quote["price"]
+
+
+def get_universe_filters() -> dict:
+    try:
+        from data.user_preferences import user_settings
+        return {**DEFAULT_UNIVERSE_FILTERS, **user_settings.get("universe_filters", {})}
+    except Exception:
+        return dict(DEFAULT_UNIVERSE_FILTERS)
+
+
+def prefilter_symbols(symbols: list, filters: dict = None) -> list:
+    """
+    استبعاد الرموز التي لا يمكن أن تُنتج عقودًا مناسبة بناءً على السعر والحجم.
+    الرموز التي لم نحصل على سعرها تبقى (لا نستبعد بسبب فشل الشبكة).
+    """
+    filters = filters or get_universe_filters()
+    kept = []
+    for symbol in symbols:
+        quote = _quotes.get(symbol)
+        if not quote or quote["price"] <= 0:
+            kept.append(symbol)
+            continue
+        if not (filters["min_price"] <= quote["price"] <= filters["max_price"]):
+            print(f"⏭️ {symbol}: السعر {quote['price']:.2f} خارج النطاق")
+            metrics.incr("symbols.prefiltered")
+            continue
+        if quote["avg_volume"] < filters["min_avg_volume"]:
+            print(f"⏭️ {symbol}: حجم التداول {quote['avg_volume']:.0f} أقل من الحد")
+            metrics.incr("symbols.prefiltered")
+            continue
+        kept.append(symbol)
+    return kept
+
+
+def clear():
+    _quotes.clear()
@@ -0,0 +1,141 @@
+"""
+rerank.py
+---------
+إعادة ترتيب آخر فحص بأوزان أو حدود جديدة بدون أي جلب من الشبكة.
+
+بعد كل فحص Top 10 تُحفظ العقود المرشحة لكل سهم (التي مرت من الفلترة) كأعمدة numpy.
+rerank() يعيد التقييم، ثم يختار أفضل عقدين لكل سهم وأفضل k إجمالًا — بنفس منطق الفحص،
+فبدون تغييرات تكون النتيجة مطابقة لآخر فحص.
+
+    rerank("up", {"scoring": {"weights": {"liquidity": 0.2, "spread": 0.5, "iv": 0.3}}})
+    rerank("both", {"scoring": {"iv_target": 0.3}, "filters": {"min_oi": 2000}})
+
+التغييرات بنفس تنسيق data/scoring_rules.json وتُدمج فوق قواعد كل سهم. تُطبّق أقسام
+"scoring" و"pick_range"، وقسم "filters" (min_volume / min_oi) إذا ذُكر. أما شروط قابلية
+التداول ومستويات التوسع فقد طُبقت أثناء الفحص.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from core import metrics
+from core.rules import get_rules, to_arrays
+from core.utils import option_tp_sl
+
+_lock = threading.Lock()
+_snapshots = {}  # trend -> مرشحو آخر فحص
+
+
+def store(trend: str, candidates: dict, today=None):
+    """حفظ مرشحي الفحص {symbol: [contracts]} (ترتيب الأسهم = ترتيب الفحص)."""
+    symbols, contracts, symbol_idx = [], [], []
+    for i, (symbol, symbol_contracts) in enumerate(candidates.items()):
+        symbols.append(symbol)
+        contracts.extend(symbol_contracts)
+        symbol_idx.extend([i] * len(symbol_contracts))
+
+    snapshot = {
+        "symbols": symbols,
+        "contracts": contracts,
+        "symbol_idx": np.array(symbol_idx, dtype=np.intp),
+        "arrays": to_arrays(contracts, today),
+        "stored_at": time.time(),
+    }
+    with _lock:
+        _snapshots[trend] = snapshot
+
+
+def last_scan_info(trend: str = None) -> dict:
+    """ملخص المرشحين المحفوظين: {trend: {"symbols", "candidates", "stored_at"}}."""
+    with _lock:
+        return {
+            t: {"symbols": len(s["symbols"]), "candidates": len(s["contracts"]), "stored_at": s["stored_at"]}
+            for t, s in _snapshots.items() if trend is None or t == trend
+        }
+
+
+def clear():
+    with _lock:
+        _snapshots.clear()
+
+
+def changed_overrides(values: dict, shown: dict) -> dict:
+    """
+    الحقول التي غيّرها المستخدم فقط من قيم نموذج بنفس تنسيق ملف القواعد، مقارنةً بالقيم
+    التي عُرضت له. إرسال كل القيم يستبدل تخصيص كل سهم (مثل أوزان SPY/QQQ في ملف القواعد)
+    حتى بدون أي تغيير.
+    """
+    changed = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            nested = changed_overrides(value, shown.get(key) or {})
+            if nested:
+                changed[key] = nested
+        elif key not in shown or value != shown[key]:
+            changed[key] = value
+    return changed
+
+
+def top_per_group(order_idx: np.ndarray, scores: np.ndarray, group_idx: np.ndarray, per_group: int) -> np.ndarray:
+    """أفضل per_group عقد لكل مجموعة (ترتيب ثابت: المجموعة، ثم التقييم تنازليًا)."""
+    order = order_idx[np.lexsort((-scores[order_idx], group_idx[order_idx]))]
+    if not len(order):
+        return order
+    groups = group_idx[order]
+    starts = np.r_[True, groups[1:] != groups[:-1]]
+    positions = np.arange(len(order))
+    rank = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+    return order[rank < per_group]
+
+
+@metrics.timed("rerank")
+def rerank(trend: str, overrides: dict = None, k: int = 10) -> list:
+    """
+    أفضل k عقود من آخر فحص بعد تطبيق overrides.
+    trend: "up" أو "down" أو "both" (دمج الاتجاهين كما في الواجهة).
+    العقود المُرجعة نسخ جديدة مع score و tp/sl و direction.
+    """
+    if trend == "both":
+        merged = rerank("up", overrides, k) + rerank("down", overrides, k)
+        merged.sort(key=lambda c: c["score"], reverse=True)
+        return merged[:k]
+
+    with _lock:
+        snapshot = _snapshots.get(trend)
+    if not snapshot or not snapshot["contracts"]:
+        return []
+
+    arrays = snapshot["arrays"]
+    symbol_idx = snapshot["symbol_idx"]
+    scores = np.zeros(len(symbol_idx))
+    eligible = np.zeros(len(symbol_idx), dtype=bool)
+
+    # الأسهم بلا تخصيص تشترك في نفس القواعد، فتُقيّم معًا دفعة واحدة
+    groups = {}
+    for i, symbol in enumerate(snapshot["symbols"]):
+        base = get_rules(symbol)
+        groups.setdefault(id(base), (base, []))[1].append(i)
+
+    for base, members in groups.values():
+        rules = base.with_overrides(overrides) if overrides else base
+        mask = np.isin(symbol_idx, members)
+        subset = {key: values[mask] for key, values in arrays.items()}
+        ok = rules.in_pick_range(subset, trend)
+        if overrides and overrides.get("filters"):
+            ok &= rules.filter_mask(subset)
+        scores[mask] = rules.score(subset)
+        eligible[mask] = ok
+
+    picked = top_per_group(np.flatnonzero(eligible), scores, symbol_idx, 2)
+    best = picked[np.argsort(-scores[picked], kind="stable")[:k]]
+
+    results = []
+    for i in best:
+        c = dict(snapshot["contracts"][i])
+        c["score"] = float(scores[i])
+        c["tp"], c["sl"] = option_tp_sl(c.get("ask", 0))
+        c["direction"] = trend
+        results.append(c)
+    return results
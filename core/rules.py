@@ -0,0 +1,347 @@
+"""
+rules.py
+--------
+قواعد الفلترة والتقييم من ملف data/scoring_rules.json (أو المسار في MAZ_RULES_FILE).
+
+- قسم "default" يحدد كل القيم، وقسم "symbols" يغيّر ما يلزم لكل سهم (دمج عميق):
+  شروط قابلية التداول، الفلاتر، مستويات التوسع، نطاق الاختيار، وأوزان التقييم.
+- قواعد كل سهم تُترجم مرة واحدة إلى CompiledRules: دوال تعمل على مصفوفات numpy
+  لكل العقود دفعة واحدة بدل المرور على العقود واحدًا واحدًا.
+- الملف يُعاد تحميله تلقائيًا عند تغير وقت تعديله، دون إعادة تشغيل الماسح.
+  إذا كان الملف الجديد غير صالح نُبقي على القواعد السابقة.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from core import metrics
+from core.settings import get_settings
+
+RULES_FILE = get_settings().rules_file or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "scoring_rules.json"
+)
+
+# القيم الافتراضية إذا لم يوجد الملف أو نقصت منه مفاتيح
+DEFAULT_RULES = {
+    "tradable": {
+        "min_bid": 0.01,            # bid و ask يجب أن يتجاوزا هذا
+        "min_ask": 0.01,
+        "min_volume": 10,           # حجم العقد يجب أن يتجاوز هذا
+        "ask_range": [0.5, 20],     # نطاق سعري واقعي للتداول اليومي
+    },
+    "filters": {
+        "min_volume": 300,
+        "min_oi": 1000,
+        "rsi_buy_threshold": 30,
+        "rsi_sell_threshold": 70,
+    },
+    # مستويات التوسع التدريجي: (call_min, call_max, put_min, put_max)
+    "tolerances": [
+        [0.98, 1.05, 0.95, 1.02],
+        [0.95, 1.10, 0.90, 1.05],
+        [0.90, 1.15, 0.85, 1.10],
+    ],
+    # نطاق الـ Strike المقبول للاختيار نسبةً لسعر السهم
+    "pick_range": {"up": [0.95, 1.15], "down": [0.85, 1.05]},
+    "scoring": {
+        # unusual: نقاط النشاط غير الاعتيادي (core/unusual_activity) = 20 × unusual_z حتى 100
+        "weights": {"liquidity": 0.5, "spread": 0.3, "iv": 0.2, "unusual": 0.0},
+        "iv_target": 0.40,
+        "volume_tiers": [[300, 50], [100, 30], [0, 10]],   # (أقل حجم، النقاط)؛ الأخير هو الحد الأدنى
+        "oi_tiers": [[1000, 50], [500, 30], [0, 10]],
+        "weekly_days": 7,                                  # مكافأة سيولة للعقود القريبة من الانتهاء
+        "weekly_bonus": 20,
+        # مرجع نقاط IV: "target" = القرب من iv_target، "surface" = رخص IV مقابل سطح السهم
+        # (core/iv_surface): 50 نقطة عند السطح، وتُخصم iv_residual_scale نقطة لكل 1.0 فوقه
+        "iv_reference": "target",
+        "iv_residual_scale": 1000,
+    },
+}
+
+# هامش نسبي لمدى السعر الذي يبقى فيه مستوى التوسع ثابتًا (أكبر بكثير من خطأ تقريب المقارنات)
+TIER_RANGE_MARGIN = 1e-9
+
+_NUMERIC_FIELDS = ("bid", "ask", "volume", "open_interest", "implied_volatility", "strike", "underlying_price")
+
+
+def _merge(base: dict, override: dict) -> dict:
+    """دمج عميق: القواميس تُدمج، وباقي القيم (بما فيها القوائم) تُستبدل."""
+    merged = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def to_arrays(contracts: list, today=None) -> dict:
+    """
+    تحويل قائمة عقود إلى أعمدة numpy (القيم المفقودة = NaN).
+    days: الأيام حتى الانتهاء (30 إذا تعذر حسابها، كما في التقييم الأصلي).
+    """
+    arrays = {field: np.array([c.get(field, 0) for c in contracts], dtype=float) for field in _NUMERIC_FIELDS}
+    arrays["option_type"] = np.array([c.get("option_type") for c in contracts], dtype=object)
+    arrays["iv_residual"] = np.array([c.get("iv_residual") for c in contracts], dtype=float)
+    arrays["unusual_z"] = np.array([c.get("unusual_z") for c in contracts], dtype=float)
+    arrays["incomplete"] = np.array(
+        [c.get("strike") is None or c.get("implied_volatility") is None or c.get("option_type") is None
+         for c in contracts],
+        dtype=bool,
+    )
+
+    if today is None:
+        try:
+            from core.providers import get_provider
+            today = get_provider().today()
+        except Exception:
+            today = None
+
+    days_by_exp = {}
+    days = np.empty(len(contracts))
+    for i, c in enumerate(contracts):
+        expiration = c.get("expiration_date", "")
+        d = days_by_exp.get(expiration)
+        if d is None:
+            try:
+                d = (datetime.strptime(expiration, "%Y-%m-%d").date() - today).days
+            except Exception:
+                d = 30
+            days_by_exp[expiration] = d
+        days[i] = d
+    arrays["days"] = days
+    return arrays
+
+
+def chain_version(a: dict) -> int:
+    """بصمة سلسلة (أعمدة to_arrays): تتغير إذا تغير أي سعر أو حجم أو IV أو Strike أو تاريخ."""
+    digest = hashlib.blake2b(digest_size=8)
+    for field in _NUMERIC_FIELDS + ("days",):
+        digest.update(np.ascontiguousarray(a[field]).tobytes())
+    digest.update((a["option_type"] == "call").tobytes())
+    return int.from_bytes(digest.digest(), "little")
+
+
+def _tier_points(values: np.ndarray, tiers: list) -> np.ndarray:
+    """نقاط المستوى الأعلى الذي تتجاوزه القيمة؛ المستوى الأخير هو الحد الأدنى دائمًا."""
+    points = np.full(len(values), float(tiers[-1][1]))
+    for threshold, tier_points in reversed(tiers[:-1]):
+        points = np.where(values >= threshold, float(tier_points), points)
+    return points
+
+
+class CompiledRules:
+    """قواعد سهم واحد بعد الدمج، جاهزة للتطبيق على أعمدة to_arrays()."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+
+        tradable = spec["tradable"]
+        self.min_bid = float(tradable["min_bid"])
+        self.min_ask = float(tradable["min_ask"])
+        self.min_volume = float(tradable["min_volume"])
+        self.ask_min, self.ask_max = (float(v) for v in tradable["ask_range"])
+
+        self.filters = dict(spec["filters"])
+        self.tolerances = [tuple(float(v) for v in t) for t in spec["tolerances"]]
+        self.pick_range = {k: tuple(float(v) for v in r) for k, r in spec["pick_range"].items()}
+
+        scoring = spec["scoring"]
+        weights = scoring["weights"]
+        self.w_liquidity = float(weights["liquidity"])
+        self.w_spread = float(weights["spread"])
+        self.w_iv = float(weights["iv"])
+        self.w_unusual = float(weights.get("unusual", 0.0))
+        self.iv_target = float(scoring["iv_target"])
+        self.volume_tiers = [tuple(t) for t in scoring["volume_tiers"]]
+        self.oi_tiers = [tuple(t) for t in scoring["oi_tiers"]]
+        self.weekly_days = scoring["weekly_days"]
+        self.weekly_bonus = float(scoring["weekly_bonus"])
+        self.iv_reference = scoring["iv_reference"]
+        self.iv_residual_scale = float(scoring["iv_residual_scale"])
+        if self.iv_reference not in ("target", "surface"):
+            raise ValueError(f"iv_reference must be 'target' or 'surface', got {self.iv_reference!r}")
+
+        # حقول تُحسب من السلسلة كاملة ويعتمد عليها التقييم (تُبطل التقييم المحفوظ إذا تغيرت)
+        self.context_fields = tuple(
+            field for field, used in (("iv_residual", self.iv_reference == "surface"),
+                                      ("unusual_z", self.w_unusual != 0))
+            if used
+        )
+        if not self.tolerances or not self.volume_tiers or not self.oi_tiers:
+            raise ValueError("tolerances/volume_tiers/oi_tiers must not be empty")
+
+    def with_overrides(self, overrides: dict) -> "CompiledRules":
+        """نسخة من القواعد بعد دمج تغييرات بنفس تنسيق ملف القواعد."""
+        return CompiledRules(_merge(self.spec, overrides))
+
+    def tradable_mask(self, a: dict, trend: str) -> np.ndarray:
+        """العقود القابلة للتداول وفي جهة الاتجاه (call للصعود، put للهبوط)."""
+        mask = ~a["incomplete"]
+        mask &= ~((a["ask"] <= self.min_ask) | (a["bid"] <= self.min_bid) | (a["volume"] <= self.min_volume))
+        mask &= (self.ask_min <= a["ask"]) & (a["ask"] <= self.ask_max)
+        if trend == "up":
+            mask &= a["option_type"] == "call"
+        elif trend == "down":
+            mask &= a["option_type"] == "put"
+        return mask
+
+    def tolerance_tiers(self, a: dict, trend: str, stock_price: float) -> np.ndarray:
+        """أضيق مستوى توسع يمر منه كل عقد، أو -1 إذا لم يمر من أي مستوى."""
+        tradable = self.tradable_mask(a, trend)
+        if trend not in ("up", "down"):
+            return np.where(tradable, 0, -1)
+
+        strike = a["strike"]
+        tiers = np.full(len(strike), -1)
+        for tier in range(len(self.tolerances) - 1, -1, -1):
+            call_min, call_max, put_min, put_max = self.tolerances[tier]
+            low, high = (call_min, call_max) if trend == "up" else (put_min, put_max)
+            in_range = (stock_price * low <= strike) & (strike <= stock_price * high)
+            tiers = np.where(in_range, tier, tiers)
+        return np.where(tradable, tiers, -1)
+
+    def tier_price_range(self, strike: np.ndarray, trend: str, stock_price: float) -> tuple:
+        """
+        (low, high) لكل عقد: مدى سعر السهم المفتوح حول stock_price الذي لا يعبر فيه أي حد
+        من حدود tolerances، أي لا يتغير فيه ناتج tolerance_tiers لنفس العقد.
+        السعر غير الصالح يعطي مدى فارغًا (NaN) فيُعاد الحساب دائمًا.
+        """
+        n = len(strike)
+        if not (stock_price and stock_price > 0):
+            return np.full(n, np.nan), np.full(n, np.nan)
+        if trend not in ("up", "down"):
+            return np.full(n, -np.inf), np.full(n, np.inf)
+        side = slice(0, 2) if trend == "up" else slice(2, 4)
+        bounds = np.array(sorted({b for t in self.tolerances for b in t[side] if b > 0}))
+        if not len(bounds):
+            return np.full(n, -np.inf), np.full(n, np.inf)
+        # السعر الذي يقع عنده كل Strike على كل حد بالضبط
+        crossings = strike[:, None] / bounds[None, :]
+        with np.errstate(invalid="ignore"):
+            low = np.where(crossings <= stock_price, crossings, -np.inf).max(axis=1)
+            high = np.where(crossings >= stock_price, crossings, np.inf).min(axis=1)
+        return low * (1 + TIER_RANGE_MARGIN), high * (1 - TIER_RANGE_MARGIN)
+
+    def filter_mask(self, a: dict) -> np.ndarray:
+        """فلاتر الحجم والاهتمام المفتوح الخاصة بالسهم."""
+        return (a["volume"] >= self.filters.get("min_volume", 300)) & \
+               (a["open_interest"] >= self.filters.get("min_oi", 1000))
+
+    def in_pick_range(self, a: dict, direction: str) -> np.ndarray:
+        low, high = self.pick_range["up" if direction == "up" else "down"]
+        underlying = a["underlying_price"]
+        return (underlying * low <= a["strike"]) & (a["strike"] <= underlying * high)
+
+    def score(self, a: dict) -> np.ndarray:
+        """
+        التقييم = سيولة × وزن + سبريد × وزن + نقاط IV (القرب من الهدف أو الرخص مقابل السطح) × وزن
+        + نقاط النشاط غير الاعتيادي × وزن (صفر افتراضيًا).
+        """
+        bid, ask, iv = a["bid"], a["ask"], a["implied_volatility"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            spread = np.where(bid > 0.01, (ask - bid) / bid * 100, 999.0)
+
+        liquidity_score = (
+            _tier_points(a["volume"], self.volume_tiers) +
+            _tier_points(a["open_interest"], self.oi_tiers) +
+            np.where(a["days"] <= self.weekly_days, self.weekly_bonus, 0.0)
+        )
+        spread_score = 100 - spread
+        spread_score = np.where(spread_score > 0, spread_score, 0.0)
+        if self.iv_reference == "surface":
+            # العقود بلا سطح (iv_residual مفقود) تأخذ النقاط المحايدة
+            residual = np.nan_to_num(a.get("iv_residual", np.zeros(len(iv))))
+            iv_score = np.clip(50 - residual * self.iv_residual_scale, 0.0, 100.0)
+        else:
+            iv_score = 100 - np.abs(iv - self.iv_target) * 100
+            iv_score = np.where(iv_score > 0, iv_score, 0.0)
+
+        score = liquidity_score * self.w_liquidity + spread_score * self.w_spread + iv_score * self.w_iv
+        if self.w_unusual:
+            unusual = np.nan_to_num(a.get("unusual_z", np.zeros(len(iv))))
+            score = score + np.clip(unusual * 20, 0.0, 100.0) * self.w_unusual
+        return score
+
+    def rsi_confirms(self, direction: str, rsi: float) -> bool:
+        """هل يؤكد RSI الاتجاه؟ الصعود: RSI أقل من حد الشراء، الهبوط: أعلى من حد البيع."""
+        if direction == "up":
+            return rsi < self.filters.get("rsi_buy_threshold", 30)
+        return rsi > self.filters.get("rsi_sell_threshold", 70)
+
+
+# ==================== التحميل وإعادة التحميل ====================
+
+_lock = threading.Lock()
+_loaded = {"path": None, "mtime": None, "rules": None, "version": 0}
+_compiled = {}  # symbol ("" للافتراضي) -> CompiledRules
+
+
+def _read_rules(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        stored = json.load(f)
+    rules = {"default": _merge(DEFAULT_RULES, stored.get("default", {})), "symbols": stored.get("symbols", {})}
+    # التحقق قبل الاعتماد: كل سهم يجب أن يُترجم بدون أخطاء
+    CompiledRules(rules["default"])
+    for overrides in rules["symbols"].values():
+        CompiledRules(_merge(rules["default"], overrides))
+    return rules
+
+
+def _maybe_reload():
+    path = RULES_FILE
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _loaded["rules"] is not None and (path, mtime) == (_loaded["path"], _loaded["mtime"]):
+        return
+
+    with _lock:
+        if _loaded["rules"] is not None and (path, mtime) == (_loaded["path"], _loaded["mtime"]):
+            return
+        rules = {"default": copy.deepcopy(DEFAULT_RULES), "symbols": {}}
+        if mtime is not None:
+            try:
+                rules = _read_rules(path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ ملف القواعد غير صالح ({path}): {e}")
+                metrics.incr("errors.rules")
+                if _loaded["rules"] is not None:
+                    # نُبقي القواعد السابقة ولا نعيد المحاولة حتى يتغير الملف مجددًا
+                    _loaded.update(path=path, mtime=mtime)
+                    return
+        _compiled.clear()
+        _loaded.update(path=path, mtime=mtime, rules=rules, version=_loaded["version"] + 1)
+        metrics.incr("rules.reloads")
+
+
+def get_rules(symbol: str = None) -> CompiledRules:
+    """القواعد المترجمة لسهم (الافتراضية إذا لم يكن له تخصيص)."""
+    _maybe_reload()
+    rules = _loaded["rules"]
+    key = symbol.upper() if symbol and symbol.upper() in rules["symbols"] else ""
+    compiled = _compiled.get(key)
+    if compiled is None:
+        spec = _merge(rules["default"], rules["symbols"][key]) if key else rules["default"]
+        compiled = _compiled[key] = CompiledRules(spec)
+    return compiled
+
+
+def rules_version() -> int:
+    """يزيد مع كل إعادة تحميل؛ تُستخدم لإبطال النتائج المحسوبة بقواعد قديمة."""
+    _maybe_reload()
+    return _loaded["version"]
+
+
+def set_rules_file(path: str):
+    """استخدام ملف قواعد آخر (يُحمّل عند أول استخدام)."""
+    global RULES_FILE
+    RULES_FILE = path
@@ -0,0 +1,108 @@
+"""
+scan_output.py
+--------------
+إخراج نتائج الفحص بصيغة قابلة للمعالجة آليًا، سطرًا بسطر فور اكتمال كل سهم:
+
+- JsonlWriter: سطر JSON لكل عقد (stdout أو ملف)، مع flush بعد كل سهم.
+- ParquetWriter: row group لكل سهم في ملف Parquet واحد (يتطلب pyarrow).
+
+كل سجل له نفس الحقول (FIELDS):
+    record = "symbol"  أفضل عقدين لسهم فور اكتماله (rank = الترتيب داخل السهم)
+    record = "top"     الترتيب النهائي لأفضل k عقود في الاتجاه (rank = الترتيب العام)
+
+حقول vol_tp / vol_sl / p_tp / p_sl (core/vol_targets) تُحسب دفعة واحدة بعد اكتمال كل الأسهم،
+فهي موجودة في سجلات "top" وفارغة في سجلات "symbol".
+"""
+
+import json
+import math
+import sys
+from datetime import datetime, timezone
+
+FIELDS = [
+    ("record", "string"),
+    ("trend", "string"),
+    ("rank", "int64"),
+    ("underlying_symbol", "string"),
+    ("option_type", "string"),
+    ("strike", "float64"),
+    ("expiration_date", "string"),
+    ("bucket", "string"),
+    ("bid", "float64"),
+    ("ask", "float64"),
+    ("volume", "float64"),
+    ("open_interest", "float64"),
+    ("implied_volatility", "float64"),
+    ("iv_rank", "float64"),
+    ("iv_residual", "float64"),
+    ("unusual_z", "float64"),
+    ("gamma_flip", "float64"),
+    ("max_pain", "float64"),
+    ("underlying_price", "float64"),
+    ("score", "float64"),
+    ("tp", "float64"),
+    ("sl", "float64"),
+    ("vol_tp", "float64"),
+    ("vol_sl", "float64"),
+    ("p_tp", "float64"),
+    ("p_sl", "float64"),
+    ("scanned_at", "string"),
+]
+
+
+def _clean(value, kind: str):
+    if value is None:
+        return None
+    if kind == "float64":
+        value = float(value)
+        return None if math.isnan(value) else value
+    if kind == "int64":
+        return int(value)
+    return str(value)
+
+
+def to_records(contracts: list, record: str, trend: str, scanned_at: str = None) -> list:
+    """تحويل عقود الفحص إلى سجلات بالحقول الثابتة (NaN → None)."""
+    scanned_at = scanned_at or datetime.now(timezone.utc).isoformat(timespec="seconds")
+    rows = []
+    for rank, c in enumerate(contracts, start=1):
+        raw = dict(c, record=record, trend=trend, rank=rank, scanned_at=scanned_at)
+        rows.append({name: _clean(raw.get(name), kind) for name, kind in FIELDS})
+    return rows
+
+
+class JsonlWriter:
+    def __init__(self, path: str = None):
+        """path: ملف يفتحه الكاتب ويغلقه في close()؛ بدونه الكتابة إلى stdout (لا يُغلق)."""
+        self._owned = bool(path)
+        self.stream = open(path, "w", encoding="utf-8") if path else sys.stdout
+
+    def write(self, rows: list):
+        for row in rows:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class ParquetWriter:
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("إخراج Parquet يتطلب pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in FIELDS])
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows: list):
+        if rows:
+            self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
@@ -6,42 +6,28 @@ scoring.py
 
 from typing import List, Dict, Any
 
+import numpy as np
 
-def _score_option(c):
-    bid = c.get("bid", 0)
-    ask = c.get("ask", 0)
-    volume = c.get("volume", 0)
-    oi = c.get("open_interest", 0)
-    iv = c.get("implied_volatility", 0)
-    expiration = c.get("expiration_date", "")
-
-    spread = ((ask - bid) / bid * 100) if bid > 0.01 else 999
+from core import metrics
+from core.rules import get_rules, to_arrays
 
-    # حساب الأيام حتى الانتهاء
-    try:
-        from datetime import datetime
-        exp_date = datetime.strptime(expiration, "%Y-%m-%d").date()
-        today = datetime.today().date()
-        days_to_exp = (exp_date - today).days
-    except:
-        days_to_exp = 30
 
-    # تعديل سيولة بناءً على القرب من الانتهاء
-    liquidity_bonus = 20 if days_to_exp <= 7 else 0
-
-    liquidity_score = (
-        (50 if volume >= 300 else 30 if volume >= 100 else 10) +
-        (50 if oi >= 1000 else 30 if oi >= 500 else 10) +
-        liquidity_bonus  # مكافأة للعقود الأسبوعية
-    )
+def score_contracts(contracts: List[Dict[str, Any]], symbol: str = None) -> np.ndarray:
+    """
+    تقييم كل العقود دفعة واحدة حسب قواعد السهم (core/rules):
+    السيولة (مع مكافأة للعقود القريبة من الانتهاء)، السبريد، وقرب IV من الهدف.
+    """
+    if not contracts:
+        return np.empty(0)
+    symbol = symbol or contracts[0].get("underlying_symbol")
+    return get_rules(symbol).score(to_arrays(contracts))
 
-    spread_score = max(0, 100 - spread)
-    iv_score = max(0, 100 - abs(iv - 0.40) * 100)
 
-    total = liquidity_score * 0.5 + spread_score * 0.3 + iv_score * 0.2
-    return total
+def _score_option(c):
+    return float(score_contracts([c])[0])
 
 
+@metrics.timed("scoring")
 def pick_top_2_options(contracts: List[Dict[str, Any]], direction: str) -> List[Dict[str, Any]]:
     """
     يختار أفضل عقدين بناءً على التقييم.
@@ -49,32 +35,22 @@ def pick_top_2_options(contracts: List[Dict[str, Any]], direction: str) -> List[
     if not contracts:
         return []
 
-    scored = []
-    for c in contracts:
-        underlying_price = c.get("underlying_price", 0)
-        strike = c.get("strike", 0)
-
-        if direction == "up":
-            if strike < underlying_price * 0.95 or strike > underlying_price * 1.15:
-                continue
-        else:  # down
-            if strike < underlying_price * 0.85 or strike > underlying_price * 1.05:
-                continue
+    rules = get_rules(contracts[0].get("underlying_symbol"))
+    arrays = to_arrays(contracts)
+    candidates = np.flatnonzero(rules.in_pick_range(arrays, direction))
+    scores = rules.score(arrays)
 
-        score = _score_option(c)
-        c["score"] = score
-        scored.append(c)
+    for i in candidates:
+        contracts[i]["score"] = float(scores[i])
 
-    scored.sort(key=lambda x: x["score"], reverse=True)
-    return scored[:2]
+    best = candidates[np.argsort(-scores[candidates], kind="stable")[:2]]
+    return [contracts[i] for i in best]
 
 
 def get_symbol_filter(symbol: str) -> dict:
-    """الحصول على إعدادات الفلترة الخاصة بالسهم"""
+    """الحصول على إعدادات الفلترة الخاصة بالسهم (من data/scoring_rules.json)"""
     try:
-        from data.user_preferences import user_settings
-        symbol_filters = user_settings.get("symbol_filters", {})
-        return symbol_filters.get(symbol, symbol_filters.get("default", {}))
+        return dict(get_rules(symbol).filters)
     except Exception as e:
         print(f"⚠️ خطأ في تحميل إعدادات {symbol}: {e}")
         return {
@@ -90,16 +66,10 @@ def apply_symbol_filters(contracts: list, symbol: str, trend: str) -> list:
     تطبيق الفلاتر المخصصة على العقود.
     """
     try:
-        filters = get_symbol_filter(symbol)
-        min_volume = filters.get("min_volume", 300)
-        min_oi = filters.get("min_oi", 1000)
-        
-        filtered = []
-        for c in contracts:
-            if c.get("volume", 0) >= min_volume and c.get("open_interest", 0) >= min_oi:
-                filtered.append(c)
-                
-        return filtered
+        if not contracts:
+            return []
+        keep = get_rules(symbol).filter_mask(to_arrays(contracts))
+        return [c for c, passed in zip(contracts, keep) if passed]
     except Exception as e:
         print(f"⚠️ خطأ في تطبيق الفلاتر: {e}")
         return contracts
\ No newline at end of file
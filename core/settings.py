@@ -0,0 +1,140 @@
+"""
+settings.py
+-----------
+كل إعدادات المشروع (متغيرات البيئة وملف .env) في كائن واحد.
+
+ملف .env يُقرأ مرة واحدة فقط عند أول استدعاء لـ get_settings()، وكل الوحدات
+تقرأ إعداداتها من نفس الكائن بدل استدعاء load_dotenv / os.getenv كل على حدة.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, fields
+
+
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    # التنبيهات
+    telegram_bot_token: str = None
+    telegram_chat_id: str = None
+    discord_webhook_url: str = None
+
+    # مصدر البيانات
+    market_data_provider: str = "yfinance"
+    market_data_replay_dir: str = "snapshots"
+
+    # منظّم الطلبات
+    call_timeout: float = 10.0
+    call_retries: int = 2
+    rate_limit: float = 5.0
+
+    # القياسات والكاش والقواعد
+    metrics_enabled: bool = False
+    metrics_jsonl: str = None
+    metrics_host: str = "127.0.0.1"   # نقطة /metrics محلية فقط ما لم يُحدد غير ذلك
+    metrics_port: int = 9108
+    negative_cache_enabled: bool = True
+    rules_file: str = None
+
+    # الهيكل الزمني: 0 = Weekly + Monthly فقط، وإلا كل تواريخ الانتهاء حتى هذا العدد من الأيام
+    scan_max_dte: int = 0
+    chain_workers: int = 4
+
+    # أرشيف السلاسل (core/archive)؛ بدون مجلد يبقى معطلًا
+    archive_dir: str = None
+    archive_compression: str = "lz4"
+
+    # خطوط أساس النشاط غير الاعتيادي (core/unusual_activity)؛ بدون مسار تبقى في الذاكرة فقط
+    unusual_store: str = None
+
+    # فهرس الأسهم حسب سيولة الخيارات (core/universe)؛ universe_top_n > 0 يجعل الفحص الافتراضي
+    # يستخدم أعلى N سهم من الفهرس بدل filtered_symbols
+    universe_index: str = "universe_index.json"
+    universe_top_n: int = 0
+
+    # مهلة الفحص التفاعلي الافتراضية (واجهة Streamlit) بالثواني
+    interactive_scan_budget: float = 20.0
+
+    # المراقب الخلفي
+    watcher_interval: float = 60.0
+
+
+# اسم متغير البيئة لكل حقل
+ENV_VARS = {
+    "telegram_bot_token": "TELEGRAM_BOT_TOKEN",
+    "telegram_chat_id": "TELEGRAM_CHAT_ID",
+    "discord_webhook_url": "DISCORD_WEBHOOK_URL",
+    "market_data_provider": "MARKET_DATA_PROVIDER",
+    "market_data_replay_dir": "MARKET_DATA_REPLAY_DIR",
+    "call_timeout": "MAZ_CALL_TIMEOUT",
+    "call_retries": "MAZ_CALL_RETRIES",
+    "rate_limit": "MAZ_RATE_LIMIT",
+    "metrics_enabled": "MAZ_METRICS",
+    "metrics_jsonl": "MAZ_METRICS_JSONL",
+    "metrics_host": "MAZ_METRICS_HOST",
+    "metrics_port": "MAZ_METRICS_PORT",
+    "negative_cache_enabled": "MAZ_NEGATIVE_CACHE",
+    "rules_file": "MAZ_RULES_FILE",
+    "scan_max_dte": "MAZ_SCAN_MAX_DTE",
+    "chain_workers": "MAZ_CHAIN_WORKERS",
+    "archive_dir": "MAZ_ARCHIVE_DIR",
+    "archive_compression": "MAZ_ARCHIVE_COMPRESSION",
+    "unusual_store": "MAZ_UNUSUAL_STORE",
+    "universe_index": "MAZ_UNIVERSE_INDEX",
+    "universe_top_n": "MAZ_UNIVERSE_TOP_N",
+    "interactive_scan_budget": "MAZ_SCAN_BUDGET",
+    "watcher_interval": "WATCHER_INTERVAL",
+}
+
+_CONVERTERS = {bool: _flag, int: int, float: float, str: str}
+
+_lock = threading.Lock()
+_settings = None
+
+
+def _load_dotenv():
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def settings_from_env(env=None) -> Settings:
+    """بناء الإعدادات من قاموس متغيرات بيئة (الافتراضي: os.environ)."""
+    env = os.environ if env is None else env
+    values = {}
+    for field in fields(Settings):
+        raw = env.get(ENV_VARS[field.name])
+        if raw is None or raw == "":
+            continue
+        convert = _CONVERTERS.get(type(field.default), str)
+        try:
+            values[field.name] = convert(raw)
+        except ValueError:
+            print(f"⚠️ قيمة غير صالحة لـ {ENV_VARS[field.name]}: {raw!r} — استخدام الافتراضي")
+    return Settings(**values)
+
+
+def get_settings() -> Settings:
+    """الإعدادات المشتركة (تُحمّل مع ملف .env عند أول استدعاء)."""
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                _load_dotenv()
+                _settings = settings_from_env()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """إعادة قراءة .env ومتغيرات البيئة (للإعدادات التي تُقرأ عند كل استخدام)."""
+    global _settings
+    with _lock:
+        _load_dotenv()
+        _settings = settings_from_env()
+    return _settings
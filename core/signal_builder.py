@@ -5,7 +5,9 @@ signal_builder.py
 يركز فقط على العقود القريبة من المال (Near-the-Money).
 """
 
+from core import gamma_exposure, iv_surface, metrics, unusual_activity, vol_targets
 from core.fetcher import get_weekly_and_monthly_expirations, fetch_options_for_expiration
+from core.rules import get_rules
 from core.scoring import pick_top_2_options, apply_symbol_filters
 from core.utils import option_tp_sl
 
@@ -15,6 +17,8 @@ def build_single_option_block(title: str, contract: dict, direction: str) -> str
         return f"{title}\nلا يوجد عقد {direction.upper()} مناسب.\n\n"
 
     tp, sl = option_tp_sl(contract["ask"])
+    if "vol_tp" not in contract:
+        vol_targets.annotate([contract])
 
     return f"""
 {title}
@@ -25,15 +29,26 @@ def build_single_option_block(title: str, contract: dict, direction: str) -> str
 - Bid/Ask: {contract['bid']} / {contract['ask']}
 - Volume: {contract['volume']}
 - Open Interest: {contract['open_interest']}
-- IV: {contract['implied_volatility']:.4f}
+- IV: {contract['implied_volatility']:.4f}{_residual_suffix(contract)}
 
 - سعر الدخول: {contract['ask']}
 - TP: {tp}
 - SL: {sl}
-
+- {vol_targets.format_line(contract)}
+{_unusual_line(contract)}
 """
 
 
+def _unusual_line(contract: dict) -> str:
+    line = unusual_activity.format_line(contract)
+    return f"- {line}\n" if line else ""
+
+
+def _residual_suffix(contract: dict) -> str:
+    line = iv_surface.format_residual(contract)
+    return f" | {line}" if line else ""
+
+
 def _filter_contracts_by_trend(contracts, trend, stock_price):
     """فلترة ذكية مع توسع تدريجي."""
     if not contracts or not stock_price:
@@ -92,6 +107,11 @@ def generate_option_signal_for_symbol(symbol: str, trend: str) -> str:
     else:
         return f"❌ اتجاه غير معروف للرمز {symbol}. استخدم 'up' أو 'down'."
 
+    with metrics.scan(f"signal_{symbol}"):
+        return _generate_signal(symbol, direction)
+
+
+def _generate_signal(symbol: str, direction: str) -> str:
     try:
         weekly_exp, monthly_exp = get_weekly_and_monthly_expirations(symbol)
 
@@ -102,15 +122,22 @@ def generate_option_signal_for_symbol(symbol: str, trend: str) -> str:
         from core.indicators import get_technical_indicators, check_price_alerts
         indicators = get_technical_indicators(symbol)
         current_price = indicators['price']
+        rsi_confirmed = get_rules(symbol).rsi_confirms(direction, indicators['rsi'])
         price_alerts = check_price_alerts(symbol, current_price)
         
         # جلب العقود
         weekly_contracts = fetch_options_for_expiration(symbol, weekly_exp) if weekly_exp else []
         monthly_contracts = fetch_options_for_expiration(symbol, monthly_exp) if monthly_exp else []
 
+        # سطح IV من السلسلة الكاملة قبل الفلترة (iv_residual لكل عقد)
+        iv_surface.fit_symbol(symbol, weekly_contracts + monthly_contracts)
+        unusual_activity.observe(symbol, weekly_contracts + monthly_contracts)
+        gamma = gamma_exposure.compute_symbol(symbol, weekly_contracts + monthly_contracts)
+
         # تطبيق الفلاتر المخصصة
         weekly_contracts = apply_symbol_filters(weekly_contracts, symbol, direction)
         monthly_contracts = apply_symbol_filters(monthly_contracts, symbol, direction)
+        vol_targets.annotate(weekly_contracts + monthly_contracts)
 
         top_weekly = pick_top_2_options(weekly_contracts, direction)
         top_monthly = pick_top_2_options(monthly_contracts, direction)
@@ -120,7 +147,7 @@ def generate_option_signal_for_symbol(symbol: str, trend: str) -> str:
 ------------------------------------
 📊 المؤشرات الفنية:
 - السعر الحالي: {current_price}
-- RSI (14): {indicators['rsi']}
+- RSI (14): {indicators['rsi']} {'✅ يؤكد الاتجاه' if rsi_confirmed else '⚠️ لا يؤكد الاتجاه'}
 - MA50: {indicators['ma50']}
 - MA200: {indicators['ma200']}
 """
@@ -169,13 +196,14 @@ def generate_option_signal_for_symbol(symbol: str, trend: str) -> str:
 - IV Rank: {iv_analysis['iv_rank']}%
 - الإشارة: {iv_analysis['signal']}
 """
+        alert += gamma_exposure.format_block(gamma, [exp for exp in (weekly_exp, monthly_exp) if exp])
 
         # === اكتشاف الاستراتيجيات المتقدمة ===
         all_contracts = weekly_contracts + monthly_contracts
         try:
             from core.strategies import find_straddle, find_strangle, build_strategy_block
             
-            straddle = find_straddle(symbol, all_contracts)
+            straddle = find_straddle(symbol, all_contracts, prefer_cheap_iv=True)
             strangle = find_strangle(symbol, all_contracts)
             
             if straddle or strangle:
@@ -0,0 +1,77 @@
+"""
+singleflight.py
+---------------
+دمج الطلبات المتطابقة المتزامنة: إذا طُلب نفس المفتاح (مثلًا نفس السلسلة لنفس السهم والتاريخ)
+من عدة خيوط في نفس الوقت — واجهة tkinter وجلسات Streamlit والفحص المتوازي — ينفذ أول طالب
+الطلب الفعلي وينتظر الباقون نتيجته بدل تكرار الطلب للمصدر.
+
+لا يوجد كاش: المفتاح يُحذف فور اكتمال الطلب، فالطلب التالي يجلب بيانات جديدة.
+
+النتيجة مشتركة لكن الكائنات لا: المنتظرون يأخذون نسخة (share) لأن المستدعين يعدّلون العقود
+(iv_residual، unusual_z، ...)؛ النسخة تؤخذ قبل أن يعود الطالب الأول بالنتيجة الأصلية.
+الأخطاء تُرفع لكل المنتظرين.
+
+الاستخدام:
+    _chains = Group("chains", share=lambda contracts: [dict(c) for c in contracts])
+    _chains.do((symbol, expiration), fetch, symbol, expiration)
+"""
+
+import threading
+
+from core import metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class Group:
+    """مجموعة طلبات باسم (للقياسات)، لكل مفتاح طلب واحد جارٍ على الأكثر."""
+
+    def __init__(self, name: str, share=None):
+        self.name = name
+        self.share = share or (lambda result: result)
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            metrics.incr(f"coalesced.{self.name}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return self.share(call.result)
+
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            # نسخة محفوظة قبل أن يعود الطالب الأول ويعدّل نتيجته؛ كل منتظر ينسخ منها
+            if waiters and call.error is None:
+                call.result = self.share(result)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -6,10 +6,22 @@ strategies.py
 
 from typing import List, Dict, Optional
 
+from core.iv_surface import richness
 
-def find_straddle(symbol: str, contracts: List[Dict]) -> Optional[Dict]:
+
+def _pair_residual(call: Dict, put: Dict) -> Optional[float]:
+    """متوسط iv_residual للساقين (core/iv_surface)، أو None إذا لم يُحسب السطح."""
+    residuals = [c.get("iv_residual") for c in (call, put)]
+    if any(r is None for r in residuals):
+        return None
+    return sum(residuals) / 2
+
+
+def find_straddle(symbol: str, contracts: List[Dict], prefer_cheap_iv: bool = False) -> Optional[Dict]:
     """
     البحث عن Straddle مثالي (Call + Put بنفس Strike و Expiration).
+    prefer_cheap_iv: من بين كل الأزواج المناسبة يُختار الأرخص مقابل سطح IV للسهم
+    (أقل iv_residual) بدل أول زوج مناسب.
     """
     calls = [c for c in contracts if c.get("option_type") == "call"]
     puts = [c for c in contracts if c.get("option_type") == "put"]
@@ -20,6 +32,7 @@ def find_straddle(symbol: str, contracts: List[Dict]) -> Optional[Dict]:
         key = (c["strike"], c["expiration_date"])
         call_dict[key] = c
     
+    best = None
     for p in puts:
         key = (p["strike"], p["expiration_date"])
         if key in call_dict:
@@ -27,19 +40,28 @@ def find_straddle(symbol: str, contracts: List[Dict]) -> Optional[Dict]:
             total_cost = call["ask"] + p["ask"]
             # فلترة حسب التكلفة والسيولة
             if total_cost <= 20 and call["volume"] >= 100 and p["volume"] >= 100:
-                return {
-                    "strategy": "Straddle",
-                    "symbol": symbol,
-                    "strike": p["strike"],
-                    "expiration": p["expiration_date"],
-                    "call": call,
-                    "put": p,
-                    "total_cost": round(total_cost, 2),
-                    "max_loss": round(total_cost, 2),
-                    "break_even_up": round(p["strike"] + total_cost, 2),
-                    "break_even_down": round(p["strike"] - total_cost, 2)
-                }
-    return None
+                residual = _pair_residual(call, p)
+                if best is None or (residual is not None and (best[0] is None or residual < best[0])):
+                    best = (residual, call, p, total_cost)
+                if not prefer_cheap_iv:
+                    break
+
+    if best is None:
+        return None
+    residual, call, p, total_cost = best
+    return {
+        "strategy": "Straddle",
+        "symbol": symbol,
+        "strike": p["strike"],
+        "expiration": p["expiration_date"],
+        "call": call,
+        "put": p,
+        "total_cost": round(total_cost, 2),
+        "max_loss": round(total_cost, 2),
+        "break_even_up": round(p["strike"] + total_cost, 2),
+        "break_even_down": round(p["strike"] - total_cost, 2),
+        "iv_residual": residual
+    }
 
 
 def find_strangle(symbol: str, contracts: List[Dict]) -> Optional[Dict]:
@@ -76,11 +98,19 @@ def find_strangle(symbol: str, contracts: List[Dict]) -> Optional[Dict]:
                 "total_cost": round(total_cost, 2),
                 "max_loss": round(total_cost, 2),
                 "break_even_up": round(call["strike"] + total_cost, 2),
-                "break_even_down": round(put["strike"] - total_cost, 2)
+                "break_even_down": round(put["strike"] - total_cost, 2),
+                "iv_residual": _pair_residual(call, put)
             }
     return None
 
 
+def _residual_line(strategy: Dict) -> str:
+    residual = strategy.get("iv_residual")
+    if residual is None:
+        return ""
+    return f"- IV مقابل سطح السهم: {round(residual * 100, 1) + 0.0:+.1f} نقطة ({richness(residual)})\n"
+
+
 def build_strategy_block(strategy: Dict) -> str:
     """بناء رسالة نصية للاستراتيجية."""
     if strategy["strategy"] == "Straddle":
@@ -93,7 +123,7 @@ def build_strategy_block(strategy: Dict) -> str:
 - نقطة التعادل العليا: ${strategy['break_even_up']}
 - نقطة التعادل السفلى: ${strategy['break_even_down']}
 - الحد الأقصى للخسارة: ${strategy['max_loss']} (إذا بقي السعر عند Strike)
-
+{_residual_line(strategy)}
 """
     elif strategy["strategy"] == "Strangle":
         return f"""
@@ -106,6 +136,6 @@ def build_strategy_block(strategy: Dict) -> str:
 - نقطة التعادل العليا: ${strategy['break_even_up']}
 - نقطة التعادل السفلى: ${strategy['break_even_down']}
 - الحد الأقصى للخسارة: ${strategy['max_loss']}
-
+{_residual_line(strategy)}
 """
     return ""
\ No newline at end of file
@@ -1,36 +1,248 @@
+import heapq
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
+from datetime import date
+
 from data.symbols_filtered import filtered_symbols as symbols
+from core import archive, gamma_exposure, iv_surface, metrics, negative_cache, quotes, rerank, unusual_activity, vol_targets
+from core.expiry_calendar import dte_bucket
 from core.fetcher import (
+    get_expirations_within,
     get_weekly_and_monthly_expirations,
-    fetch_options_for_expiration
+    fetch_options_for_expiration,
+    fetch_options_for_expirations
     # ← تم إزالة get_underlying_price
 )
-from core.scoring import pick_top_2_options
+from core.providers import get_provider
+from core.settings import get_settings
+from core.rules import get_rules, rules_version, to_arrays
+from core.iv_analyzer import calculate_iv_ranks
 from core.utils import option_tp_sl
 
+# حالة الفحص السابق لكل (سهم، اتجاه): (type, strike, exp) -> المدخلات والنتائج المحسوبة.
+# في الفحص التالي لا نعيد الفلترة والتقييم إلا للعقود التي تغيرت مدخلاتها.
+# تُمسح بالكامل عند إعادة تحميل ملف القواعد.
+_contract_state = {}
+_state_rules_version = None
+
+# آخر أفضل عقدين لكل سهم في كل اتجاه؛ الترتيب العام يُبنى منها
+_symbol_results = {}
+
+# العقود المرشحة (بعد الفلترة) لكل سهم في كل اتجاه، تُحفظ لإعادة الترتيب (core/rerank)
+_symbol_candidates = {}
+_last_candidates = {}  # (symbol, trend) -> مرشحو آخر process_symbol ناجح
+
+# مساهمة كل سهم في الترتيب النهائي عبر الفحوص (متوسط متحرك أسي لعدد عقوده في أفضل k)،
+# لترتيب أولوية الأسهم في الفحص محدود الوقت
+_contribution = {}
+CONTRIBUTION_DECAY = 0.8
+PRIORITY_WEIGHTS = {"contribution": 0.6, "liquidity": 0.4}
+
+# أقصى انتظار (ثوانٍ) للأسهم الجارية بعد انتهاء مهلة الفحص، قبل أن يعود الفحص
+LATE_DRAIN_S = 15.0
+
+_last_coverage = {}  # trend -> تقرير تغطية آخر فحص
 
-def process_symbol(symbol: str, trend: str):
+
+def _select_tier(contracts: list, tiers) -> list:
+    """العقود التي تمر من أول مستوى توسع يُنتج مجموعة غير فارغة (-1 = لا يمر)."""
+    passing = [t for t in tiers if t >= 0]
+    if not passing:
+        return []
+    best = min(passing)
+    return [c for c, t in zip(contracts, tiers) if t == best]
+
+
+@metrics.timed("filtering")
+def _filter_near_the_money(all_contracts: list, trend: str, stock_price: float) -> list:
+    """
+    فلترة العقود القابلة للتداول والقريبة من المال، مع توسيع النطاق تدريجيًا
+    حتى نجد مجموعة غير فارغة. الشروط والمستويات من قواعد السهم (core/rules).
+    """
+    if not all_contracts:
+        return []
+    rules = get_rules(all_contracts[0].get("underlying_symbol"))
+    tiers = rules.tolerance_tiers(to_arrays(all_contracts), trend, stock_price)
+    return _select_tier(all_contracts, tiers.tolist())
+
+
+def _nan_to_none(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _contract_key(c: dict) -> tuple:
+    return c.get("option_type"), c.get("strike"), c.get("expiration_date")
+
+
+@metrics.timed("filtering")
+def _filter_incremental(symbol: str, trend: str, all_contracts: list, stock_price: float) -> list:
+    """
+    نفس نتيجة _filter_near_the_money، لكن مستوى التوسع يُعاد حسابه (دفعة واحدة) فقط
+    للعقود التي تغير سعرها/حجمها/IV، أو التي خرج سعر السهم عن مداها: كل عقد يحفظ مدى السعر
+    الذي لا يعبر فيه أي حد من حدود المستويات (rules.tier_price_range)، فتغير السعر داخل
+    هذا المدى لا يغير مستواه.
+    """
+    global _state_rules_version
+    version = rules_version()
+    if version != _state_rules_version:
+        _contract_state.clear()
+        _state_rules_version = version
+
+    previous = _contract_state.get((symbol, trend), {})
+    current = {}
+    entries = []
+    stale = []
+    changed = 0
+
+    for i, c in enumerate(all_contracts):
+        key = _contract_key(c)
+        inputs = tuple(_nan_to_none(c.get(k)) for k in ("bid", "ask", "volume", "open_interest", "implied_volatility"))
+        entry = previous.get(key)
+        if entry is None or entry["inputs"] != inputs:
+            entry = {"inputs": inputs, "price_range": None, "tier": None, "score": None, "score_day": None}
+            changed += 1
+        price_range = entry["price_range"]
+        if price_range is None or not price_range[0] < stock_price < price_range[1]:
+            stale.append(i)
+        current[key] = entry
+        entries.append(entry)
+
+    if stale:
+        rules = get_rules(symbol)
+        a = to_arrays([all_contracts[i] for i in stale])
+        tiers = rules.tolerance_tiers(a, trend, stock_price)
+        low, high = rules.tier_price_range(a["strike"], trend, stock_price)
+        for i, tier, lo, hi in zip(stale, tiers.tolist(), low.tolist(), high.tolist()):
+            entries[i]["tier"] = tier
+            entries[i]["price_range"] = (lo, hi)
+
+    _contract_state[(symbol, trend)] = current
+    metrics.incr("contracts.changed", changed)
+    metrics.incr("contracts.unchanged", len(all_contracts) - changed)
+    metrics.incr("contracts.retiered", len(stale))
+    return _select_tier(all_contracts, [e["tier"] for e in entries])
+
+
+@metrics.timed("scoring")
+def _pick_top_2_incremental(symbol: str, trend: str, filtered: list) -> list:
+    """مثل pick_top_2_options، مع إعادة استخدام تقييم العقود التي لم تتغير."""
+    if not filtered:
+        return []
+    rules = get_rules(symbol)
+    state = _contract_state.get((symbol, trend), {})
+    today = get_provider().today()
+
+    in_range = rules.in_pick_range(to_arrays(filtered, today), trend)
+    candidates = [c for c, ok in zip(filtered, in_range) if ok]
+    entries = [state.get(_contract_key(c)) for c in candidates]
+
+    # التقييم يعتمد على الأيام حتى الانتهاء، فيُعاد مع تغير اليوم؛ وعلى حقول تُحسب من
+    # السلسلة كاملة (سطح IV، النشاط غير الاعتيادي) إذا كانت القواعد تستخدمها
+    context = rules.context_fields
+    stale = [i for i, e in enumerate(entries)
+             if e is None or e["score"] is None or e["score_day"] != today
+             or any(e.get(f) != candidates[i].get(f) for f in context)]
+    if stale:
+        scores = rules.score(to_arrays([candidates[i] for i in stale], today))
+        for i, score in zip(stale, scores.tolist()):
+            if entries[i] is not None:
+                entries[i]["score"] = score
+                entries[i]["score_day"] = today
+                for f in context:
+                    entries[i][f] = candidates[i].get(f)
+            candidates[i]["score"] = score
+    for c, e in zip(candidates, entries):
+        if e is not None:
+            c["score"] = e["score"]
+
+    metrics.incr("contracts.rescored", len(stale))
+    candidates.sort(key=lambda x: x["score"], reverse=True)
+    return candidates[:2]
+
+
+def reset_incremental_state():
+    """نسيان حالة الفحص السابق (الفحص التالي يقيّم كل العقود من جديد)."""
+    _contract_state.clear()
+    _symbol_results.clear()
+    _symbol_candidates.clear()
+
+
+def _fetch_weekly_and_monthly(symbol: str):
+    """عقود أقرب Weekly وأول Monthly (None إذا لم يوجد أي تاريخ انتهاء)."""
+    weekly_exp, monthly_exp = get_weekly_and_monthly_expirations(symbol)
+    if not weekly_exp and not monthly_exp:
+        print("❌ No weekly/monthly expirations")
+        return None
+
+    weekly_contracts = fetch_options_for_expiration(symbol, weekly_exp) if weekly_exp else []
+    monthly_contracts = fetch_options_for_expiration(symbol, monthly_exp) if monthly_exp else []
+
+    print(f"Weekly contracts: {len(weekly_contracts)}")
+    print(f"Monthly contracts: {len(monthly_contracts)}")
+    return weekly_contracts + monthly_contracts
+
+
+def _fetch_term_structure(symbol: str, max_dte: int):
+    """
+    عقود كل تواريخ الانتهاء حتى max_dte يوم، تُجلب بالتوازي وتُدمج في قائمة واحدة،
+    فتبقى الفلترة والتقييم استدعاءً واحدًا على مصفوفة واحدة مهما زاد عدد التواريخ.
+    """
+    expirations = get_expirations_within(symbol, max_dte)
+    if not expirations:
+        print(f"❌ No expirations within {max_dte} days")
+        return None
+
+    contracts = fetch_options_for_expirations(symbol, expirations)
+    print(f"Expirations: {len(expirations)} (≤ {max_dte} DTE) | contracts: {len(contracts)}")
+    metrics.incr("expirations.fetched", len(expirations))
+    return contracts
+
+
+def _tag_buckets(contracts: list, today: date):
+    """إضافة شريحة DTE (عمود bucket) لكل عقد؛ الحساب مرة واحدة لكل تاريخ انتهاء."""
+    buckets = {}
+    for c in contracts:
+        exp = c.get("expiration_date")
+        if exp not in buckets:
+            buckets[exp] = dte_bucket((date.fromisoformat(exp) - today).days)
+        c["bucket"] = buckets[exp]
+
+
+def process_symbol(symbol: str, trend: str, max_dte: int = 0):
     """
     يعالج سهم واحد ويعيد أفضل عقدين بناءً على الاتجاه.
     يركز فقط على العقود القريبة من المال (Near-the-Money).
+    max_dte: 0 = Weekly + Monthly فقط، وإلا كل تواريخ الانتهاء حتى هذا العدد من الأيام.
     """
     try:
-        print(f"\n🔍 Processing {symbol} ...")
-
-        # 1) جلب Weekly + Monthly expirations
-        weekly_exp, monthly_exp = get_weekly_and_monthly_expirations(symbol)
-
-        # 2) جلب العقود
-        weekly_contracts = fetch_options_for_expiration(symbol, weekly_exp) if weekly_exp else []
-        monthly_contracts = fetch_options_for_expiration(symbol, monthly_exp) if monthly_exp else []
+        # 0) تخطي الرموز التي لم تُنتج شيئًا مؤخرًا
+        skip, reason = negative_cache.should_skip(symbol, trend)
+        if skip:
+            print(f"⏭️ Skipping {symbol} ({reason})")
+            metrics.incr("symbols.negative_skipped")
+            return []
 
-        print(f"Weekly contracts: {len(weekly_contracts)}")
-        print(f"Monthly contracts: {len(monthly_contracts)}")
+        print(f"\n🔍 Processing {symbol} ...")
+        metrics.incr("symbols.scanned")
+
+        # 1-2) جلب العقود: Weekly + Monthly، أو الهيكل الزمني الكامل حتى max_dte يوم
+        if max_dte:
+            all_contracts = _fetch_term_structure(symbol, max_dte)
+        else:
+            all_contracts = _fetch_weekly_and_monthly(symbol)
+        if all_contracts is None:
+            if not negative_cache.has_active(symbol):  # لا نستبدل تسجيل خطأ الشبكة
+                negative_cache.record(symbol, "no_expirations")
+            return []
 
-        all_contracts = weekly_contracts + monthly_contracts
         print(f"Total before filtering: {len(all_contracts)}")
 
         if not all_contracts:
             print("❌ No contracts found")
+            metrics.incr("symbols.no_contracts")
+            if not negative_cache.has_active(symbol):
+                negative_cache.record(symbol, "no_liquid_strikes")
             return []
 
         # 3) ✅ استخراج السعر الحالي من أول عقد (تمت إضافته في fetch_options_for_expiration)
@@ -39,65 +251,31 @@ def process_symbol(symbol: str, trend: str):
             print("❌ Failed to fetch underlying price from contracts")
             return []
 
-        # 4) ✅ فلترة ذكية للصفقات الحقيقية (مع توسيع تدريجي)
-        filtered = []
-        tolerances = [
-            (0.98, 1.05, 0.95, 1.02),  # ±2% للـ Call، ±5% للـ Put (ضيق)
-            (0.95, 1.10, 0.90, 1.05),  # ±5% للـ Call، ±10% للـ Put (متوسط)
-            (0.90, 1.15, 0.85, 1.10),  # ±10% للـ Call، ±15% للـ Put (واسع)
-        ]
-
-        for call_min_mult, call_max_mult, put_min_mult, put_max_mult in tolerances:
-            temp_filtered = []
-            for c in all_contracts:
-                ask = c.get("ask", 0)
-                bid = c.get("bid", 0)
-                strike = c.get("strike")
-                iv = c.get("implied_volatility")
-                volume = c.get("volume", 0)
-                option_type = c.get("option_type")
-
-                if strike is None or iv is None or option_type is None:
-                    continue
-
-                # ✅ استبعد العقود غير القابلة للتداول
-                if ask <= 0.01 or bid <= 0.01 or volume <= 10:
-                    continue
-
-                # ✅ نطاق سعري واقعي للتداول اليومي
-                if not (0.5 <= ask <= 20):
-                    continue
-
-                # ✅ شرط المنطق الحقيقي للصفقات (مع التوسع التدريجي)
-                if trend == "up":
-                    if option_type != "call":
-                        continue
-                    if not (stock_price * call_min_mult <= strike <= stock_price * call_max_mult):
-                        continue
-                elif trend == "down":
-                    if option_type != "put":
-                        continue
-                    if not (stock_price * put_min_mult <= strike <= stock_price * put_max_mult):
-                        continue
-
-                temp_filtered.append(c)
-
-            if temp_filtered:
-                filtered = temp_filtered
-                break  # نستخدم أول مجموعة ناجحة
+        # سطح IV للسهم من السلسلة الكاملة (من الكاش إذا لم تتغير): iv_residual لكل عقد
+        iv_surface.fit_symbol(symbol, all_contracts)
+        # خطوط أساس النشاط (تزايديًا) و unusual_z لكل عقد
+        unusual_activity.observe(symbol, all_contracts)
+        # GEX و Gamma flip و Max pain من نفس السلسلة (من الكاش إذا لم تتغير)
+        gamma_exposure.compute_symbol(symbol, all_contracts)
 
+        # 4) ✅ فلترة ذكية للصفقات الحقيقية (مع توسيع تدريجي) — فقط للعقود التي تغيرت
+        filtered = _filter_incremental(symbol, trend, all_contracts, stock_price)
         print(f"After filtering: {len(filtered)}")
 
         if not filtered:
             print("❌ No contracts after filtering")
+            metrics.incr("symbols.no_liquid_strikes")
+            negative_cache.record(symbol, "no_liquid_strikes", trend)
             return []
 
-        # 5) حساب IV Rank
-        for c in filtered:
-            c["iv_rank"] = calculate_iv_rank(filtered)
+        # 5) حساب IV Rank (نسبةً إلى باقي العقود المفلترة) وشريحة DTE
+        filtered_ivs = [c.get("implied_volatility", 0) for c in filtered]
+        for c, iv_rank in zip(filtered, calculate_iv_ranks(filtered_ivs)):
+            c["iv_rank"] = iv_rank
+        _tag_buckets(filtered, get_provider().today())
 
-        # 6) اختيار أفضل عقدين
-        top2 = pick_top_2_options(filtered, trend)
+        # 6) اختيار أفضل عقدين (مع إعادة استخدام تقييم العقود التي لم تتغير)
+        top2 = _pick_top_2_incremental(symbol, trend, filtered)
         print(f"Top2 selected: {len(top2)}")
 
         # 7) إضافة TP/SL
@@ -108,29 +286,218 @@ def process_symbol(symbol: str, trend: str):
             c["sl"] = sl
             c["direction"] = trend
 
+        negative_cache.clear(symbol, trend)
+        _last_candidates[(symbol, trend)] = filtered
         return top2
 
     except Exception as e:
         print(f"⚠️ Error in {symbol}: {e}")
+        metrics.incr("errors.symbols")
         return []
 
 
-def get_top_10_across_symbols(trend: str):
+def _process_universe(trend: str, universe: list, workers: int, cancel=None, max_dte: int = 0,
+                      deadline: float = None):
     """
-    يجمع أفضل 10 عقود من جميع الأسهم.
+    (symbol, top2, candidates) لكل سهم بترتيب اكتمال المعالجة.
+    عند ضبط cancel لا يبدأ أي سهم جديد (الأسهم الجارية تكتمل)، والأسهم المتبقية لا تُرجع.
+    deadline (time.time()): بعده لا يبدأ أي سهم، والأسهم الجارية تُنتظر (حتى LATE_DRAIN_S) قبل
+    العودة دون أن تدخل نتائجها هذا الفحص. process_symbol يكتب حالة مشتركة (_contract_state،
+    مرشحو re-rank، النشاط غير المعتاد، GEX، الأرشيف)، فلو تُركت تعمل لتسابقت مع الفحص التالي
+    (فحص الاتجاه الآخر في الواجهة يبدأ مباشرة، وكذلك فحص المراقب التالي).
     """
-    all_results = []
-
-    for symbol in symbols:
-        top2 = process_symbol(symbol, trend)
-        if top2:
-            all_results.extend(top2)
-
-    print(f"\n📊 Total collected contracts: {len(all_results)}")
-
-    all_results.sort(key=lambda x: x.get("score", 0), reverse=True)
-
-    return all_results[:10]
+    def run(symbol):
+        if cancel is not None and cancel.is_set():
+            return None
+        if deadline is not None and time.time() >= deadline:
+            return None
+        top2 = process_symbol(symbol, trend, max_dte)
+        return symbol, top2, _last_candidates.pop((symbol, trend), None)
+
+    if workers <= 1 and deadline is None:
+        for symbol in universe:
+            result = run(symbol)
+            if result is None:
+                return
+            yield result
+        return
+
+    # الجلب مقيد بالشبكة؛ المنظّم المشترك (core/governor) يضبط معدل الطلبات بين الخيوط.
+    # مع المهلة حتى workers=1 يعمل في خيط منفصل، حتى لا يتجاوز سهم بطيء الموعد.
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="scan")
+    futures = []
+    try:
+        futures = [executor.submit(run, s) for s in universe]
+        timeout = None if deadline is None else max(deadline - time.time(), 0.0)
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                result = future.result()
+                if result is not None:
+                    yield result
+        except FuturesTimeout:
+            pass
+    finally:
+        if deadline is None:
+            executor.shutdown(wait=True)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+            _drain_late(futures)
+
+
+def _drain_late(futures: list):
+    """انتظار الأسهم التي بدأت قبل الموعد ولم تكتمل، بحد أقصى LATE_DRAIN_S."""
+    running = [f for f in futures if not f.done()]
+    if not running:
+        return
+    metrics.incr("symbols.late_drained", len(running))
+    _, late = wait(running, timeout=LATE_DRAIN_S)
+    if late:
+        print(f"⚠️ {len(late)} أسهم ما زالت تعمل بعد {LATE_DRAIN_S:.0f} ث من انتهاء مهلة الفحص")
+        metrics.incr("symbols.abandoned", len(late))
+
+
+def _prioritise(universe: list) -> list:
+    """
+    ترتيب الأسهم للفحص محدود الوقت: مساهمتها السابقة في أفضل k ثم سيولة خياراتها
+    (فهرس core/universe إن وُجد، بدون بناء). التعادل يحفظ الترتيب الأصلي.
+    """
+    from core import universe as universe_index
+
+    index = universe_index.get_index(rebuild=False)
+    liquidity = {entry["symbol"]: entry["score"] for entry in index["symbols"]} if index else {}
+    top = max(_contribution.values(), default=0.0) or 1.0
+    weight = PRIORITY_WEIGHTS
+    priority = {
+        s: weight["contribution"] * _contribution.get(s, 0.0) / top + weight["liquidity"] * liquidity.get(s, 0.0) / 100
+        for s in universe
+    }
+    return sorted(universe, key=priority.get, reverse=True)
+
+
+def _record_contribution(processed: set, top: list):
+    """تحديث المساهمة للأسهم التي فُحصت فقط (المتخطاة تحتفظ بقيمتها)."""
+    counts = {}
+    for c in top:
+        counts[c.get("underlying_symbol")] = counts.get(c.get("underlying_symbol"), 0) + 1
+    for symbol in processed:
+        _contribution[symbol] = CONTRIBUTION_DECAY * _contribution.get(symbol, 0.0) + counts.get(symbol, 0)
+
+
+def get_coverage(trend: str) -> dict:
+    """تقرير تغطية آخر فحص للاتجاه (None إذا لم يُفحص بعد)."""
+    return _last_coverage.get(trend)
+
+
+def format_coverage(coverage: dict) -> str:
+    """سطر وصف التغطية (فارغ إذا اكتمل الفحص)."""
+    if not coverage or coverage["complete"]:
+        return ""
+    reason = f"انتهت المهلة ({coverage['budget']:g} ث)" if coverage["timed_out"] else "تم الإيقاف"
+    skipped = coverage["skipped"]
+    shown = ", ".join(skipped[:15]) + (f" و{len(skipped) - 15} غيرها" if len(skipped) > 15 else "")
+    return (f"⏱️ {reason}: فُحص {coverage['scanned']} من {coverage['total']} سهم "
+            f"خلال {coverage['elapsed']:.1f} ث — لم يُفحص: {shown}")
+
+
+def _default_universe() -> list:
+    top_n = get_settings().universe_top_n
+    if top_n > 0:
+        from core import universe
+        return universe.top_symbols(top_n)
+    return symbols
+
+
+def get_top_10_across_symbols(trend: str, universe: list = None, k: int = 10, workers: int = 1,
+                              on_result=None, cancel=None, on_universe=None, max_dte: int = None,
+                              budget: float = None):
+    """
+    يجمع أفضل k عقود (الافتراضي 10) من جميع الأسهم.
+    universe: قائمة رموز بديلة (الافتراضي: filtered_symbols، أو أعلى MAZ_UNIVERSE_TOP_N سهم
+              سيولة من core/universe إذا ضُبط).
+    workers: عدد الأسهم التي تُعالج بالتوازي.
+    on_result: دالة تُستدعى بـ (symbol, top2) فور اكتمال كل سهم (للإخراج المتدفق).
+    cancel: threading.Event لإيقاف الفحص؛ الترتيب يُبنى من الأسهم التي اكتملت فقط.
+    on_universe: دالة تُستدعى بقائمة الرموز بعد الاستبعاد المسبق (لحساب التقدم).
+    max_dte: فحص كل تواريخ الانتهاء حتى هذا العدد من الأيام (الافتراضي: MAZ_SCAN_MAX_DTE؛
+             0 = Weekly + Monthly فقط).
+    budget: مهلة بالثواني للفحص التفاعلي (None/0 = فحص كامل). الأسهم تُرتب حسب مساهمتها
+            السابقة وسيولتها، وعند انتهاء المهلة يُرجع الترتيب من الأسهم المكتملة فقط؛
+            تقرير التغطية (الأسهم غير المفحوصة) في get_coverage(trend).
+    """
+    started = time.time()
+    if max_dte is None:
+        max_dte = get_settings().scan_max_dte
+    ranking = _symbol_results.setdefault(trend, {})
+    candidates = _symbol_candidates.setdefault(trend, {})
+
+    with metrics.scan(f"top10_{trend}"):
+        # سعر كل الرموز بطلب واحد، واستبعاد غير المناسب قبل تنزيل أي سلسلة
+        universe = universe or _default_universe()
+        quotes.prefetch_quotes(universe)
+        universe = quotes.prefilter_symbols(universe)
+        deadline = started + budget if budget else None
+        if deadline is not None:
+            universe = _prioritise(universe)
+        if on_universe:
+            on_universe(universe)
+
+        # الترتيب العام يُحدّث سهمًا بسهم: كل سهم يستبدل نتيجته السابقة فقط
+        processed = set()
+        for symbol, top2, filtered in _process_universe(trend, universe, workers, cancel, max_dte, deadline):
+            processed.add(symbol)
+            if top2:
+                ranking[symbol] = top2
+                candidates[symbol] = filtered
+            else:
+                ranking.pop(symbol, None)
+                candidates.pop(symbol, None)
+            if on_result:
+                on_result(symbol, top2)
+
+        skipped = [s for s in universe if s not in processed]
+        _last_coverage[trend] = coverage = {
+            "budget": budget or None,
+            "elapsed": round(time.time() - started, 2),
+            "scanned": len(processed),
+            "total": len(universe),
+            "skipped": skipped,
+            "complete": not skipped,
+            "timed_out": bool(skipped) and deadline is not None and time.time() >= deadline,
+        }
+        if skipped:
+            if coverage["timed_out"]:
+                print(format_coverage(coverage))
+                metrics.incr("symbols.deadline_skipped", len(skipped))
+            else:
+                print(f"⏹️ تم إيقاف الفحص بعد {len(processed)} من {len(universe)} سهم")
+                metrics.incr("symbols.cancelled", len(skipped))
+        active = processed
+        scan_candidates = {s: c for s, c in candidates.items() if s in active}
+        # أهداف TP/SL المتدرجة بالتقلب لكل مرشحي الفحص دفعة واحدة (تشمل أفضل عقدين لكل سهم)
+        vol_targets.annotate([c for contracts in scan_candidates.values() for c in contracts])
+        rerank.store(trend, scan_candidates)
+        all_results = [c for symbol, top2 in ranking.items() if symbol in active for c in top2]
+        print(f"\n📊 Total collected contracts: {len(all_results)}")
+        report_degraded_symbols(started)
+
+        with metrics.timer("ranking"):
+            top10 = heapq.nlargest(k, all_results, key=lambda x: x.get("score", 0))
+        _record_contribution(processed, top10)
+        archive.flush()
+        unusual_activity.persist()
+
+    return top10
+
+
+def report_degraded_symbols(since: float = None) -> dict:
+    """طباعة الرموز التي تأثرت بالخنق أو المهلة أو قاطع الدائرة منذ وقت معين."""
+    from core.governor import get_governor
+    degraded = get_governor().degraded_symbols(since)
+    if degraded:
+        metrics.incr("symbols.degraded", len(degraded))
+        details = ", ".join(f"{s} ({reason})" for s, reason in sorted(degraded.items()))
+        print(f"⚠️ رموز متأثرة ({len(degraded)}): {details}")
+    return degraded
 
 
 def build_top10_alert(contracts):
@@ -143,14 +510,17 @@ def build_top10_alert(contracts):
     lines = ["🔥 أفضل 10 عقود حسب الفلترة:\n"]
 
     for c in contracts:
+        bucket = f" | {c['bucket']}" if c.get("bucket") else ""
         line = (
-            f"📌 {c.get('underlying_symbol')} | {c.get('direction').upper()}\n"
+            f"📌 {c.get('underlying_symbol')} | {c.get('direction').upper()}{bucket}\n"
             f"Strike: {c.get('strike')} | Exp: {c.get('expiration_date')}\n"
             f"Bid: {c.get('bid')} | Ask: {c.get('ask')}\n"
             f"IV: {round(c.get('implied_volatility', 0), 4)} | Score: {round(c.get('score', 0), 2)}\n"
             f"TP: {c.get('tp')} | SL: {c.get('sl')}\n"
-            "-----------------------------\n"
         )
-        lines.append(line)
+        for extra in (vol_targets.format_line(c), unusual_activity.format_line(c)):
+            if extra:
+                line += extra + "\n"
+        lines.append(line + "-----------------------------\n")
 
     return "".join(lines)
\ No newline at end of file
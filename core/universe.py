@@ -0,0 +1,267 @@
+"""
+universe.py
+-----------
+فهرس ديناميكي لأسهم الفحص مرتبًا حسب سيولة الخيارات، بدل القائمة الثابتة
+data/symbols_filtered.filtered_symbols وحدها.
+
+المرشحون: filtered_symbols + favorite_symbols (مثل SPY و QQQ) + رموز price_levels.
+
+لكل مرشح إحصاءات أقرب تاريخ انتهاء (أكثر العقود سيولة، ونفس الأساس لكل الأسهم):
+- volume: مجموع حجم التداول.
+- open_interest: مجموع OI.
+- spread: متوسط السبريد النسبي (ask - bid) / mid للعقود القريبة من السعر، بوزن الحجم.
+
+المصدر: أرشيف السلاسل (core/archive) لآخر LOOKBACK_DAYS أيام إذا كان مفعلًا (آخر لقطة لكل
+يوم، ومتوسط الأيام)، وإلا جلب خفيف لسلسلة واحدة لكل سهم.
+
+الترتيب: score = 100 × مجموع موزون للمئينات (الحجم، OI، وعكس السبريد) عبر كل المرشحين،
+محسوبة دفعة واحدة على مصفوفات numpy.
+
+الفهرس يُحفظ في MAZ_UNIVERSE_INDEX (JSON) ويُعاد بناؤه مرة واحدة في اليوم عند أول طلب.
+MAZ_UNIVERSE_TOP_N > 0 يجعل الفحص الافتراضي يستخدم أعلى N سهم بدل filtered_symbols.
+
+الاستخدام:
+    top_symbols(30)                    # أعلى 30 سهم سيولة (يبني فهرس اليوم إذا لزم)
+    python -m core.universe --rebuild --show 20
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+from core import archive, metrics
+from core.settings import get_settings
+
+LOOKBACK_DAYS = 5
+LOOKBACK_CALENDAR_DAYS = 14  # نطاق مجلدات الأرشيف التي تُفحص للعثور على LOOKBACK_DAYS أيام تداول
+NEAR_MONEY = 0.10          # |ln(K/S)| للعقود التي يدخل سبريدها في المتوسط
+MAX_SPREAD = 2.0
+WEIGHTS = {"volume": 0.4, "open_interest": 0.3, "spread": 0.3}
+
+# أعمدة إحصاءات السلسلة بترتيب معاملات _chain_stats
+_STAT_COLUMNS = ("strike", "bid", "ask", "volume", "open_interest", "underlying_price")
+_ARCHIVE_COLUMNS = ["ts", "expiration_date", *_STAT_COLUMNS]
+
+_lock = threading.Lock()
+_index = None  # آخر فهرس محمّل أو مبني
+
+
+def candidates() -> list:
+    """كل الرموز المرشحة بدون تكرار (بترتيب القوائم الأصلية)."""
+    from data.price_levels import price_levels
+    from data.symbols_filtered import filtered_symbols
+    from data.user_preferences import user_settings
+    found = list(filtered_symbols) + list(user_settings.get("favorite_symbols", [])) + list(price_levels)
+    return list(dict.fromkeys(s.upper() for s in found))
+
+
+def _chain_stats(strike, bid, ask, volume, oi, spot) -> tuple:
+    """(volume، OI، السبريد النسبي الموزون) لسلسلة تاريخ انتهاء واحد."""
+    volume, oi = np.nan_to_num(volume), np.nan_to_num(oi)
+    bid, ask = np.nan_to_num(bid), np.nan_to_num(ask)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        near = (ask > 0) & (np.abs(np.log(strike / spot)) <= NEAR_MONEY)
+        relative = np.clip((ask - bid) / ((ask + bid) / 2), 0.0, MAX_SPREAD)
+    spread = float(np.average(relative[near], weights=volume[near] + 1)) if near.any() else float("nan")
+    return float(volume.sum()), float(oi.sum()), spread
+
+
+def _front_expiration(expirations, day: str):
+    upcoming = sorted(e for e in set(expirations) if e >= day)
+    return upcoming[0] if upcoming else None
+
+
+def _archive_stats(symbols: list, day: str) -> dict:
+    """{symbol: (volume، OI، spread)} كمتوسط آخر LOOKBACK_DAYS أيام مؤرشفة حتى day."""
+    start = date.fromisoformat(day) - timedelta(days=LOOKBACK_CALENDAR_DAYS)
+    by_symbol = {}
+    for part_day, symbol, _ in reversed(archive.partitions(symbols, start=start, end=day)):
+        days = by_symbol.setdefault(symbol, [])
+        if len(days) >= LOOKBACK_DAYS:
+            continue
+        table = archive.read(symbol, part_day, part_day, columns=_ARCHIVE_COLUMNS)
+        if not table.num_rows:
+            continue
+        a = {name: table.column(name).to_numpy() for name in _ARCHIVE_COLUMNS}
+        front = _front_expiration(a["expiration_date"], part_day)
+        if front is None:
+            continue
+        rows = a["expiration_date"] == front
+        # آخر لقطة فقط: الحجم تراكمي خلال اليوم، فجمع اللقطات يكرر العدّ
+        rows &= a["ts"] == a["ts"][rows].max()
+        days.append(_chain_stats(*(a[name][rows].astype(float) for name in _STAT_COLUMNS)))
+    return {s: tuple(np.nanmean(np.array(d), axis=0).tolist()) for s, d in by_symbol.items() if d}
+
+
+def _live_stats(symbol: str):
+    """جلب خفيف: سلسلة أقرب تاريخ انتهاء فقط (None إذا تعذر)."""
+    from core.fetcher import fetch_options_for_expiration, get_expirations_within
+
+    expirations = get_expirations_within(symbol, 366)
+    if not expirations:
+        return None
+    contracts = fetch_options_for_expiration(symbol, expirations[0])
+    if not contracts:
+        return None
+    return _chain_stats(*(np.array([c.get(name) for c in contracts], dtype=float) for name in _STAT_COLUMNS))
+
+
+def _percentiles(values: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """مئين كل قيمة بين 0 و 1 (القيم المفقودة = 0)."""
+    missing = ~np.isfinite(values)
+    keyed = np.where(missing, -np.inf, values if higher_is_better else -values)
+    ranks = np.empty(len(values))
+    ranks[np.argsort(keyed, kind="stable")] = np.arange(len(values))
+    present = len(values) - missing.sum()
+    ranks = (ranks - missing.sum()) / max(present - 1, 1)
+    return np.where(missing, 0.0, np.clip(ranks, 0.0, 1.0))
+
+
+def rank(stats: dict) -> list:
+    """ترتيب {symbol: (volume، OI، spread) أو None} تنازليًا حسب score السيولة."""
+    names = list(stats)
+    values = np.array([stats[s] if stats[s] else (np.nan, np.nan, np.nan) for s in names], dtype=float)
+    values = values.reshape(len(names), 3)
+    with np.errstate(divide="ignore"):
+        score = 100 * (WEIGHTS["volume"] * _percentiles(np.log1p(values[:, 0]))
+                       + WEIGHTS["open_interest"] * _percentiles(np.log1p(values[:, 1]))
+                       + WEIGHTS["spread"] * _percentiles(values[:, 2], higher_is_better=False))
+    entries = []
+    for i in np.argsort(-score, kind="stable").tolist():
+        volume, oi, spread = values[i]
+        entries.append({
+            "symbol": names[i],
+            "score": round(float(score[i]), 1),
+            "volume": None if math.isnan(volume) else volume,
+            "open_interest": None if math.isnan(oi) else oi,
+            "spread": None if math.isnan(spread) else round(float(spread), 4),
+        })
+    return entries
+
+
+@metrics.timed("universe_build")
+def build(symbols: list = None, workers: int = None) -> dict:
+    """بناء فهرس اليوم: الأرشيف أولًا، وجلب خفيف بالتوازي للأسهم غير المؤرشفة."""
+    from core.providers import get_provider
+
+    symbols = symbols or candidates()
+    day = get_provider().today().isoformat()
+    stats, sources = {}, {}
+    if archive.is_enabled():
+        for symbol, values in _archive_stats(symbols, day).items():
+            stats[symbol], sources[symbol] = values, "archive"
+
+    missing = [s for s in symbols if s not in stats]
+    if missing:
+        workers = min(workers or get_settings().chain_workers, len(missing))
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="universe") as executor:
+            for symbol, values in zip(missing, executor.map(_live_stats, missing)):
+                stats[symbol], sources[symbol] = values, "live" if values else "none"
+
+    entries = rank({s: stats.get(s) for s in symbols})
+    for entry in entries:
+        entry["source"] = sources.get(entry["symbol"], "none")
+    return {"built": day, "symbols": entries}
+
+
+def index_path() -> str:
+    return get_settings().universe_index
+
+
+def save_index(index: dict, path: str = None):
+    """كتابة ذرية للفهرس."""
+    path = path or index_path()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def load_index(path: str = None) -> dict:
+    path = path or index_path()
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ تعذّر قراءة فهرس الأسهم من {path}: {e}")
+        return None
+    return index if isinstance(index.get("symbols"), list) else None
+
+
+def get_index(rebuild: bool = True, force: bool = False) -> dict:
+    """
+    فهرس اليوم: من الذاكرة، ثم من الملف، وإلا يُبنى ويُحفظ (مرة واحدة في اليوم).
+    rebuild=False: أي فهرس متاح ولو قديمًا بدون بناء أبدًا (None إذا لا يوجد)؛
+    force=True: إعادة البناء دائمًا.
+    إذا فشل البناء يُستخدم آخر فهرس متاح ولو كان قديمًا.
+    """
+    global _index
+    from core.providers import get_provider
+
+    day = get_provider().today().isoformat()
+    with _lock:
+        if _index is None:
+            _index = load_index()
+        if _index is not None and not force and (_index["built"] == day or not rebuild):
+            return _index
+        if not rebuild and not force:
+            return None
+        try:
+            index = build()
+        except Exception as e:
+            print(f"⚠️ فشل بناء فهرس الأسهم: {e}")
+            metrics.incr("errors.universe")
+            return _index
+        if not any(entry["source"] != "none" for entry in index["symbols"]):
+            return _index or index
+        _index = index
+        if index_path():
+            try:
+                save_index(index)
+            except OSError as e:
+                print(f"⚠️ فشل حفظ فهرس الأسهم: {e}")
+        return _index
+
+
+def top_symbols(n: int, rebuild: bool = True) -> list:
+    """أعلى n سهم سيولة (filtered_symbols إذا لم يتوفر فهرس)."""
+    index = get_index(rebuild)
+    if index is None:
+        from data.symbols_filtered import filtered_symbols
+        return list(filtered_symbols)[:n]
+    return [entry["symbol"] for entry in index["symbols"] if entry["source"] != "none"][:n]
+
+
+def clear():
+    global _index
+    with _lock:
+        _index = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="فهرس الأسهم حسب سيولة الخيارات")
+    parser.add_argument("--rebuild", action="store_true", help="إعادة البناء الآن حتى لو كان فهرس اليوم موجودًا")
+    parser.add_argument("--show", type=int, default=20, help="عدد الأسهم المعروضة")
+    args = parser.parse_args()
+
+    index = get_index(force=args.rebuild)
+    if index is None:
+        print("❌ لا يوجد فهرس.")
+        return
+    print(f"📋 فهرس {index['built']} ({len(index['symbols'])} سهم):")
+    for i, entry in enumerate(index["symbols"][:args.show], start=1):
+        spread = "—" if entry["spread"] is None else f"{entry['spread']:.1%}"
+        print(f"{i:>3}. {entry['symbol']:<6} {entry['score']:>5.1f} | Volume {entry['volume'] or 0:,.0f}"
+              f" | OI {entry['open_interest'] or 0:,.0f} | Spread {spread} | {entry['source']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+unusual_activity.py
+-------------------
+كشف النشاط غير الاعتيادي في سلاسل الخيارات: حجم أو حجم/OI أو قيمة متداولة (premium)
+غير طبيعية لهذا العقد بالذات أو لهذا السهم، بدل حدود ثابتة مثل 300 حجم أو 1000 OI.
+
+المقاييس (بعد log1p لتقليل أثر القيم الضخمة):
+    volume، volume / OI، premium = volume × mid × 100
+
+خطوط الأساس: متوسط وتباين أُسّيان (EWMA بنصف عمر HALF_LIFE_DAYS يوم تداول) لكل عقد
+(type, strike, exp) ولكل سهم (مجموع السلسلة). الحجم تراكمي خلال اليوم، لذلك آخر قيمة في اليوم
+تُحفظ "معلقة" ولا تُضم إلى خط الأساس إلا عند أول فحص في يوم لاحق: الفحوص المتكررة خلال اليوم
+(والفحص مرتين للاتجاهين) لا تُحتسب أكثر من مرة. التحديث تزايدي ومتجه لكل فحص.
+
+z لكل مقياس: من خط أساس العقد إذا كان له MIN_HISTORY يوم على الأقل، وإلا z متين (median/MAD)
+مقابل باقي عقود السلسلة في نفس الفحص. unusual_z = أكبر الثلاثة، والعقد "غير اعتيادي" إذا
+تجاوز Z_THRESHOLD مع حد أدنى للحجم والقيمة.
+
+الحقول المضافة لكل عقد: unusual_z, unusual, vol_oi, premium.
+الحفظ بين التشغيلات: MAZ_UNUSUAL_STORE=unusual.npz (جداول numpy مضغوطة، تُحفظ بعد كل فحص).
+"""
+
+import os
+import threading
+from datetime import date
+
+import numpy as np
+
+from core import metrics
+from core.settings import get_settings
+
+METRICS = ("volume", "vol_oi", "premium")
+HALF_LIFE_DAYS = 10
+ALPHA = 1 - 0.5 ** (1 / HALF_LIFE_DAYS)
+MIN_HISTORY = 3           # أيام قبل الاعتماد على خط أساس العقد نفسه
+SD_FLOOR = 0.25           # أقل انحراف معياري (بوحدات log) حتى لا تنفجر z مع تاريخ قصير
+CHAIN_SD_FLOOR = 0.5
+Z_THRESHOLD = 3.0
+MIN_VOLUME = 250
+MIN_PREMIUM = 25_000
+
+_lock = threading.Lock()
+_loaded = False
+_flags = {}               # contract id -> آخر رصد غير اعتيادي اليوم
+_flags_day = None
+_symbol_activity = {}     # symbol -> نشاط السلسلة كاملة في آخر فحص
+
+
+class BaselineTable:
+    """خطوط أساس EWMA لمجموعة مفاتيح، كمصفوفات numpy (صف لكل مفتاح)."""
+
+    def __init__(self, width: int = len(METRICS)):
+        self.width = width
+        self.keys = []
+        self.index = {}
+        self.mean = np.zeros((0, width))
+        self.var = np.zeros((0, width))
+        self.count = np.zeros(0, dtype=np.int64)
+        self.pending = np.zeros((0, width))
+        self.pending_day = np.zeros(0, dtype=np.int64)   # ordinal يوم القيمة المعلقة (-1 = لا شيء)
+        self.expires = np.zeros(0, dtype=np.int64)       # ordinal آخر يوم للمفتاح (للتنظيف)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _rows(self, keys: list, expires: np.ndarray) -> np.ndarray:
+        rows = np.empty(len(keys), dtype=np.int64)
+        new = []
+        for i, key in enumerate(keys):
+            row = self.index.get(key)
+            if row is None:
+                row = self.index[key] = len(self.keys)
+                self.keys.append(key)
+                new.append(i)
+            rows[i] = row
+        if new:
+            n = len(new)
+            self.mean = np.vstack([self.mean, np.zeros((n, self.width))])
+            self.var = np.vstack([self.var, np.zeros((n, self.width))])
+            self.count = np.concatenate([self.count, np.zeros(n, dtype=np.int64)])
+            self.pending = np.vstack([self.pending, np.zeros((n, self.width))])
+            self.pending_day = np.concatenate([self.pending_day, np.full(n, -1, dtype=np.int64)])
+            self.expires = np.concatenate([self.expires, expires[new]])
+        return rows
+
+    def observe(self, keys: list, values: np.ndarray, day: int, expires: np.ndarray):
+        """
+        تسجيل قيم اليوم (تستبدل القيمة المعلقة لنفس اليوم) بعد ضم قيم الأيام السابقة.
+        يُرجع (mean, sd, count) لخط الأساس قبل اليوم لكل مفتاح.
+        """
+        rows = self._rows(keys, expires)
+        pending_day = self.pending_day[rows]
+        roll = rows[(pending_day >= 0) & (pending_day < day)]
+        if len(roll):
+            roll = np.unique(roll)
+            x = self.pending[roll]
+            first = self.count[roll] == 0
+            delta = x - self.mean[roll]
+            mean = self.mean[roll] + ALPHA * delta
+            var = (1 - ALPHA) * (self.var[roll] + ALPHA * delta * delta)
+            self.mean[roll] = np.where(first[:, None], x, mean)
+            self.var[roll] = np.where(first[:, None], 0.0, var)
+            self.count[roll] += 1
+            self.pending_day[roll] = -1
+
+        self.pending[rows] = values
+        self.pending_day[rows] = day
+        return self.mean[rows], np.maximum(np.sqrt(self.var[rows]), SD_FLOOR), self.count[rows]
+
+    def prune(self, day: int):
+        """حذف المفاتيح المنتهية (عقود تجاوزت تاريخ انتهائها)."""
+        keep = self.expires >= day
+        if keep.all():
+            return
+        self.keys = [k for k, ok in zip(self.keys, keep.tolist()) if ok]
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        for name in ("mean", "var", "count", "pending", "pending_day", "expires"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def columns(self) -> dict:
+        return {name: getattr(self, name) for name in ("mean", "var", "count", "pending", "pending_day", "expires")}
+
+    @classmethod
+    def from_columns(cls, keys: list, columns: dict) -> "BaselineTable":
+        table = cls(columns["mean"].shape[1])
+        table.keys = list(keys)
+        table.index = {k: i for i, k in enumerate(table.keys)}
+        for name, values in columns.items():
+            setattr(table, name, values)
+        return table
+
+
+_contracts = {}                 # symbol -> BaselineTable بمفاتيح (type, strike, exp)
+_symbols = BaselineTable()      # مفتاح لكل سهم (مجموع السلسلة)
+SYMBOLS_TABLE = "__symbols__"   # اسم جدول الأسهم في ملف الحفظ
+
+
+def _chain_values(contracts: list):
+    """(المفاتيح، ordinal الانتهاء، قيم المقاييس الخام (n,3)، مجموع OI) لعقود السلسلة."""
+    keys, expires, rows = [], [], []
+    ordinals = {}
+    for c in contracts:
+        exp = c.get("expiration_date") or ""
+        ordinal = ordinals.get(exp)
+        if ordinal is None:
+            try:
+                ordinal = date.fromisoformat(exp).toordinal()
+            except ValueError:
+                ordinal = date.max.toordinal()
+            ordinals[exp] = ordinal
+        keys.append((c.get("option_type"), c.get("strike"), exp))
+        expires.append(ordinal)
+        rows.append((c.get("volume"), c.get("open_interest"), c.get("bid"), c.get("ask")))
+    raw = np.nan_to_num(np.array(rows, dtype=float).reshape(-1, 4))
+    volume, oi, bid, ask = raw.T
+    volume = np.maximum(volume, 0)
+    values = np.stack([volume, volume / np.maximum(oi, 1), volume * (bid + ask) / 2 * 100], axis=1)
+    return keys, np.array(expires, dtype=np.int64), values, float(np.maximum(oi, 0).sum())
+
+
+def _chain_z(x: np.ndarray, active: np.ndarray) -> np.ndarray:
+    """z متين لكل عقد مقابل العقود النشطة في نفس السلسلة (لكل عمود)."""
+    if active.sum() < 5:
+        return np.zeros_like(x)
+    median = np.median(x[active], axis=0)
+    mad = np.median(np.abs(x[active] - median), axis=0) * 1.4826
+    return (x - median) / np.maximum(mad, CHAIN_SD_FLOOR)
+
+
+def _contract_id(symbol: str, key: tuple) -> str:
+    return f"{symbol}|{key[0]}|{key[1]}|{key[2]}"
+
+
+@metrics.timed("unusual_activity")
+def observe(symbol: str, contracts: list, today: date = None) -> list:
+    """
+    تحديث خطوط الأساس بسلسلة السهم الحالية وإضافة unusual_z / unusual / vol_oi / premium لكل عقد.
+    يُرجع العقود غير الاعتيادية (مرتبة تنازليًا حسب unusual_z).
+    """
+    global _flags_day
+    if not contracts:
+        return []
+    _ensure_loaded()
+    if today is None:
+        from core.providers import get_provider
+        today = get_provider().today()
+    day = today.toordinal()
+
+    keys, expires, values, total_oi = _chain_values(contracts)
+    x = np.log1p(values)
+    active = values[:, 0] > 0
+    total_volume, total_premium = float(values[:, 0].sum()), float(values[:, 2].sum())
+    symbol_x = np.log1p([[total_volume, total_volume / max(total_oi, 1.0), total_premium]])
+
+    with _lock:
+        table = _contracts.get(symbol)
+        if table is None:
+            table = _contracts[symbol] = BaselineTable()
+        if len(table) and day > table.expires.min():
+            table.prune(day)
+        mean, sd, count = table.observe(keys, x, day, expires)
+        s_mean, s_sd, s_count = _symbols.observe([symbol], symbol_x, day, np.array([date.max.toordinal()]))
+        if _flags_day != day:
+            _flags.clear()
+            _flags_day = day
+
+    z = np.where((count >= MIN_HISTORY)[:, None], (x - mean) / sd, _chain_z(x, active))
+    unusual_z = np.where(active, z.max(axis=1), 0.0)
+    flagged = (unusual_z >= Z_THRESHOLD) & (values[:, 0] >= MIN_VOLUME) & (values[:, 2] >= MIN_PREMIUM)
+    symbol_z = float(((symbol_x - s_mean) / s_sd).max()) if s_count[0] >= MIN_HISTORY else None
+
+    found = []
+    for i, c in enumerate(contracts):
+        c["unusual_z"] = round(float(unusual_z[i]), 2)
+        c["unusual"] = bool(flagged[i])
+        c["vol_oi"] = round(float(values[i, 1]), 2)
+        c["premium"] = round(float(values[i, 2]), 0)
+        if flagged[i]:
+            found.append(c)
+    found.sort(key=lambda c: c["unusual_z"], reverse=True)
+
+    with _lock:
+        for i in np.flatnonzero(flagged).tolist():
+            _flags[_contract_id(symbol, keys[i])] = dict(contracts[i])
+        _symbol_activity[symbol] = {
+            "z": None if symbol_z is None else round(symbol_z, 2),
+            "volume": total_volume, "premium": round(total_premium, 0), "flagged": len(found),
+        }
+    metrics.incr("contracts.unusual", len(found))
+    return found
+
+
+def symbol_activity(symbol: str = None) -> dict:
+    """نشاط السلسلة كاملة مقابل خط أساس السهم في آخر فحص: {"z", "volume", "premium", "flagged"}."""
+    with _lock:
+        if symbol is not None:
+            return dict(_symbol_activity.get(symbol, {}))
+        return {s: dict(v) for s, v in _symbol_activity.items()}
+
+
+def flags(min_z: float = Z_THRESHOLD) -> list:
+    """العقود غير الاعتيادية المرصودة اليوم (آخر رصد لكل عقد)، مرتبة تنازليًا."""
+    with _lock:
+        found = [dict(c) for c in _flags.values() if c["unusual_z"] >= min_z]
+    return sorted(found, key=lambda c: c["unusual_z"], reverse=True)
+
+
+def flag_id(contract: dict) -> str:
+    return _contract_id(contract.get("underlying_symbol"),
+                        (contract.get("option_type"), contract.get("strike"), contract.get("expiration_date")))
+
+
+def format_line(contract: dict) -> str:
+    """سطر التنبيه لعقد غير اعتيادي (فارغ إذا لم يكن كذلك)."""
+    if not contract.get("unusual"):
+        return ""
+    return (f"🚨 نشاط غير اعتيادي: z={contract['unusual_z']:.1f} | حجم/OI {contract['vol_oi']:.2f}"
+            f" | ${contract['premium'] / 1e3:,.0f}K")
+
+
+def build_alert(contracts: list, k: int = 10) -> str:
+    """تنبيه بأعلى k عقود غير اعتيادية."""
+    if not contracts:
+        return ""
+    lines = ["🚨 نشاط خيارات غير اعتيادي:\n"]
+    busy = sorted(((s, a["z"]) for s, a in symbol_activity().items() if (a["z"] or 0) >= Z_THRESHOLD),
+                  key=lambda item: item[1], reverse=True)
+    if busy:
+        lines.append("أسهم بنشاط كلي غير معتاد: " + ", ".join(f"{s} (z={z:.1f})" for s, z in busy) + "\n\n")
+    for c in contracts[:k]:
+        lines.append(
+            f"📌 {c.get('underlying_symbol')} {str(c.get('option_type')).upper()} {c.get('strike')} "
+            f"({c.get('expiration_date')})\n"
+            f"Volume: {c.get('volume')} | OI: {c.get('open_interest')} | {format_line(c)[2:].strip()}\n"
+        )
+    return "".join(lines)
+
+
+# ---------------------------------------------------------------- الحفظ
+
+def store_path() -> str:
+    return get_settings().unusual_store
+
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+    path = store_path()
+    if path:
+        load(path)
+
+
+def save(path: str):
+    """حفظ كل الجداول في ملف npz واحد (كتابة ذرية)."""
+    with _lock:
+        tables = {SYMBOLS_TABLE: _symbols, **_contracts}
+        arrays = {}
+        for name, table in tables.items():
+            keys = [[k] if name == SYMBOLS_TABLE else [str(part) for part in k] for k in table.keys]
+            # عرض صريح (وليس -1) حتى يُحفظ الجدول الفارغ أيضًا
+            width = 1 if name == SYMBOLS_TABLE else 3
+            arrays[f"{name}/keys"] = np.array(keys, dtype=str).reshape(len(keys), width)
+            for column, values in table.columns().items():
+                arrays[f"{name}/{column}"] = values
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def load(path: str):
+    global _symbols
+    if not os.path.exists(path):
+        return
+    try:
+        stored = np.load(path)
+        names = {key.split("/")[0] for key in stored.files}
+        tables = {}
+        for name in names:
+            keys = stored[f"{name}/keys"].tolist()
+            if name == SYMBOLS_TABLE:
+                keys = [k[0] for k in keys]
+            else:
+                keys = [(t, float(s), e) for t, s, e in keys]
+            columns = {c: stored[f"{name}/{c}"] for c in ("mean", "var", "count", "pending", "pending_day", "expires")}
+            tables[name] = BaselineTable.from_columns(keys, columns)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ تعذّر تحميل خطوط أساس النشاط من {path}: {e}")
+        return
+    with _lock:
+        _symbols = tables.pop(SYMBOLS_TABLE, BaselineTable())
+        _contracts.clear()
+        _contracts.update(tables)
+
+
+def persist():
+    """حفظ خطوط الأساس إذا حُدد MAZ_UNUSUAL_STORE (بعد كل فحص)."""
+    path = store_path()
+    if not path or not _loaded:
+        return
+    try:
+        save(path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ فشل حفظ خطوط أساس النشاط ({path}): {e}")
+        metrics.incr("errors.unusual_store")
+
+
+def reset():
+    """نسيان كل خطوط الأساس والرصد (للاختبار والقياس)."""
+    global _symbols, _flags_day
+    with _lock:
+        _contracts.clear()
+        _symbols = BaselineTable()
+        _flags.clear()
+        _flags_day = None
+        _symbol_activity.clear()
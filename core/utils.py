@@ -1,4 +1,9 @@
+# هدف الربح ووقف الخسارة كنسبة من سعر الدخول
+TP_MULTIPLIER = 1.30
+SL_MULTIPLIER = 0.80
+
+
 def option_tp_sl(entry_price: float):
-    tp = round(entry_price * 1.30, 2)
-    sl = round(entry_price * 0.80, 2)
+    tp = round(entry_price * TP_MULTIPLIER, 2)
+    sl = round(entry_price * SL_MULTIPLIER, 2)
     return tp, sl
\ No newline at end of file
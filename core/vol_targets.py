@@ -0,0 +1,151 @@
+"""
+vol_targets.py
+--------------
+نموذج TP/SL متدرج بالتقلب بديل عن النسب الثابتة (+30% / -20%) في core/utils.option_tp_sl.
+
+لكل عقد (دفعة واحدة لكل مرشحي الفحص، بصيغ مغلقة على مصفوفات numpy):
+1) أفق الاحتفاظ: نصف الأيام المتبقية حتى الانتهاء، بين يوم و MAX_HOLD_DAYS أيام، ولا يتجاوز
+   نصف عمر العقد (عقد 0/1 DTE يأخذ أفقًا بالساعات لا يومًا كاملًا يتخطى الانتهاء).
+2) الحركة الضمنية للسهم خلال الأفق: IV × √(الأفق / 365).
+3) TP = قيمة العقد (Black-Scholes، بنفس IV) في نهاية الأفق إذا تحرك السهم TP_SIGMA حركة
+   ضمنية في اتجاه الصفقة؛ SL = قيمته إذا تحرك SL_SIGMA عكسها. القيم تُعاير على سعر السوق
+   (ask / سعر النموذج الحالي)، فالتآكل الزمني ومعامل جاما محسوبان ضمنيًا: عقد أسبوعي قريب من
+   الانتهاء يأخذ أهدافًا مختلفة تمامًا عن عقد شهري.
+4) احتمال اللمس: مستوى السهم الذي يجعل العقد يساوي TP (أو SL) في منتصف الأفق (نيوتن على
+   Black-Scholes)، ثم احتمال أن يلمسه السهم خلال الأفق (مبدأ الانعكاس لحركة بلا انجراف).
+
+الحقول المضافة للعقد: vol_tp, vol_sl, p_tp, p_sl, implied_move, hold_days.
+"""
+
+import math
+
+import numpy as np
+
+from core import metrics
+from core.rules import to_arrays
+from core.utils import SL_MULTIPLIER, TP_MULTIPLIER
+
+MAX_HOLD_DAYS = 5
+TP_SIGMA = 1.0     # حركة ضمنية كاملة في اتجاه الصفقة
+SL_SIGMA = 0.5     # نصف حركة ضمنية عكسها
+MIN_T = 0.25 / 365
+NEWTON_STEPS = 8
+
+FIELDS = ("vol_tp", "vol_sl", "p_tp", "p_sl", "implied_move", "hold_days")
+
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """التوزيع الطبيعي التراكمي (تقريب Abramowitz-Stegun 7.1.26، خطأ < 1.5e-7)."""
+    z = np.abs(x) / math.sqrt(2)
+    t = 1 / (1 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-z * z)
+    return 0.5 * (1 + np.sign(x) * erf)
+
+
+def _bs(spot, strike, t, sigma, is_call):
+    """(السعر، الدلتا) وفق Black-Scholes بفائدة صفرية."""
+    vol_t = sigma * np.sqrt(t)
+    d1 = (np.log(spot / strike) + 0.5 * vol_t * vol_t) / vol_t
+    n1, n2 = _norm_cdf(d1), _norm_cdf(d1 - vol_t)
+    call = spot * n1 - strike * n2
+    price = np.where(is_call, call, call - spot + strike)
+    delta = np.where(is_call, n1, n1 - 1)
+    return price, delta
+
+
+def _touch_probability(log_distance, sigma, horizon):
+    """احتمال أن يلمس السهم مستوى يبعد log_distance خلال horizon (سنوات)."""
+    return 2 * (1 - _norm_cdf(np.abs(log_distance) / (sigma * np.sqrt(horizon))))
+
+
+def _barrier(target, spot, strike, t, sigma, is_call, scale, start):
+    """log(مستوى السهم / السعر) الذي تساوي عنده قيمة العقد (بعد المعايرة) الهدف."""
+    x = start
+    for _ in range(NEWTON_STEPS):
+        level = spot * np.exp(x)
+        price, delta = _bs(level, strike, t, sigma, is_call)
+        slope = scale * delta * level
+        step = np.where(np.abs(slope) > 1e-12, (scale * price - target) / slope, 0.0)
+        x = np.clip(x - step, -3.0, 3.0)
+    return x
+
+
+def compute(a: dict) -> dict:
+    """النموذج على أعمدة to_arrays(): مصفوفة لكل حقل في FIELDS (NaN حيث لا يصلح النموذج)."""
+    entry = a["ask"]
+    spot, strike, sigma = a["underlying_price"], a["strike"], a["implied_volatility"]
+    is_call = a["option_type"] == "call"
+    side = np.where(is_call, 1.0, -1.0)
+
+    with np.errstate(all="ignore"):
+        valid = (entry > 0) & (spot > 0) & (strike > 0) & (sigma > 0) & np.isfinite(sigma)
+        sigma = np.where(valid, sigma, 1.0)
+        spot = np.where(valid, spot, 1.0)
+        strike = np.where(valid, strike, 1.0)
+
+        days = np.maximum(a["days"], 0.25)
+        t = np.maximum(days / 365, MIN_T)
+        hold_days = np.minimum(np.clip(np.floor(days / 2), 1, MAX_HOLD_DAYS), days / 2)
+        hold = hold_days / 365
+        t_end = t - hold
+        t_mid = t - hold / 2
+        move = sigma * np.sqrt(hold)
+
+        model_now, _ = _bs(spot, strike, t, sigma, is_call)
+        valid &= model_now > 1e-6
+        scale = entry / np.where(valid, model_now, 1.0)
+
+        tp_value, _ = _bs(spot * np.exp(side * TP_SIGMA * move), strike, t_end, sigma, is_call)
+        sl_value, _ = _bs(spot * np.exp(-side * SL_SIGMA * move), strike, t_end, sigma, is_call)
+        vol_tp = np.maximum(np.round(scale * tp_value, 2), np.round(entry + 0.01, 2))
+        vol_sl = np.clip(np.round(scale * sl_value, 2), 0.01, np.round(entry - 0.01, 2))
+
+        tp_barrier = _barrier(vol_tp, spot, strike, t_mid, sigma, is_call, scale, side * TP_SIGMA * move)
+        sl_barrier = _barrier(vol_sl, spot, strike, t_mid, sigma, is_call, scale, -side * SL_SIGMA * move)
+        p_tp = _touch_probability(tp_barrier, sigma, hold)
+        p_sl = _touch_probability(sl_barrier, sigma, hold)
+
+    nan = np.full(len(entry), np.nan)
+    return {
+        "vol_tp": np.where(valid, vol_tp, nan),
+        "vol_sl": np.where(valid, vol_sl, nan),
+        "p_tp": np.where(valid, p_tp, nan),
+        "p_sl": np.where(valid, p_sl, nan),
+        "implied_move": np.where(valid, move, nan),
+        "hold_days": np.where(valid, hold_days, nan),
+    }
+
+
+@metrics.timed("vol_targets")
+def annotate(contracts: list, today=None) -> list:
+    """
+    إضافة حقول النموذج لكل العقود دفعة واحدة.
+    العقود التي لا يصلح لها النموذج (IV أو سعر غير صالح) تأخذ النسب الثابتة واحتمالات None.
+    """
+    if not contracts:
+        return contracts
+    values = compute(to_arrays(contracts, today))
+    columns = {name: values[name].tolist() for name in FIELDS}
+    for i, c in enumerate(contracts):
+        if math.isnan(columns["vol_tp"][i]):
+            ask = c.get("ask") or 0
+            c.update(vol_tp=round(ask * TP_MULTIPLIER, 2), vol_sl=round(ask * SL_MULTIPLIER, 2),
+                     p_tp=None, p_sl=None, implied_move=None, hold_days=None)
+            continue
+        for name in FIELDS:
+            c[name] = columns[name][i]
+        hold = c["hold_days"]
+        c["hold_days"] = int(hold) if hold.is_integer() else round(hold, 2)
+    return contracts
+
+
+def format_line(contract: dict) -> str:
+    """سطر العرض في التنبيهات (فارغ إذا لم تُحسب الأهداف)."""
+    if contract.get("vol_tp") is None:
+        return ""
+    line = f"TP/SL (تقلب): {contract['vol_tp']} / {contract['vol_sl']}"
+    if contract.get("p_tp") is not None:
+        line += (f" | ±{contract['implied_move']:.1%} خلال {contract['hold_days']} يوم"
+                 f" | لمس TP {contract['p_tp']:.0%} · SL {contract['p_sl']:.0%}")
+    return line
@@ -7,24 +7,10 @@ user_preferences.py
 
 user_settings = {
     "favorite_symbols": ["QQQ", "SPY", "AAPL", "NVDA"],
-    "symbol_filters": {
-        "QQQ": {
-            "rsi_buy_threshold": 40,      # شراء عندما RSI < 40
-            "rsi_sell_threshold": 60,     # بيع عندما RSI > 60
-            "min_volume": 500,
-            "min_oi": 2000
-        },
-        "SPY": {
-            "rsi_buy_threshold": 35,
-            "rsi_sell_threshold": 65,
-            "min_volume": 1000,
-            "min_oi": 5000
-        },
-        "default": {
-            "rsi_buy_threshold": 30,
-            "rsi_sell_threshold": 70,
-            "min_volume": 300,
-            "min_oi": 1000
-        }
+    "universe_filters": {
+        "min_price": 5.0,             # استبعاد الأسهم الرخيصة جدًا
+        "max_price": 2000.0,          # استبعاد الأسهم التي تتجاوز عقودها حد السعر
+        "min_avg_volume": 500000      # متوسط حجم تداول السهم اليومي
     }
+    # فلاتر كل سهم وأوزان التقييم انتقلت إلى data/scoring_rules.json (تُحمّل تلقائيًا عند التعديل)
 }
\ No newline at end of file
@@ -1,6 +1,8 @@
 import streamlit as st
 from main import generate_option_signal
+import json
 import re
+import sys
 
 # === دعم PWA (Progressive Web App) ===
 st.markdown("""
@@ -246,14 +248,46 @@ if st.button("🚀 توليد الإشارة", key="generate_btn"):
 st.markdown("---")
 st.markdown('<div class="top10-section"><h3>🔥 أفضل 10 عقود ذات سيولة عالية</h3><p>تحديث فوري لأفضل الفرص التداولية اليوم</p></div>', unsafe_allow_html=True)
 
+from core.settings import get_settings
+
+col_budget, col_full = st.columns([3, 1])
+with col_full:
+    full_scan = st.checkbox("فحص كامل", value=False, help="بدون مهلة (قد يستغرق وقتًا طويلًا)")
+with col_budget:
+    scan_budget = st.slider(
+        "⏱️ مهلة الفحص (ثانية)", min_value=5, max_value=120,
+        value=int(get_settings().interactive_scan_budget), disabled=full_scan,
+        help="الأسهم ذات المساهمة والسيولة الأعلى تُفحص أولًا، وعند انتهاء المهلة تُعرض أفضل النتائج حتى الآن",
+    )
+
 if st.button("🔄 تحديث قائمة أفضل 10 عقود", key="top10_btn"):
     with st.spinner("⏳ جاري جلب أفضل العقود ذات السيولة العالية..."):
         try:
+            import time
             from main import get_top_10_across_symbols, build_top10_alert
+            from core.top10 import format_coverage, get_coverage, report_degraded_symbols
             
-            # جلب أفضل 10 عقود (للصعود والهبوط)
-            top_calls = get_top_10_across_symbols("up")
-            top_puts = get_top_10_across_symbols("down")
+            # جلب أفضل 10 عقود (للصعود والهبوط): نصف المهلة للصعود وما تبقى منها للهبوط
+            scan_started = time.time()
+            deadline = None if full_scan else scan_started + scan_budget
+            top_calls = get_top_10_across_symbols("up", budget=None if full_scan else scan_budget / 2)
+            remaining = None if full_scan else deadline - time.time()
+            scanned_trends = ["up"]
+            if remaining is None or remaining > 0:
+                top_puts = get_top_10_across_symbols("down", budget=remaining)
+                scanned_trends.append("down")
+            else:
+                # لا مهلة متبقية: عدم تجاوز المهلة أهم من فحص الهبوط، ولا تُعرض تغطية فحص سابق
+                top_puts = []
+                st.warning(f"⏱️ انتهت المهلة ({scan_budget} ث) قبل فحص الهبوط: لم تُفحص عقود PUT")
+            for coverage_line in filter(None, (format_coverage(get_coverage(t)) for t in scanned_trends)):
+                st.warning(coverage_line)
+            degraded = report_degraded_symbols(scan_started)
+            if degraded:
+                st.warning(
+                    f"⚠️ {len(degraded)} رمز لم يُفحص بالكامل (خنق/مهلة/أخطاء): "
+                    + ", ".join(f"{s} ({r})" for s, r in sorted(degraded.items()))
+                )
             
             all_top = top_calls + top_puts
             all_top.sort(key=lambda x: x.get("score", 0), reverse=True)
@@ -356,6 +390,65 @@ if st.button("🔄 تحديث قائمة أفضل 10 عقود", key="top10_btn")
         except Exception as e:
             st.error(f"❌ خطأ في جلب أفضل 10 عقود: {str(e)}")
 
+# === إعادة الترتيب بأوزان مختلفة (بدون جلب جديد) ===
+# core.rerank يُحمّل فقط إذا جرى فحص في هذه العملية (لا نحمّل numpy عند فتح الصفحة)
+rerank = sys.modules.get("core.rerank")
+
+if rerank and rerank.last_scan_info():
+    with st.expander("⚖️ إعادة ترتيب آخر فحص بأوزان مختلفة", expanded=False):
+        from core.rules import get_rules
+
+        scoring = get_rules().spec["scoring"]
+        st.caption("التغيير فوري على العقود المحفوظة من آخر فحص — لا يتم أي جلب جديد.")
+        col_w1, col_w2, col_w3 = st.columns(3)
+        with col_w1:
+            w_liquidity = st.slider("وزن السيولة", 0.0, 1.0, float(scoring["weights"]["liquidity"]), 0.05, key="rr_w_liq")
+        with col_w2:
+            w_spread = st.slider("وزن السبريد", 0.0, 1.0, float(scoring["weights"]["spread"]), 0.05, key="rr_w_spread")
+        with col_w3:
+            w_iv = st.slider("وزن IV", 0.0, 1.0, float(scoring["weights"]["iv"]), 0.05, key="rr_w_iv")
+
+        col_t1, col_t2, col_t3 = st.columns(3)
+        with col_t1:
+            iv_target = st.slider("IV المستهدف", 0.05, 1.5, float(scoring["iv_target"]), 0.05, key="rr_iv_target")
+        with col_t2:
+            min_volume = st.number_input("أقل حجم للعقد", value=0, step=100, key="rr_min_volume")
+        with col_t3:
+            min_oi = st.number_input("أقل Open Interest", value=0, step=500, key="rr_min_oi")
+
+        # الأوزان المعروضة هي الافتراضية: نرسل ما غيّره المستخدم فقط حتى يبقى تخصيص كل سهم
+        overrides = rerank.changed_overrides(
+            {"scoring": {"weights": {"liquidity": w_liquidity, "spread": w_spread, "iv": w_iv},
+                         "iv_target": iv_target}},
+            {"scoring": scoring})
+        filters = {name: value for name, value in (("min_volume", min_volume), ("min_oi", min_oi)) if value}
+        if filters:
+            overrides["filters"] = filters
+
+        import time
+        started = time.perf_counter()
+        reranked = rerank.rerank("both", overrides)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if reranked:
+            import pandas as pd
+            st.dataframe(pd.DataFrame([
+                {
+                    "السهم": c.get("underlying_symbol"),
+                    "النوع": "CALL" if c.get("direction") == "up" else "PUT",
+                    "Strike": c.get("strike"),
+                    "الانتهاء": c.get("expiration_date"),
+                    "السعر": c.get("ask"),
+                    "الحجم": c.get("volume"),
+                    "OI": c.get("open_interest"),
+                    "النتيجة": round(c.get("score", 0), 2)
+                }
+                for c in reranked
+            ]), use_container_width=True, height=400)
+        else:
+            st.warning("⚠️ لا توجد عقود تحقق هذه الحدود")
+        st.caption(f"⏱️ زمن إعادة الترتيب: {elapsed_ms:.1f} ms")
+
 # === زر اختبار اتصال التليقرام ===
 st.markdown("---")
 st.subheader("🧪 تشخيص مشكلة التليقرام")
@@ -363,12 +456,11 @@ st.subheader("🧪 تشخيص مشكلة التليقرام")
 if st.button("🔍 اختبار اتصال التليقرام من Streamlit", key="test_telegram_btn"):
     try:
         import requests
-        from dotenv import load_dotenv
-        import os
-        
-        load_dotenv()
-        token = os.getenv("TELEGRAM_BOT_TOKEN")
-        chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        from core.settings import reload_settings
+
+        settings = reload_settings()  # لالتقاط أي تعديل على .env بدون إعادة تشغيل
+        token = settings.telegram_bot_token
+        chat_id = settings.telegram_chat_id
         
         st.write(f"🔍 التوكن: {token[:10]}..." if token else "❌ التوكن غير موجود")
         st.write(f"🔍 Chat ID: {chat_id}" if chat_id else "❌ Chat ID غير موجود")
@@ -393,6 +485,60 @@ if st.button("🔍 اختبار اتصال التليقرام من Streamlit", k
         st.error(f"💥 خطأ في الاتصال: {str(e)}")
         st.code(str(e))
 
+# === لوحة تشخيص أداء الفحص ===
+st.markdown("---")
+with st.expander("🩺 تشخيص أداء الفحص"):
+    from core import metrics
+
+    metrics_on = st.checkbox("تفعيل القياسات", value=metrics.is_enabled(), key="metrics_toggle")
+    if metrics_on and not metrics.is_enabled():
+        metrics.enable()
+    elif not metrics_on and metrics.is_enabled():
+        metrics.disable()
+
+    last = metrics.last_scan()
+    if not last:
+        st.info("لا توجد قياسات بعد — فعّل القياسات ثم شغّل فحصًا.")
+    else:
+        st.write(f"آخر فحص: **{last['label']}** — المدة الكلية: **{last['duration_s']:.2f} ث**")
+        import pandas as pd
+        stages_df = pd.DataFrame([
+            {
+                "المرحلة": name,
+                "الاستدعاءات": s["calls"],
+                "الزمن (ث)": s["total_s"],
+                "أطول استدعاء (ث)": s["max_s"],
+                "النسبة %": round(s["total_s"] / last["duration_s"] * 100, 1) if last["duration_s"] else 0,
+            }
+            for name, s in last["stages"].items()
+        ])
+        st.dataframe(stages_df, use_container_width=True)
+
+        col_counters, col_cache = st.columns(2)
+        with col_counters:
+            st.write("🔢 العدّادات")
+            st.json(last["counters"])
+        with col_cache:
+            st.write("🗃️ نسبة إصابة الكاش")
+            st.json(last["cache_hit_ratio"])
+
+        st.download_button(
+            "💾 تحميل القياسات (JSONL)",
+            "\n".join(json.dumps(r, ensure_ascii=False) for r in metrics.recent_scans()),
+            "scan_metrics.jsonl",
+            "application/json"
+        )
+        st.code(metrics.to_prometheus(), language="text")
+
+    prom_port = st.number_input("منفذ Prometheus", value=get_settings().metrics_port, step=1, key="prom_port")
+    if st.button("📡 تشغيل نقطة /metrics", key="prom_btn"):
+        try:
+            server = metrics.serve_prometheus(int(prom_port))
+            host, port = server.server_address[:2]
+            st.success(f"✅ نقطة Prometheus تعمل على {host}:{port}")
+        except OSError as e:
+            st.error(f"❌ تعذّر تشغيل النقطة: {e}")
+
 # === قسم المساعدة ===
 with st.expander("ℹ️ كيفية الاستخدام"):
     st.markdown("""
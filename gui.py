@@ -1,202 +1,192 @@
-import tkinter as tk
-from tkinter import ttk
-import threading
-
-# استيراد الرموز
-from data.symbols_filtered import filtered_symbols as symbols
-
-# استيراد الدوال من core
-from from core.fetcher_yf import get_weekly_and_monthly_expirations, fetch_options_for_expiration
-from core.scoring import pick_top_2_options
-from core.top10 import get_top_10_across_symbols, build_top10_alert
-from core.alerts import send_top10_alert
-from core.signal_builder import generate_option_signal_for_symbol
-from core.utils import option_tp_sl  # ✅ الإصلاح: من core.utils وليس main
-
-
-window = tk.Tk()
-window.title("Option Scanner — GUI Version")
-window.geometry("1100x850")
-window.configure(bg="#1e1e1e")
-
-title_label = tk.Label(
-    window,
-    text="Option Scanner — GUI Version",
-    font=("Arial", 18, "bold"),
-    fg="white",
-    bg="#1e1e1e"
-)
-title_label.pack(pady=10)
-
-control_frame = tk.Frame(window, bg="#1e1e1e")
-control_frame.pack(pady=10)
-
-symbol_label = tk.Label(control_frame, text="السهم:", fg="white", bg="#1e1e1e", font=("Arial", 12))
-symbol_label.grid(row=0, column=0, padx=5)
-
-symbol_var = tk.StringVar()
-symbol_dropdown = ttk.Combobox(control_frame, textvariable=symbol_var, width=15)
-symbol_dropdown['values'] = symbols
-symbol_dropdown.grid(row=0, column=1, padx=5)
-
-direction_label = tk.Label(control_frame, text="الاتجاه:", fg="white", bg="#1e1e1e", font=("Arial", 12))
-direction_label.grid(row=0, column=2, padx=5)
-
-direction_var = tk.StringVar()
-direction_dropdown = ttk.Combobox(control_frame, textvariable=direction_var, width=10)
-direction_dropdown['values'] = ["up", "down"]
-direction_dropdown.grid(row=0, column=3, padx=5)
-
-run_button = tk.Button(
-    control_frame,
-    text="تشغيل السهم المختار",
-    font=("Arial", 12),
-    bg="#0078D7",
-    fg="white",
-    command=lambda: threading.Thread(target=run_single_symbol, daemon=True).start()
-)
-run_button.grid(row=0, column=4, padx=10)
-
-top10_button = tk.Button(
-    control_frame,
-    text="أفضل 10 من جميع الأسهم",
-    font=("Arial", 12),
-    bg="#28a745",
-    fg="white",
-    command=lambda: threading.Thread(target=run_top10_all_symbols, daemon=True).start()
-)
-top10_button.grid(row=0, column=5, padx=10)
-
-top10_frame = tk.LabelFrame(window, text="Top 10 Best Contracts (Auto Filtered)", fg="white", bg="#1e1e1e")
-top10_frame.pack(fill="both", expand=False, padx=10, pady=10)
-
-top10_columns = ("symbol", "bucket", "type", "strike", "exp", "bid", "ask", "vol", "oi", "iv", "tp", "sl", "score")
-
-top10_table = ttk.Treeview(
-    top10_frame,
-    columns=top10_columns,
-    show="headings",
-    height=10
-)
-
-for col in top10_columns:
-    top10_table.heading(col, text=col.capitalize())
-    width = 80
-    if col in ("symbol", "bucket", "type"):
-        width = 90
-    if col == "score":
-        width = 90
-    top10_table.column(col, width=width)
-
-top10_table.pack(fill="both", expand=True)
-
-top10_table.tag_configure("call", background="#d9f2ff")
-top10_table.tag_configure("put", background="#ffe0e0")
-
-table_frame = tk.LabelFrame(window, text="Contracts for Selected Symbol", fg="white", bg="#1e1e1e")
-table_frame.pack(fill="both", expand=True, padx=10, pady=10)
-
-columns = ("symbol", "type", "strike", "exp", "bid", "ask", "vol", "oi", "iv", "tp", "sl")
-
-results_table = ttk.Treeview(
-    table_frame,
-    columns=columns,
-    show="headings",
-    height=20
-)
-
-for col in columns:
-    results_table.heading(col, text=col.capitalize())
-    results_table.column(col, width=80)
-
-results_table.pack(fill="both", expand=True)
-
-results_table.tag_configure("call", background="#e6f2ff")
-results_table.tag_configure("put", background="#ffe6e6")
-
-
-def run_single_symbol():
-    symbol = symbol_var.get().strip().upper()
-    direction = direction_var.get().strip()
-
-    if not symbol or not direction:
-        return
-
-    # مسح الجدول
-    for row in results_table.get_children():
-        results_table.delete(row)
-
-    try:
-        weekly_exp, monthly_exp = get_weekly_and_monthly_expirations(symbol)
-        weekly_contracts = fetch_options_for_expiration(symbol, weekly_exp) if weekly_exp else []
-        monthly_contracts = fetch_options_for_expiration(symbol, monthly_exp) if monthly_exp else []
-
-        expected_type = "call" if direction == "up" else "put"
-
-        def filter_contracts(raw):
-            return [
-                c for c in raw
-                if c.get("option_type") == expected_type
-                and 0.5 <= c.get("ask", 0) <= 5
-                and c.get("bid", 0) > 0
-            ]
-
-        filtered_weekly = filter_contracts(weekly_contracts)
-        filtered_monthly = filter_contracts(monthly_contracts)
-
-        total_contracts = filtered_weekly + filtered_monthly
+"""
+gui.py
+------
+واجهة سطح المكتب (Tkinter) للفاحص.
 
-        if not total_contracts:
-            results_table.insert("", "end", values=(
-                symbol, "لا توجد عقود مناسبة", "", "", "", "", "", "", "", "", ""
-            ))
-            return
-
-        for c in filtered_weekly:
-            insert_contract(results_table, c, direction)
-
-        for c in filtered_monthly:
-            insert_contract(results_table, c, direction)
-
-    except Exception as e:
-        results_table.insert("", "end", values=(symbol, f"خطأ: {str(e)}", "", "", "", "", "", "", "", "", ""))
+كل العمل الثقيل (جلب السلاسل، فحص الأسهم، إرسال التنبيهات) يجري في مجموعة خيوط عاملة،
+والخيوط لا تلمس عناصر Tk أبدًا: تضع رسائلها في طابور النتائج، والخيط الرئيسي يفرغه كل
+POLL_MS عبر after(). نتائج كل سهم تظهر فور اكتماله، مع شريط تقدم وزر إيقاف.
 
+الجداول افتراضية (VirtualTable): الصفوف محفوظة في قائمة Python والـ Treeview يحتوي فقط
+الصفوف الظاهرة، فالإضافة والتمرير والترتيب تبقى سريعة مع آلاف العقود.
 
-def run_top10_all_symbols():
-    trend = direction_var.get().strip() or "up"
-
-    for row in top10_table.get_children():
-        top10_table.delete(row)
-
-    try:
-        contracts = get_top_10_across_symbols(trend)
-        if not contracts:
-            top10_table.insert("", "end", values=("لا توجد عقود", "", "", "", "", "", "", "", "", "", "", "", ""))
-            return
-
-        for c in contracts:
-            insert_top10_contract(c)
-
-        # إرسال التنبيه
-        alert_text = build_top10_alert(contracts)
-        send_top10_alert(alert_text)
-
-    except Exception as e:
-        top10_table.insert("", "end", values=(f"خطأ: {str(e)}", "", "", "", "", "", "", "", "", "", "", "", ""))
+التشغيل:
+    python gui.py
+"""
 
+import queue
+import threading
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
 
-def insert_contract(table, contract, direction):
-    if not contract or "ask" not in contract or contract["ask"] in [None, 0]:
-        return
+# استيراد الرموز
+from data.symbols_filtered import filtered_symbols as symbols
 
+# وحدات core تُستورد داخل الخيوط العاملة عند أول استخدام (إقلاع أسرع للنافذة)
+
+POLL_MS = 50             # الفاصل بين دورات تفريغ طابور النتائج
+DRAIN_BUDGET_S = 0.015   # أقصى زمن لمعالجة الرسائل في الدورة الواحدة حتى لا تتجمد الواجهة
+JOB_WORKERS = 3          # مهمة فحص + إرسال التنبيهات في الخلفية
+DEFAULT_SCAN_WORKERS = 4
+
+BG = "#1e1e1e"
+
+TOP10_COLUMNS = ("symbol", "bucket", "type", "strike", "exp", "bid", "ask", "vol", "oi", "iv", "tp", "sl", "score")
+CONTRACT_COLUMNS = ("symbol", "type", "strike", "exp", "bid", "ask", "vol", "oi", "iv", "tp", "sl")
+
+
+def _sort_value(value):
+    """مفتاح ترتيب يضع الأرقام قبل النصوص ويقارن كل نوع بمثله."""
+    if isinstance(value, (int, float)):
+        return 0, value, ""
+    return 1, 0, str(value)
+
+
+class VirtualTable(ttk.Frame):
+    """
+    جدول افتراضي فوق ttk.Treeview: الصفوف في self.rows والـ Treeview يعرض نافذة منها فقط
+    (عدد العناصر = عدد الصفوف الظاهرة)، تُعاد تعبئتها عند التمرير أو وصول بيانات جديدة.
+    """
+
+    def __init__(self, master, columns, widths=None, height=10, sort_column=None, sort_reverse=False):
+        super().__init__(master)
+        self.columns = columns
+        self.visible = height
+        self.rows = []  # [values, tags, key]
+        self.first = 0
+        self._sort = (columns.index(sort_column), sort_reverse) if sort_column else None
+        self._needs_sort = False
+        self._refresh_pending = False
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height, selectmode="browse")
+        for col in columns:
+            self.tree.heading(col, text=col.capitalize(), command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=(widths or {}).get(col, 80))
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible))
+        self.tree.bind("<Configure>", self._on_resize)
+
+    # ---------------------------------------------------------------- البيانات
+    def append_rows(self, rows):
+        """إضافة صفوف (values, tag, key)؛ العرض يُحدّث مرة واحدة عند خمول الحلقة."""
+        self.rows.extend([values, (tag,), key] for values, tag, key in rows)
+        self._needs_sort = self._sort is not None
+        self._schedule_refresh()
+
+    def clear(self):
+        self.rows = []
+        self.first = 0
+        self._schedule_refresh()
+
+    def tag_keys(self, keys, tag: str):
+        """إضافة tag للصفوف التي مفاتيحها ضمن keys (مثل تمييز أفضل 10 بعد الفحص)."""
+        keys = set(keys)
+        for row in self.rows:
+            if row[2] in keys and tag not in row[1]:
+                row[1] = row[1] + (tag,)
+        self._schedule_refresh()
+
+    def tag_configure(self, tag: str, **options):
+        self.tree.tag_configure(tag, **options)
+
+    def sort_by(self, column: str):
+        index = self.columns.index(column)
+        reverse = not self._sort[1] if self._sort and self._sort[0] == index else False
+        self._sort = (index, reverse)
+        self._needs_sort = True
+        self.first = 0
+        self._schedule_refresh()
+
+    # ---------------------------------------------------------------- العرض
+    def _schedule_refresh(self):
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def refresh(self):
+        self._refresh_pending = False
+        if self._needs_sort:
+            # القائمة شبه مرتبة بعد كل إضافة، فالترتيب هنا قريب من الخطي
+            index, reverse = self._sort
+            self.rows.sort(key=lambda r: _sort_value(r[0][index]), reverse=reverse)
+            self._needs_sort = False
+
+        total = len(self.rows)
+        self.first = max(0, min(self.first, total - self.visible))
+        window = self.rows[self.first:self.first + self.visible]
+
+        items = self.tree.get_children()
+        for item in items[len(window):]:
+            self.tree.delete(item)
+        for i, (values, tags, _) in enumerate(window):
+            if i < len(items):
+                self.tree.item(items[i], values=values, tags=tags)
+            else:
+                self.tree.insert("", "end", values=values, tags=tags)
+
+        if total > self.visible:
+            self.scrollbar.set(self.first / total, (self.first + self.visible) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, delta: int):
+        self.first += delta
+        self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.first = int(float(value) * len(self.rows))
+            self.refresh()
+        elif action == "scroll":
+            self.scroll(int(value) * (self.visible if unit == "pages" else 1))
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll(-3)
+        else:
+            self.scroll(3)
+        return "break"
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - row_height) // row_height)  # صف للعناوين
+        if visible != self.visible:
+            self.visible = visible
+            self.tree.configure(height=visible)
+            self._schedule_refresh()
+
+
+# ------------------------------------------------------------------ تجهيز الصفوف
+# تُنفذ داخل الخيوط العاملة: الخيط الرئيسي يستلم صفوفًا جاهزة للعرض فقط
+
+def _contract_key(contract: dict) -> tuple:
+    return (contract.get("underlying_symbol"), contract.get("option_type"),
+            contract.get("strike"), contract.get("expiration_date"))
+
+
+def _tp_sl(contract: dict):
+    if "tp" in contract and "sl" in contract:
+        return contract["tp"], contract["sl"]
+    from core.utils import option_tp_sl
     try:
-        tp, sl = option_tp_sl(contract["ask"])
-    except:
-        tp, sl = "", ""
+        return option_tp_sl(contract["ask"])
+    except Exception:
+        return "", ""
 
-    tag = "call" if direction.lower() == "up" else "put"
 
-    table.insert("", "end", values=(
+def _contract_row(contract: dict, direction: str):
+    tp, sl = _tp_sl(contract)
+    values = (
         contract.get("underlying_symbol", ""),
         direction.upper(),
         contract.get("strike", ""),
@@ -205,25 +195,18 @@ def insert_contract(table, contract, direction):
         contract.get("ask", ""),
         contract.get("volume", ""),
         contract.get("open_interest", ""),
-        round(contract.get("implied_volatility", 0), 4),
+        round(contract.get("implied_volatility") or 0, 4),
         tp,
-        sl
-    ), tags=(tag,))
-
-
-def insert_top10_contract(contract):
-    if not contract or "ask" not in contract or contract["ask"] in [None, 0]:
-        return
+        sl,
+    )
+    tag = "call" if direction.lower() == "up" else "put"
+    return values, tag, _contract_key(contract)
 
-    try:
-        tp, sl = option_tp_sl(contract["ask"])
-    except:
-        tp, sl = "", ""
 
+def _top10_row(contract: dict):
+    tp, sl = _tp_sl(contract)
     direction = contract.get("direction", "up")
-    tag = "call" if direction.lower() == "up" else "put"
-
-    top10_table.insert("", "end", values=(
+    values = (
         contract.get("underlying_symbol", ""),
         contract.get("bucket", ""),
         direction.upper(),
@@ -233,11 +216,284 @@ def insert_top10_contract(contract):
         contract.get("ask", ""),
         contract.get("volume", ""),
         contract.get("open_interest", ""),
-        round(contract.get("implied_volatility", 0), 4),
+        round(contract.get("implied_volatility") or 0, 4),
         tp,
         sl,
         round(contract.get("score", 0), 2),
-    ), tags=(tag,))
+    )
+    tag = "call" if direction.lower() == "up" else "put"
+    return values, tag, _contract_key(contract)
+
+
+def _valid(contract: dict) -> bool:
+    return bool(contract) and contract.get("ask") not in (None, 0)
+
+
+# ------------------------------------------------------------------ المهام (خيوط عاملة)
+
+def _single_symbol_job(post, cancel, symbol: str, direction: str):
+    from core.fetcher import get_weekly_and_monthly_expirations, fetch_options_for_expiration
+
+    weekly_exp, monthly_exp = get_weekly_and_monthly_expirations(symbol)
+    expected_type = "call" if direction == "up" else "put"
+    found = 0
+    for expiration in (weekly_exp, monthly_exp):
+        if not expiration or cancel.is_set():
+            continue
+        rows = [
+            _contract_row(c, direction)
+            for c in fetch_options_for_expiration(symbol, expiration)
+            if c.get("option_type") == expected_type
+            and 0.5 <= c.get("ask", 0) <= 5
+            and c.get("bid", 0) > 0
+            and _valid(c)
+        ]
+        found += len(rows)
+        post("rows", rows)
+    post("single_done", symbol, found)
+
+
+def _top10_job(post, cancel, trend: str, workers: int, max_dte: int = 0):
+    from core.top10 import get_top_10_across_symbols
+
+    def on_result(symbol, top2):
+        post("symbol", symbol, [_top10_row(c) for c in top2 if _valid(c)])
+
+    started = time.time()
+    contracts = get_top_10_across_symbols(
+        trend, workers=workers, on_result=on_result, cancel=cancel, max_dte=max_dte,
+        on_universe=lambda universe: post("universe", len(universe)),
+    )
+    post("top10_done", contracts, cancel.is_set(), time.time() - started)
+
+
+def _send_alert_job(contracts: list):
+    from core.alerts import send_top10_alert
+    from core.top10 import build_top10_alert
+    send_top10_alert(build_top10_alert(contracts))
+
+
+# ------------------------------------------------------------------ الواجهة
+
+class ScannerApp:
+    def __init__(self, window: tk.Tk):
+        self.window = window
+        self.results = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="gui")
+        self.job_id = 0
+        self.cancel_event = None
+        self.running = False
+        self.progress_total = 0
+        self.progress_done = 0
+        self.started_at = 0.0
+
+        window.title("Option Scanner — GUI Version")
+        window.geometry("1100x850")
+        window.configure(bg=BG)
+        window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self._build_controls()
+        self._build_tables()
+        self.window.after(POLL_MS, self._drain)
+
+    # ---------------------------------------------------------------- البناء
+    def _build_controls(self):
+        tk.Label(self.window, text="Option Scanner — GUI Version", font=("Arial", 18, "bold"),
+                 fg="white", bg=BG).pack(pady=10)
+
+        control_frame = tk.Frame(self.window, bg=BG)
+        control_frame.pack(pady=5)
+
+        tk.Label(control_frame, text="السهم:", fg="white", bg=BG, font=("Arial", 12)).grid(row=0, column=0, padx=5)
+        self.symbol_var = tk.StringVar()
+        ttk.Combobox(control_frame, textvariable=self.symbol_var, values=symbols, width=15).grid(row=0, column=1, padx=5)
+
+        tk.Label(control_frame, text="الاتجاه:", fg="white", bg=BG, font=("Arial", 12)).grid(row=0, column=2, padx=5)
+        self.direction_var = tk.StringVar(value="up")
+        ttk.Combobox(control_frame, textvariable=self.direction_var, values=["up", "down"],
+                     width=10, state="readonly").grid(row=0, column=3, padx=5)
+
+        tk.Label(control_frame, text="خيوط الفحص:", fg="white", bg=BG, font=("Arial", 12)).grid(row=0, column=4, padx=5)
+        self.workers_var = tk.IntVar(value=DEFAULT_SCAN_WORKERS)
+        ttk.Spinbox(control_frame, from_=1, to=16, textvariable=self.workers_var, width=4).grid(row=0, column=5, padx=5)
+
+        # 0 = Weekly + Monthly فقط؛ غير ذلك كل تواريخ الانتهاء حتى هذا العدد من الأيام
+        from core.settings import get_settings
+        tk.Label(control_frame, text="أقصى DTE:", fg="white", bg=BG, font=("Arial", 12)).grid(row=0, column=6, padx=5)
+        self.max_dte_var = tk.IntVar(value=get_settings().scan_max_dte)
+        ttk.Spinbox(control_frame, from_=0, to=365, increment=7, textvariable=self.max_dte_var,
+                    width=5).grid(row=0, column=7, padx=5)
+
+        self.run_button = tk.Button(control_frame, text="تشغيل السهم المختار", font=("Arial", 12),
+                                    bg="#0078D7", fg="white", command=self.run_single_symbol)
+        self.run_button.grid(row=0, column=8, padx=10)
+
+        self.top10_button = tk.Button(control_frame, text="أفضل 10 من جميع الأسهم", font=("Arial", 12),
+                                      bg="#28a745", fg="white", command=self.run_top10_all_symbols)
+        self.top10_button.grid(row=0, column=9, padx=10)
+
+        self.cancel_button = tk.Button(control_frame, text="إيقاف", font=("Arial", 12),
+                                       bg="#dc3545", fg="white", state="disabled", command=self.cancel)
+        self.cancel_button.grid(row=0, column=10, padx=10)
+
+        progress_frame = tk.Frame(self.window, bg=BG)
+        progress_frame.pack(fill="x", padx=10)
+        self.progress = ttk.Progressbar(progress_frame, mode="determinate", maximum=1)
+        self.progress.pack(side="left", fill="x", expand=True, padx=5)
+        self.status_var = tk.StringVar(value="جاهز")
+        tk.Label(progress_frame, textvariable=self.status_var, fg="white", bg=BG,
+                 font=("Arial", 11), width=45, anchor="w").pack(side="left", padx=5)
+        self.send_alert_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(progress_frame, text="إرسال تنبيه Telegram", variable=self.send_alert_var,
+                       fg="white", bg=BG, selectcolor=BG, activebackground=BG).pack(side="left", padx=5)
+
+    def _build_tables(self):
+        top10_frame = tk.LabelFrame(self.window, text="Top 10 Best Contracts (Auto Filtered)", fg="white", bg=BG)
+        top10_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        widths = {"symbol": 90, "bucket": 90, "type": 90, "score": 90}
+        # كل سهم يضيف أفضل عقدين فور اكتماله، والجدول مرتب بالتقييم؛ أفضل 10 تُميّز في النهاية
+        self.top10_table = VirtualTable(top10_frame, TOP10_COLUMNS, widths, height=10,
+                                        sort_column="score", sort_reverse=True)
+        self.top10_table.pack(fill="both", expand=True)
+        self.top10_table.tag_configure("call", background="#d9f2ff")
+        self.top10_table.tag_configure("put", background="#ffe0e0")
+        self.top10_table.tag_configure("top", font=("Arial", 10, "bold"))
+
+        table_frame = tk.LabelFrame(self.window, text="Contracts for Selected Symbol", fg="white", bg=BG)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.results_table = VirtualTable(table_frame, CONTRACT_COLUMNS, height=20)
+        self.results_table.pack(fill="both", expand=True)
+        self.results_table.tag_configure("call", background="#e6f2ff")
+        self.results_table.tag_configure("put", background="#ffe6e6")
+
+    # ---------------------------------------------------------------- المهام
+    def _start_job(self, target, *args):
+        """تشغيل مهمة في مجموعة الخيوط؛ رسائلها تحمل رقم المهمة لتجاهل نتائج المهام الملغاة."""
+        self.job_id += 1
+        job_id = self.job_id
+        cancel = threading.Event()
+        self.cancel_event = cancel
+        self.running = True
+        self.started_at = time.time()
+        self._set_buttons()
+
+        def post(kind, *payload):
+            self.results.put((job_id, kind, payload))
+
+        def run():
+            try:
+                target(post, cancel, *args)
+            except Exception as e:
+                post("error", str(e))
+
+        self.executor.submit(run)
+
+    def run_single_symbol(self):
+        symbol = self.symbol_var.get().strip().upper()
+        direction = self.direction_var.get().strip()
+        if not symbol or not direction or self.running:
+            return
+        self.results_table.clear()
+        self._set_progress(0, 0, f"جلب عقود {symbol} ...")
+        self._start_job(_single_symbol_job, symbol, direction)
+
+    def run_top10_all_symbols(self):
+        if self.running:
+            return
+        trend = self.direction_var.get().strip() or "up"
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            workers = DEFAULT_SCAN_WORKERS
+        try:
+            max_dte = max(0, int(self.max_dte_var.get()))
+        except (tk.TclError, ValueError):
+            max_dte = 0
+        self.top10_table.clear()
+        self._set_progress(0, len(symbols), "جلب الأسعار واستبعاد الرموز غير المناسبة ...")
+        self._start_job(_top10_job, trend, workers, max_dte)
+
+    def cancel(self):
+        if self.cancel_event is not None and self.running:
+            self.cancel_event.set()
+            self.cancel_button.configure(state="disabled")
+            self.status_var.set("جارٍ الإيقاف (الأسهم الجارية تكتمل أولًا) ...")
+
+    def close(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.window.destroy()
+
+    # ---------------------------------------------------------------- طابور النتائج
+    def _drain(self):
+        deadline = time.perf_counter() + DRAIN_BUDGET_S
+        while time.perf_counter() < deadline:
+            try:
+                job_id, kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if job_id == self.job_id:
+                getattr(self, f"_on_{kind}")(*payload)
+        self.window.after(POLL_MS, self._drain)
+
+    def _on_rows(self, rows):
+        self.results_table.append_rows(rows)
+        self.status_var.set(f"{len(self.results_table.rows)} عقد")
+
+    def _on_single_done(self, symbol, found):
+        self._finish(f"{symbol}: {found} عقد" if found else f"{symbol}: لا توجد عقود مناسبة")
+
+    def _on_universe(self, total):
+        self._set_progress(0, total, f"0/{total} سهم")
+
+    def _on_symbol(self, symbol, rows):
+        self.top10_table.append_rows(rows)
+        done = self.progress_done + 1
+        elapsed = time.time() - self.started_at
+        self._set_progress(done, self.progress_total, f"{done}/{self.progress_total} سهم — {symbol} — {elapsed:.1f} ث")
+
+    def _on_top10_done(self, contracts, cancelled, elapsed):
+        self.top10_table.tag_keys([_contract_key(c) for c in contracts], "top")
+        done = self.progress_done
+        if cancelled:
+            self._finish(f"⏹️ أُوقف بعد {done}/{self.progress_total} سهم — أفضل {len(contracts)} من المكتمل")
+            return
+        self._set_progress(self.progress_total, self.progress_total, "")
+        if not contracts:
+            self._finish(f"لا توجد عقود ({elapsed:.1f} ث)")
+            return
+        self._finish(f"✅ اكتمل الفحص في {elapsed:.1f} ث — أفضل {len(contracts)} عقود بالخط العريض")
+        if self.send_alert_var.get():
+            self.executor.submit(_send_alert_job, contracts)
+
+    def _on_error(self, message):
+        self._finish(f"خطأ: {message}")
+
+    # ---------------------------------------------------------------- الحالة
+    def _finish(self, status: str):
+        self.running = False
+        self.status_var.set(status)
+        self._set_buttons()
+
+    def _set_progress(self, done: int, total: int, status: str):
+        self.progress_done, self.progress_total = done, total
+        self.progress.configure(maximum=max(total, 1), value=done)
+        if status:
+            self.status_var.set(status)
+
+    def _set_buttons(self):
+        state = "disabled" if self.running else "normal"
+        self.run_button.configure(state=state)
+        self.top10_button.configure(state=state)
+        self.cancel_button.configure(state="normal" if self.running else "disabled")
+
+
+def main():
+    window = tk.Tk()
+    ScannerApp(window)
+    window.mainloop()
 
 
-window.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -5,28 +5,35 @@ main.py
 يستخدم الدوال من مجلد core/ لضمان الفصل النظيف للمنطق.
 """
 
-import os
-from dotenv import load_dotenv
+import importlib
+import importlib.util
 
-# تحميل متغيرات البيئة
-load_dotenv()
+# الدوال المتاحة من main تُستورد عند أول استخدام فقط (PEP 562)، حتى لا يُحمّل
+# yfinance و pandas و requests لمجرد استيراد main أو إرسال تنبيه.
+# متغيرات البيئة و .env تُحمّل مرة واحدة في core.settings.
+_LAZY_EXPORTS = {
+    "symbols": ("data.symbols_filtered", "filtered_symbols"),
+    "get_weekly_and_monthly_expirations": ("core.fetcher", "get_weekly_and_monthly_expirations"),
+    "fetch_options_for_expiration": ("core.fetcher", "fetch_options_for_expiration"),
+    "pick_top_2_options": ("core.scoring", "pick_top_2_options"),
+    "send_telegram_message": ("core.alerts", "send_telegram_message"),
+    "send_top10_alert": ("core.alerts", "send_top10_alert"),
+    "send_signal_to_telegram_compact": ("core.alerts", "send_signal_to_telegram_compact"),
+    "send_top10_compact": ("core.alerts", "send_top10_compact"),
+    "get_top_10_across_symbols": ("core.top10", "get_top_10_across_symbols"),
+    "build_top10_alert": ("core.top10", "build_top10_alert"),
+    "generate_option_signal_for_symbol": ("core.signal_builder", "generate_option_signal_for_symbol"),
+    "option_tp_sl": ("core.utils", "option_tp_sl"),
+}
 
-# استيراد الرموز
-from data.symbols_filtered import filtered_symbols as symbols
-
-# استيراد الدوال من core (بدون calculate_iv_rank)
-from core.fetcher import get_weekly_and_monthly_expirations, fetch_options_for_expiration
-from core.scoring import pick_top_2_options  # ← تم إزالة calculate_iv_rank
-from core.alerts import (
-    send_telegram_message, 
-    send_top10_alert, 
-    send_signal_to_telegram_compact, 
-    send_top10_compact
-)
-from core.top10 import get_top_10_across_symbols, build_top10_alert
-from core.signal_builder import generate_option_signal_for_symbol
-from core.utils import option_tp_sl
 
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module 'main' has no attribute {name!r}")
+    module, attr = _LAZY_EXPORTS[name]
+    value = getattr(importlib.import_module(module), attr)
+    globals()[name] = value
+    return value
 
 
 # ✅ جسر لواجهة Streamlit (لأنها تتوقع هذه الدالة هنا)
@@ -35,25 +42,157 @@ def generate_option_signal(symbol: str, trend: str) -> str:
     دالة متوافقة مع frontend.py.
     تقوم فقط بتمرير المكالمة إلى الدالة الصحيحة في core.
     """
+    from core.signal_builder import generate_option_signal_for_symbol
     return generate_option_signal_for_symbol(symbol, trend)
 
 
-if __name__ == "__main__":
+# ==================== سطر الأوامر ====================
+
+def _named_universes() -> dict:
+    from data.price_levels import price_levels
+    from data.symbols_filtered import filtered_symbols
+    from data.user_preferences import user_settings
+    return {
+        "filtered": list(filtered_symbols),
+        "favorites": list(user_settings.get("favorite_symbols", [])),
+        "levels": list(price_levels),
+    }
+
+
+def _read_symbols_file(path: str) -> list:
+    """رمز أو أكثر في كل سطر (مفصولة بفواصل أو مسافات)، والأسطر التي تبدأ بـ # تُتجاهل."""
+    found = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            found += [s.strip().upper() for s in line.replace(",", " ").split() if s.strip()]
+    return list(dict.fromkeys(found))
+
+
+def _parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="فحص أفضل عقود الخيارات — يطبع نص التنبيه، أو يبث النتائج كـ JSONL/Parquet سهمًا بسهم.",
+        epilog="مثال: python main.py --trend both --workers 8 --top-k 20 --format jsonl > scan.jsonl",
+    )
+    parser.add_argument("--trend", choices=["up", "down", "both"], default="up")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--universe", choices=["filtered", "favorites", "levels", "liquid"], default="filtered",
+                        help="قائمة رموز جاهزة (الافتراضي: filtered؛ liquid = أعلى --top-n سهم سيولة)")
+    source.add_argument("--symbols-file", help="ملف رموز (رمز أو أكثر في كل سطر)")
+    source.add_argument("--symbols", nargs="+", help="رموز مباشرة")
+    parser.add_argument("--workers", type=int, default=1, help="عدد الأسهم التي تُعالج بالتوازي")
+    parser.add_argument("--top-k", type=int, default=10, help="عدد العقود في الترتيب النهائي لكل اتجاه")
+    parser.add_argument("--top-n", type=int, default=30,
+                        help="عدد الأسهم من فهرس السيولة مع --universe liquid (يُبنى مرة في اليوم)")
+    parser.add_argument("--max-dte", type=int,
+                        help="فحص كل تواريخ الانتهاء حتى هذا العدد من الأيام "
+                             "(الافتراضي: MAZ_SCAN_MAX_DTE؛ 0 = Weekly + Monthly فقط)")
+    parser.add_argument("--budget", type=float,
+                        help="مهلة بالثواني لكل اتجاه: الأسهم الأهم أولًا، وعند انتهائها تُعرض أفضل النتائج حتى الآن")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="تجاهل كل الكاش (الانتهاءات، الأسعار، الكاش السلبي، حالة الفحص السابق)")
+    parser.add_argument("--cache-file", help="حفظ/تحميل الكاش السلبي بين التشغيلات (مفيد مع cron)")
+    parser.add_argument("--format", choices=["text", "jsonl", "parquet"], default="text")
+    parser.add_argument("--output", help="ملف الإخراج (الافتراضي: stdout؛ إلزامي لـ parquet)")
+    args = parser.parse_args(argv)
+
+    if args.format == "parquet" and not args.output:
+        parser.error("--format parquet يتطلب --output")
+    if args.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        # نرفض قبل الفحص، لا بعد دقائق من الجلب عند فتح ملف الإخراج
+        parser.error("--format parquet يتطلب pyarrow (pip install pyarrow)")
+    if args.workers < 1 or args.top_k < 1 or args.top_n < 1:
+        parser.error("--workers و --top-k و --top-n يجب أن تكون 1 أو أكثر")
+    if args.max_dte is not None and args.max_dte < 0:
+        parser.error("--max-dte لا يكون سالبًا")
+    if args.budget is not None and args.budget <= 0:
+        parser.error("--budget يجب أن يكون أكبر من صفر")
+    return args
+
+
+def _run_text(trends: list, universe: list, args):
+    from core.top10 import get_top_10_across_symbols, build_top10_alert
+
     print("🚀 تشغيل فحص السوق الحقيقي...")
+    for trend in trends:
+        top = get_top_10_across_symbols(trend, universe, k=args.top_k, workers=args.workers,
+                                        max_dte=args.max_dte, budget=args.budget)
+        if not top:
+            print("❌ لم يتم العثور على أي عقود مناسبة.")
+        else:
+            print(build_top10_alert(top))
+    print("✅ اكتمل الفحص.")
+
+
+def _run_streaming(trends: list, universe: list, args):
+    import contextlib
+    import sys
 
-    # ✅ استخدام اتجاه صحيح: "up" أو "down"
-    top10 = get_top_10_across_symbols("up")  # أو "down"
+    from core.scan_output import JsonlWriter, ParquetWriter, to_records
+    from core.top10 import get_top_10_across_symbols
 
-    if not top10:
-        print("❌ لم يتم العثور على أي عقود مناسبة.")
+    if args.format == "parquet":
+        writer = ParquetWriter(args.output)
     else:
-        # بناء التنبيه
-        alert_text = build_top10_alert(top10)
+        writer = JsonlWriter(args.output)
 
-        # طباعة النتيجة
-        print(alert_text)
+    # رسائل التقدم تذهب إلى stderr حتى يبقى stdout سجلات JSON فقط
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            for trend in trends:
+                on_result = lambda symbol, top2, trend=trend: writer.write(to_records(top2, "symbol", trend))
+                top = get_top_10_across_symbols(trend, universe, k=args.top_k, workers=args.workers,
+                                                on_result=on_result, max_dte=args.max_dte, budget=args.budget)
+                writer.write(to_records(top, "top", trend))
+        finally:
+            writer.close()
 
-        # إرسال للتليقرام (اختياري — فعّله بإزالة التعليق)
-        # send_top10_alert(alert_text)
 
-    print("✅ اكتمل الفحص.")
\ No newline at end of file
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+
+    from core import negative_cache
+
+    if args.symbols:
+        universe = list(dict.fromkeys(s.upper() for s in args.symbols))
+    elif args.symbols_file:
+        universe = _read_symbols_file(args.symbols_file)
+    elif args.universe == "liquid":
+        from core.universe import top_symbols
+        universe = top_symbols(args.top_n)
+    else:
+        universe = _named_universes()[args.universe]
+    if not universe:
+        print("❌ قائمة الرموز فارغة.")
+        return 2
+
+    if args.no_cache:
+        from core import quotes
+        from core.fetcher import clear_expiration_cache
+        from core.top10 import reset_incremental_state
+        negative_cache.disable()
+        clear_expiration_cache()
+        quotes.clear()
+        reset_incremental_state()
+    elif args.cache_file:
+        negative_cache.load(args.cache_file)
+
+    trends = ["up", "down"] if args.trend == "both" else [args.trend]
+    try:
+        if args.format == "text":
+            _run_text(trends, universe, args)
+        else:
+            _run_streaming(trends, universe, args)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 2
+    finally:
+        if args.cache_file and not args.no_cache:
+            negative_cache.save(args.cache_file)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
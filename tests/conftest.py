@@ -0,0 +1,5 @@
+import os
+import sys
+
+# الاختبارات تستورد core/ و data/ من جذر المشروع
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from core import archive  # noqa: E402
+
+
+def _table(n: int, symbol: str):
+    columns = {name: np.round(np.linspace(1, 100, n), 1) for name, kind in archive.SCHEMA_FIELDS if kind == "float64"}
+    columns["symbol"] = [symbol] * n
+    columns["expiration_date"] = ["2026-10-23"] * n
+    columns["option_type"] = ["call", "put"] * (n // 2)
+    columns["strike"] = np.arange(n, dtype=float)
+    return pa.Table.from_pydict(columns, schema=archive._schema(pa))
+
+
+def _write(root, day, symbol, table, name="seg-1.arrow"):
+    directory = archive._partition_dir(str(root), day, symbol)
+    os.makedirs(directory, exist_ok=True)
+    archive._write_table(os.path.join(directory, name), table, "lz4")
+
+
+def test_read_columns_projects_in_requested_order(tmp_path):
+    table = _table(1000, "AAPL")
+    _write(tmp_path, "2026-10-19", "AAPL", table)
+
+    result = archive.read("AAPL", columns=["strike", "option_type"], root=str(tmp_path))
+
+    assert result.column_names == ["strike", "option_type"]
+    assert result.column("strike").equals(table.column("strike"))
+    assert result.column("option_type").equals(table.column("option_type"))
+
+
+def test_read_without_columns_returns_full_schema(tmp_path):
+    table = _table(10, "AAPL")
+    _write(tmp_path, "2026-10-19", "AAPL", table)
+
+    result = archive.read(root=str(tmp_path))
+
+    assert result.schema.equals(table.schema)
+    assert result.equals(table)
+
+
+def test_read_skips_partitions_out_of_range(tmp_path):
+    _write(tmp_path, "2026-10-18", "AAPL", _table(4, "AAPL"))
+    _write(tmp_path, "2026-10-19", "AAPL", _table(6, "AAPL"))
+    _write(tmp_path, "2026-10-19", "MSFT", _table(8, "MSFT"))
+
+    assert archive.read("AAPL", start="2026-10-19", root=str(tmp_path)).num_rows == 6
+    assert archive.read(["aapl", "msft"], end="2026-10-19", root=str(tmp_path)).num_rows == 18
+
+
+def test_read_empty_range_keeps_schema(tmp_path):
+    result = archive.read("AAPL", columns=["ts", "strike"], root=str(tmp_path))
+
+    assert result.num_rows == 0
+    assert result.column_names == ["ts", "strike"]
@@ -0,0 +1,147 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from core import backtest
+
+DAY = 86400
+START = 20_000 * DAY  # 2024-10-04
+SPACING = 3 * 3600  # 40 لقطة ≈ 5 أيام، فالعقود القصيرة تنتهي خلال المسار
+
+
+def _paths(rng: random.Random, contracts: list, snapshots: int = 40) -> dict:
+    rows = []
+    for i in range(snapshots):
+        ts = START + i * SPACING + rng.randint(0, 60)
+        for symbol, option_type, expiration, strike in contracts:
+            if rng.random() < 0.15:
+                continue  # العقد غائب عن هذه اللقطة
+            bid = rng.choice([0.0, math.nan, round(rng.uniform(0.2, 4.0), 2)])
+            rows.append((ts, symbol, option_type, expiration, strike, bid, bid + 0.1))
+    columns = list(zip(*rows))
+    return {
+        "ts": np.array(columns[0], dtype=float),
+        "symbol": np.array(columns[1], dtype=object),
+        "option_type": np.array(columns[2], dtype=object),
+        "expiration_date": np.array(columns[3], dtype=object),
+        "strike": np.array(columns[4], dtype=float),
+        "bid": np.array(columns[5], dtype=float),
+        "ask": np.array(columns[6], dtype=float),
+        "last_price": np.array(columns[5], dtype=float),
+    }
+
+
+def _signals(rng: random.Random, contracts: list, n: int = 80) -> dict:
+    picked = [rng.choice(contracts) for _ in range(n)]
+    return {
+        "ts": np.array([START + rng.randint(0, 40 * SPACING) for _ in range(n)], dtype=float),
+        "symbol": np.array([c[0] for c in picked], dtype=object),
+        "option_type": np.array([c[1] for c in picked], dtype=object),
+        "expiration_date": np.array([c[2] for c in picked], dtype=object),
+        "strike": np.array([c[3] for c in picked], dtype=float),
+        "entry": np.array([round(rng.uniform(0.5, 3.0), 2) for _ in range(n)]),
+        "score": np.array([rng.uniform(0, 100) for _ in range(n)]),
+        "bucket": np.array(["weekly"] * n, dtype=object),
+        "trend": np.array(["up"] * n, dtype=object),
+    }
+
+
+def _reference(signals: dict, paths: dict, tp_mult: float, sl_mult: float) -> list:
+    """حلقة لكل إشارة: أول لمس TP/SL على مسار العقد بعد وقت الإشارة."""
+    last_day = int(paths["ts"].max() // DAY)
+    out = []
+    for i in range(len(signals["ts"])):
+        key = tuple(signals[k][i] for k in ("symbol", "option_type", "expiration_date", "strike"))
+        rows = sorted((paths["ts"][j], paths["bid"][j]) for j in range(len(paths["ts"]))
+                      if tuple(paths[k][j] for k in ("symbol", "option_type", "expiration_date", "strike")) == key
+                      and paths["ts"][j] > signals["ts"][i])
+        tp, sl = round(signals["entry"][i] * tp_mult, 2), round(signals["entry"][i] * sl_mult, 2)
+        valid = [p for _, p in rows if p > 0]
+        outcome, exit_price = None, valid[-1] if valid else math.nan
+        for p in valid:
+            if p >= tp:
+                outcome, exit_price = "tp", p
+                break
+            if p <= sl:
+                outcome, exit_price = "sl", p
+                break
+        if outcome is None:
+            expiration_day = int(np.datetime64(signals["expiration_date"][i], "D").astype(np.int64))
+            outcome = "expiry" if expiration_day < last_day else "open"
+            if outcome == "expiry" and not valid:
+                exit_price = 0.0
+        out.append((outcome, exit_price, len(rows)))
+    return out
+
+
+@pytest.mark.parametrize("chunk", [backtest.CHUNK_POINTS, 7])
+def test_evaluate_matches_per_signal_loop(monkeypatch, chunk):
+    monkeypatch.setattr(backtest, "CHUNK_POINTS", chunk)
+    rng = random.Random(5)
+    contracts = [(s, t, e, k) for s in ("AAPL", "MSFT") for t in ("call", "put")
+                 for e in ("2024-10-04", "2024-10-25") for k in (100.0, 105.0)]
+    paths, signals = _paths(rng, contracts), _signals(rng, contracts)
+
+    results = backtest.evaluate(signals, paths, tp_mult=1.4, sl_mult=0.6)
+
+    expected = _reference(signals, paths, 1.4, 0.6)
+    assert results["outcome"].tolist() == [e[0] for e in expected]
+    np.testing.assert_allclose(results["exit_price"], [e[1] for e in expected], equal_nan=True)
+    assert results["path_len"].tolist() == [e[2] for e in expected]
+
+
+def test_first_touch_wins():
+    contract = ("SPY", "call", "2024-10-25", 500.0)
+    paths = {
+        "ts": np.array([START + 60, START + 120, START + 180], dtype=float),
+        "symbol": np.array([contract[0]] * 3, dtype=object),
+        "option_type": np.array([contract[1]] * 3, dtype=object),
+        "expiration_date": np.array([contract[2]] * 3, dtype=object),
+        "strike": np.full(3, contract[3]),
+        "bid": np.array([0.5, 2.0, 0.1]),
+        "ask": np.array([0.6, 2.1, 0.2]),
+        "last_price": np.array([0.5, 2.0, 0.1]),
+    }
+    signals = {
+        "ts": np.array([START, START + 90], dtype=float),
+        "symbol": np.array(["SPY", "SPY"], dtype=object),
+        "option_type": np.array(["call", "call"], dtype=object),
+        "expiration_date": np.array(["2024-10-25"] * 2, dtype=object),
+        "strike": np.array([500.0, 500.0]),
+        "entry": np.array([1.0, 1.0]),
+        "score": np.array([1.0, 2.0]),
+        "bucket": np.array(["near"] * 2, dtype=object),
+        "trend": np.array(["up"] * 2, dtype=object),
+    }
+
+    results = backtest.evaluate(signals, paths, tp_mult=1.5, sl_mult=0.7)
+
+    assert results["outcome"].tolist() == ["sl", "tp"]
+    assert results["exit_price"].tolist() == [0.5, 2.0]
+    assert results["holding_hours"].tolist() == [60 / 3600, 30 / 3600]
+
+
+def test_evaluate_without_paths_marks_open():
+    rng = random.Random(1)
+    signals = _signals(rng, [("AAPL", "call", "2030-01-18", 100.0)], n=3)
+    empty = {name: np.empty(0, dtype=object if name in ("symbol", "option_type", "expiration_date") else float)
+             for name in ("ts", "symbol", "option_type", "expiration_date", "strike", "bid", "ask", "last_price")}
+
+    results = backtest.evaluate(signals, empty)
+
+    assert results["outcome"].tolist() == ["open"] * 3
+    assert results["exit_price"].isna().all()
+
+
+def test_summarize_rates_per_group():
+    rng = random.Random(5)
+    contracts = [("AAPL", "call", "2024-10-25", 100.0), ("MSFT", "put", "2024-10-25", 105.0)]
+    results = backtest.evaluate(_signals(rng, contracts, 40), _paths(rng, contracts), tp_mult=1.4, sl_mult=0.6)
+
+    summary = backtest.summarize(results, by=["symbol", "decile"])
+
+    assert summary["signals"].sum() == 40
+    rates = summary[[f"{o}_rate" for o in backtest.OUTCOMES]].sum(axis=1)
+    np.testing.assert_allclose(rates, 1.0, atol=0.002)
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from core.expiry_calendar import (dte_bucket, good_friday, is_standard_monthly, is_trading_day,
+                                  market_holidays, monthly_expiries)
+
+# عطل NYSE المنشورة
+NYSE_HOLIDAYS = {
+    2021: ["2021-01-01", "2021-01-18", "2021-02-15", "2021-04-02", "2021-05-31", "2021-07-05",
+           "2021-09-06", "2021-11-25", "2021-12-24"],
+    # رأس السنة يوم السبت: لا تعويض؛ Juneteenth والميلاد يوم الأحد: الإثنين
+    2022: ["2022-01-17", "2022-02-21", "2022-04-15", "2022-05-30", "2022-06-20", "2022-07-04",
+           "2022-09-05", "2022-11-24", "2022-12-26"],
+    2025: ["2025-01-01", "2025-01-20", "2025-02-17", "2025-04-18", "2025-05-26", "2025-06-19",
+           "2025-07-04", "2025-09-01", "2025-11-27", "2025-12-25"],
+    # 4 يوليو يوم السبت: الجمعة
+    2026: ["2026-01-01", "2026-01-19", "2026-02-16", "2026-04-03", "2026-05-25", "2026-06-19",
+           "2026-07-03", "2026-09-07", "2026-11-26", "2026-12-25"],
+}
+
+
+@pytest.mark.parametrize("year", sorted(NYSE_HOLIDAYS))
+def test_market_holidays_match_nyse_calendar(year):
+    assert sorted(d.isoformat() for d in market_holidays(year)) == NYSE_HOLIDAYS[year]
+
+
+@pytest.mark.parametrize("year, expected", [(2024, date(2024, 3, 29)), (2025, date(2025, 4, 18)),
+                                            (2026, date(2026, 4, 3)), (2027, date(2027, 3, 26))])
+def test_good_friday(year, expected):
+    assert good_friday(year) == expected
+
+
+def test_monthly_expiries_are_third_fridays():
+    expiries = sorted(monthly_expiries(2026))
+
+    assert len(expiries) == 12
+    assert expiries[0] == date(2026, 1, 16)
+    assert date(2026, 10, 16) in expiries
+    assert all(d.weekday() == 4 for d in expiries if d.month != 6)
+
+
+@pytest.mark.parametrize("holiday, moved", [(date(2025, 4, 18), date(2025, 4, 17)),    # Good Friday
+                                            (date(2026, 6, 19), date(2026, 6, 18))])   # Juneteenth
+def test_monthly_expiry_on_holiday_moves_to_thursday(holiday, moved):
+    assert not is_standard_monthly(holiday)
+    assert is_standard_monthly(moved)
+
+
+def test_is_trading_day():
+    assert is_trading_day(date(2026, 10, 19))
+    assert not is_trading_day(date(2026, 10, 18))   # الأحد
+    assert not is_trading_day(date(2026, 11, 26))   # Thanksgiving
+
+
+@pytest.mark.parametrize("days, bucket", [(0, "weekly"), (7, "weekly"), (8, "near"), (21, "near"),
+                                          (45, "monthly"), (100, "quarterly"), (101, "long")])
+def test_dte_bucket_boundaries(days, bucket):
+    assert dte_bucket(days) == bucket
@@ -0,0 +1,96 @@
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from core import gamma_exposure
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.fixture(autouse=True)
+def clean_profiles():
+    gamma_exposure.clear()
+    yield
+    gamma_exposure.clear()
+
+
+def _chain(seed: int = 1, spot: float = 100.0) -> list:
+    rng = random.Random(seed)
+    contracts = []
+    for expiration in ("2026-10-23", "2026-11-20"):
+        for strike in range(80, 121, 5):
+            for option_type in ("call", "put"):
+                contracts.append({
+                    "underlying_symbol": "TEST", "option_type": option_type, "strike": float(strike),
+                    "expiration_date": expiration, "underlying_price": spot,
+                    "bid": 1.0, "ask": 1.1, "volume": 100,
+                    "open_interest": rng.choice([0, rng.randint(10, 5000)]),
+                    "implied_volatility": rng.uniform(0.2, 0.5),
+                })
+    return contracts
+
+
+def _brute_force_max_pain(contracts: list, expiration: str) -> float:
+    rows = [c for c in contracts if c["expiration_date"] == expiration and c["open_interest"] > 0]
+    strikes = sorted({c["strike"] for c in rows})
+
+    def pain(settle):
+        return sum(c["open_interest"] * (max(settle - c["strike"], 0) if c["option_type"] == "call"
+                                         else max(c["strike"] - settle, 0)) for c in rows)
+    return min(strikes, key=pain)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_max_pain_matches_brute_force(seed):
+    contracts = _chain(seed)
+
+    profile = gamma_exposure.compute_symbol("TEST", contracts, TODAY)
+
+    for expiration in ("2026-10-23", "2026-11-20"):
+        assert profile["max_pain"][expiration] == _brute_force_max_pain(contracts, expiration)
+    assert all(c["max_pain"] == profile["max_pain"][c["expiration_date"]] for c in contracts)
+
+
+def test_net_gex_sums_strikes_and_sides():
+    profile = gamma_exposure.compute_symbol("TEST", _chain(), TODAY)
+
+    assert np.isclose(profile["gex_by_strike"].sum(), profile["net_gex"])
+    assert np.isclose(profile["call_gex"] + profile["put_gex"], profile["net_gex"])
+    assert profile["call_gex"] > 0 > profile["put_gex"]
+
+
+def test_gamma_flip_sits_on_sign_change():
+    # Calls فوق السعر و Puts تحته: صافي GEX سالب تحت مستوى ما وموجب فوقه
+    contracts = [c for c in _chain() if (c["option_type"] == "call") == (c["strike"] >= 100)]
+    for c in contracts:
+        c["open_interest"] = 1000
+
+    profile = gamma_exposure.compute_symbol("TEST", contracts, TODAY)
+    flip = profile["gamma_flip"]
+
+    a = gamma_exposure.to_arrays(contracts, TODAY)
+    _, signed_oi, strike, t, sigma = gamma_exposure._exposure(a)
+    below, above = gamma_exposure._net_gex(np.array([flip * 0.99, flip * 1.01]), signed_oi, strike, t, sigma)
+    assert 80 < flip < 120
+    assert below * above < 0
+
+
+def test_unchanged_chain_is_served_from_cache():
+    contracts = _chain()
+    first = gamma_exposure.compute_symbol("TEST", contracts, TODAY)
+
+    assert gamma_exposure.compute_symbol("TEST", _chain(), TODAY) is first
+    contracts[0] = dict(contracts[0], open_interest=contracts[0]["open_interest"] + 1)
+    assert gamma_exposure.compute_symbol("TEST", contracts, TODAY) is not first
+
+
+def test_format_block():
+    profile = gamma_exposure.compute_symbol("TEST", _chain(), TODAY)
+
+    block = gamma_exposure.format_block(profile, ["2026-10-23"])
+
+    assert "GEX" in block and "Max pain (2026-10-23)" in block
+    assert gamma_exposure.format_block(None) == ""
+    assert gamma_exposure._dollars(-1.234e9) == "-$1.23B"
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from core.governor import CallTimeout, CircuitBreaker, CircuitOpenError, Governor
+
+
+def _open_breaker(cooldown: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=cooldown)
+    breaker.record_failure("AAPL")
+    breaker.record_failure("AAPL")
+    return breaker
+
+
+def test_breaker_opens_after_threshold():
+    breaker = _open_breaker(cooldown=60)
+
+    assert not breaker.allow("AAPL")
+    assert breaker.allow("MSFT")
+    assert breaker.open_keys() == ["AAPL"]
+
+
+def test_half_open_allows_exactly_one_concurrent_probe():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    start = threading.Barrier(16)
+    allowed = []
+
+    def attempt():
+        start.wait()
+        allowed.append(breaker.allow("AAPL"))
+
+    threads = [threading.Thread(target=attempt) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert allowed.count(True) == 1
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow("AAPL")
+    breaker.record_failure("AAPL")
+    assert not breaker.allow("AAPL")
+
+    time.sleep(0.06)
+    assert breaker.allow("AAPL")
+    breaker.record_success("AAPL")
+    assert breaker.allow("AAPL") and breaker.allow("AAPL")
+    assert breaker.open_keys() == []
+
+
+def test_stale_probe_is_replaced_after_cooldown():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow("AAPL")
+    assert not breaker.allow("AAPL")
+    time.sleep(0.06)
+    assert breaker.allow("AAPL")
+
+
+def test_non_retryable_error_ends_probe():
+    governor = Governor(timeout=1.0, retries=0, breaker=_open_breaker())
+    time.sleep(0.06)
+
+    def bad_request():
+        raise ValueError("no such expiration")
+
+    with pytest.raises(ValueError):
+        governor.call("AAPL", bad_request)
+    assert governor.call("AAPL", lambda: 42) == 42
+
+
+def test_hung_calls_replace_the_pool():
+    release = threading.Event()
+    governor = Governor(timeout=0.05, retries=0, max_workers=2)
+    try:
+        for _ in range(2):
+            with pytest.raises(CallTimeout):
+                governor.call(None, release.wait)
+        assert governor.hung_calls() == 2
+        # بدون استبدال المجموعة كانت الخيوط كلها مشغولة وهذا الاستدعاء ينتهي بمهلة
+        assert governor.call(None, lambda: "ok") == "ok"
+    finally:
+        release.set()
+    deadline = time.monotonic() + 2
+    while governor.hung_calls() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert governor.hung_calls() == 0
+
+
+def test_circuit_open_raises_and_marks_degraded():
+    governor = Governor(timeout=1.0, retries=0, breaker=_open_breaker(cooldown=60))
+
+    with pytest.raises(CircuitOpenError):
+        governor.call("AAPL", lambda: 1)
+    assert governor.degraded_symbols() == {"AAPL": "circuit_open"}
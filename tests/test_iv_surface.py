@@ -0,0 +1,114 @@
+import math
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from core import iv_surface, metrics
+
+TODAY = date(2026, 10, 19)
+# (أيام، a، b، c) لكل تاريخ انتهاء
+SMILES = [(4, 0.30, -0.04, 0.02), (32, 0.25, -0.03, 0.015), (95, 0.22, -0.02, 0.01)]
+
+
+@pytest.fixture(autouse=True)
+def clean_surfaces():
+    iv_surface.clear()
+    was_enabled = metrics.is_enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    iv_surface.clear()
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def _chain(symbol: str = "TEST", spot: float = 100.0, smiles=SMILES) -> list:
+    """سلسلة يقع IV كل عقد فيها على ابتسامة تربيعية معروفة."""
+    contracts = []
+    for days, a, b, c in smiles:
+        t = days / 365
+        for strike in np.arange(spot * 0.7, spot * 1.3, spot * 0.025):
+            k = math.log(strike / spot) / math.sqrt(t)
+            for option_type in ("call", "put"):
+                contracts.append({
+                    "underlying_symbol": symbol, "option_type": option_type, "strike": round(float(strike), 2),
+                    "expiration_date": (TODAY + timedelta(days=days)).isoformat(), "underlying_price": spot,
+                    "bid": 1.0, "ask": 1.1, "volume": 100, "open_interest": 1000,
+                    "implied_volatility": a + b * k + c * k * k,
+                })
+    return contracts
+
+
+def _counter(name: str) -> int:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_fit_symbol_recovers_quadratic_smile():
+    contracts = _chain()
+
+    surface = iv_surface.fit_symbol("TEST", contracts, TODAY)
+
+    assert surface["days"].tolist() == [d for d, *_ in SMILES]
+    expected = np.array([s[1:] for s in SMILES])
+    np.testing.assert_allclose(surface["atm_iv"], expected[:, 0], atol=1e-4)
+    np.testing.assert_allclose(surface["skew"], expected[:, 1], atol=1e-3)
+    np.testing.assert_allclose(surface["curvature"], expected[:, 2], atol=1e-3)
+    # كل العقود (بما فيها جانب ITM الذي لا يدخل الملاءمة) تأخذ قيمة السطح
+    assert all(abs(c["iv_residual"]) < 1e-3 for c in contracts)
+
+
+def test_second_pass_drops_outliers():
+    contracts = _chain()
+    bad = next(c for c in contracts
+               if c["option_type"] == "call" and c["expiration_date"] == "2026-11-20" and c["strike"] == 110.0)
+    bad["implied_volatility"] += 0.5  # IV خاطئ من المزود
+
+    surface = iv_surface.fit_symbol("TEST", contracts, TODAY)
+
+    np.testing.assert_allclose(surface["atm_iv"][1], 0.25, atol=1e-3)
+    np.testing.assert_allclose(surface["skew"][1], -0.03, atol=1e-3)
+    np.testing.assert_allclose(surface["curvature"][1], 0.015, atol=1e-3)
+    assert bad["iv_residual"] == pytest.approx(0.5, abs=1e-3)
+    assert iv_surface.richness(bad["iv_residual"]) == "غالٍ"
+
+
+def test_fit_universe_matches_fit_symbol():
+    chains = {"AAA": _chain("AAA", 100.0), "BBB": _chain("BBB", 250.0, [(11, 0.4, -0.1, 0.05), (39, 0.35, -0.05, 0.02)])}
+
+    together = iv_surface.fit_universe(chains, TODAY)
+    iv_surface.clear()
+    alone = {symbol: iv_surface.fit_symbol(symbol, contracts, TODAY) for symbol, contracts in chains.items()}
+
+    for symbol in chains:
+        for field in ("days", "atm_iv", "skew", "curvature", "points", "rmse", "iv_fit", "iv_residual"):
+            np.testing.assert_allclose(np.asarray(together[symbol][field], dtype=float),
+                                       np.asarray(alone[symbol][field], dtype=float), atol=1e-12)
+
+
+def test_unchanged_chain_hits_cache():
+    first = iv_surface.fit_symbol("TEST", _chain(), TODAY)
+    assert _counter("cache.iv_surface.miss") == 1
+
+    assert iv_surface.fit_symbol("TEST", _chain(), TODAY) is first
+    assert iv_surface.fit_universe({"TEST": _chain()}, TODAY)["TEST"] is first
+    assert _counter("cache.iv_surface.hit") == 2
+
+    changed = _chain()
+    changed[0]["bid"] = 0.9
+    assert iv_surface.fit_symbol("TEST", changed, TODAY) is not first
+    assert _counter("cache.iv_surface.miss") == 2
+
+
+def test_iv_at_interpolates_between_expirations():
+    iv_surface.fit_symbol("TEST", _chain(), TODAY)
+
+    strikes = np.array([90.0, 100.0, 110.0])
+    k = np.log(strikes / 100.0) / math.sqrt(32 / 365)
+    np.testing.assert_allclose(iv_surface.iv_at("TEST", strikes, 32), 0.25 - 0.03 * k + 0.015 * k * k, atol=1e-3)
+    # منتصف المسافة بين 4 و 32 يومًا: المعاملات تُستكمل خطيًا
+    assert iv_surface.iv_at("TEST", [100.0], 18)[0] == pytest.approx(0.275, abs=1e-3)
+    # خارج التواريخ المُلاءمة: تُثبّت عند الطرف
+    assert iv_surface.iv_at("TEST", [100.0], 400)[0] == pytest.approx(0.22, abs=1e-3)
+    assert np.isnan(iv_surface.iv_at("NONE", [100.0], 30)).all()
@@ -0,0 +1,118 @@
+import json
+import random
+
+from core.level_watch import LevelWatch, format_level_event
+
+
+def _types(events: list) -> list:
+    return [(e["type"], e["level"]) for e in events]
+
+
+def _brute_force(levels: list, prices: list, band=0.01, rearm_band=0.02, hysteresis=0.001) -> list:
+    """نفس القواعد بتقييم كل المستويات عند كل سعر (بدون bisect)."""
+    levels = sorted(set(levels))
+    sides, armed, out, previous = [0] * len(levels), [True] * len(levels), [], None
+    for price in prices:
+        events = []
+        for i, level in enumerate(levels):
+            new = 1 if price > level * (1 + hysteresis) else -1 if price < level * (1 - hysteresis) else sides[i]
+            if previous is not None and new != sides[i] and sides[i] != 0:
+                events.append(("cross_up" if new > 0 else "cross_down", level))
+            sides[i] = new
+        for i, level in enumerate(levels):
+            if not armed[i] and abs(price - level) > level * rearm_band:
+                armed[i] = True
+        for i, level in enumerate(levels):
+            if armed[i] and abs(price - level) <= level * band:
+                armed[i] = False
+                events.append(("near", level))
+        out.append(events)
+        previous = price
+    return out
+
+
+def test_oscillation_inside_hysteresis_does_not_repeat_crosses():
+    watch = LevelWatch(band=0.0, rearm_band=0.0, hysteresis=0.001)
+    watch.set_levels("SPY", [500])
+
+    assert watch.update({"SPY": 495}) == []
+    events = [watch.update({"SPY": p}) for p in (500.2, 499.8, 500.3, 499.9, 500.6, 500.1, 499.4)]
+
+    assert [_types(e) for e in events] == [[], [], [], [], [("cross_up", 500.0)], [], [("cross_down", 500.0)]]
+
+
+def test_near_fires_once_until_price_leaves_rearm_band():
+    watch = LevelWatch(band=0.01, rearm_band=0.02, hysteresis=0.001)
+    watch.set_levels("QQQ", [600])
+
+    fired = [bool(watch.update({"QQQ": p})) for p in (590, 595, 597, 594.5, 590, 596)]
+
+    # 595 يدخل النطاق؛ 590 (أقل من 2%) لا يعيد التسليح، فلا تنبيه جديد عند 596
+    assert fired == [False, True, False, False, False, False]
+    assert _types(watch.update({"QQQ": 580})) == []
+    assert _types(watch.update({"QQQ": 597})) == [("near", 600.0)]
+
+
+def test_first_price_sets_sides_without_cross_events():
+    watch = LevelWatch()
+    watch.set_levels("AAPL", [180, 190, 200])
+
+    assert _types(watch.update({"AAPL": 250})) == []
+    assert _types(watch.update({"AAPL": 170})) == [("cross_down", 180.0), ("cross_down", 190.0),
+                                                   ("cross_down", 200.0)]
+
+
+def test_indexed_updates_match_brute_force_on_random_walk():
+    rng = random.Random(11)
+    levels = [round(rng.uniform(90, 110), 2) for _ in range(60)]
+    prices, price = [], 100.0
+    for _ in range(2000):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.004)))
+        prices.append(round(price, 2))
+    watch = LevelWatch()
+    watch.set_levels("X", levels)
+
+    actual = [sorted(_types(watch.update({"X": p}))) for p in prices]
+
+    assert actual == [sorted(e) for e in _brute_force(levels, prices)]
+
+
+def test_invalid_prices_and_unknown_symbols_are_ignored():
+    watch = LevelWatch()
+    watch.set_levels("spy", [500])
+
+    assert watch.update({"SPY": None, "QQQ": 500, "spy": float("nan")}) == []
+    assert watch.update({"SPY": 0}) == []
+    assert watch.symbols() == ["SPY"]
+
+
+def test_state_round_trip_keeps_sides_and_arming():
+    watch = LevelWatch()
+    watch.set_levels("SPY", [500, 510])
+    watch.update({"SPY": 498})
+    watch.update({"SPY": 501})
+
+    restored = LevelWatch()
+    restored.set_levels("SPY", [510, 500])
+    restored.restore(json.loads(json.dumps(watch.state())))
+
+    assert restored.update({"SPY": 501.5}) == []
+    assert _types(restored.update({"SPY": 495})) == [("cross_down", 500.0)]
+
+
+def test_restore_skips_symbols_with_changed_levels():
+    watch = LevelWatch()
+    watch.set_levels("SPY", [500])
+    watch.update({"SPY": 501})
+
+    restored = LevelWatch()
+    restored.set_levels("SPY", [505])
+    restored.restore(watch.state())
+
+    assert restored.update({"SPY": 400}) == []
+
+
+def test_format_level_event():
+    text = format_level_event({"type": "cross_up", "symbol": "SPY", "level": 500.0, "price": 501.234})
+
+    assert "SPY" in text and "500.0" in text and "501.23" in text
@@ -0,0 +1,74 @@
+import threading
+import urllib.request
+
+import pytest
+
+from core import metrics
+
+
+@pytest.fixture(autouse=True)
+def enabled():
+    was_enabled = metrics.is_enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def test_scan_records_stages_and_counters():
+    with metrics.scan("top10_up"):
+        metrics.observe("chains", 0.5)
+        metrics.incr("contracts.fetched", 3)
+        metrics.cache_hit("expirations")
+        metrics.cache_miss("expirations")
+
+    record = metrics.last_scan()
+    assert record["label"] == "top10_up"
+    assert record["stages"]["chains"]["calls"] == 1
+    assert record["counters"]["contracts.fetched"] == 3
+    assert record["cache_hit_ratio"] == {"expirations": 0.5}
+
+
+def test_nested_scan_counts_into_outer():
+    with metrics.scan("outer"):
+        with metrics.scan("inner"):
+            metrics.incr("events")
+
+    assert [r["label"] for r in metrics.recent_scans()] == ["outer"]
+    assert metrics.last_scan()["counters"] == {"events": 1}
+
+
+def test_concurrent_scans_record_one_report():
+    start = threading.Barrier(8)
+    inside = threading.Barrier(8)
+
+    def run(i):
+        start.wait()
+        with metrics.scan(f"scan_{i}"):
+            inside.wait()
+            metrics.incr("events")
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(metrics.recent_scans()) == 1
+    assert metrics.snapshot()["counters"]["events"] == 8
+
+
+def test_serve_prometheus_binds_localhost_by_default(monkeypatch):
+    monkeypatch.setattr(metrics, "_server", None)
+    server = metrics.serve_prometheus(port=0)
+    try:
+        host, port = server.server_address[:2]
+        assert host == "127.0.0.1"
+        metrics.incr("events")
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert 'maz_events_total{name="events"} 1' in body
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core import negative_cache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(negative_cache, "time", SimpleNamespace(time=clock.time))
+    negative_cache.enable()
+    negative_cache.clear()
+    yield clock
+    negative_cache.clear()
+
+
+def _ttl(symbol: str, trend: str = None) -> float:
+    entry = negative_cache.entries()[negative_cache._key(symbol, trend)]
+    return entry["expires_at"] - entry["recorded_at"]
+
+
+def test_repeated_reason_doubles_ttl_up_to_cap(clock):
+    base, cap = negative_cache.NEGATIVE_TTL["error"], negative_cache.MAX_TTL["error"]
+    ttls = []
+    for _ in range(8):
+        negative_cache.record("AAPL", "error")
+        ttls.append(_ttl("AAPL"))
+
+    assert ttls[:4] == [base, base * 2, base * 4, base * 8]
+    assert max(ttls) == cap and ttls[-1] == cap
+
+
+def test_different_reason_resets_strikes(clock):
+    negative_cache.record("AAPL", "error")
+    negative_cache.record("AAPL", "error")
+    negative_cache.record("AAPL", "no_expirations")
+
+    assert negative_cache.entries()["AAPL"]["strikes"] == 1
+    assert _ttl("AAPL") == negative_cache.NEGATIVE_TTL["no_expirations"]
+
+
+def test_skip_until_expiry(clock):
+    negative_cache.record("AAPL", "error")
+
+    assert negative_cache.should_skip("AAPL") == (True, "error")
+    clock.now += negative_cache.NEGATIVE_TTL["error"] + 1
+    assert negative_cache.should_skip("AAPL") == (False, None)
+    assert negative_cache.entries() == {}
+
+
+def test_trend_entries_only_skip_that_trend(clock):
+    negative_cache.record("AAPL", "no_liquid_strikes", "up")
+
+    assert negative_cache.should_skip("AAPL", "up") == (True, "no_liquid_strikes")
+    assert negative_cache.should_skip("AAPL", "down") == (False, None)
+    assert not negative_cache.has_active("AAPL")
+
+
+def test_clear_symbol_removes_symbol_and_trend_entries(clock):
+    negative_cache.record("AAPL", "error")
+    negative_cache.record("AAPL", "no_liquid_strikes", "up")
+    negative_cache.record("MSFT", "error")
+
+    negative_cache.clear("AAPL", "up")
+
+    assert list(negative_cache.entries()) == ["MSFT"]
+
+
+def test_save_and_load_drops_expired_entries(clock, tmp_path):
+    path = str(tmp_path / "negative.json")
+    negative_cache.record("AAPL", "error")
+    negative_cache.record("MSFT", "no_expirations")
+    negative_cache.save(path)
+    negative_cache.clear()
+
+    clock.now += negative_cache.NEGATIVE_TTL["error"] + 1
+    negative_cache.load(path)
+
+    assert list(negative_cache.entries()) == ["MSFT"]
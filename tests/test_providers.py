@@ -0,0 +1,148 @@
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import governor, providers
+from core.governor import AdaptiveTokenBucket, Governor
+from core.providers import CHAIN_COLUMNS, MarketDataProvider, ReplayProvider, record_snapshot, write_snapshot
+
+EXPIRATIONS = ["2026-10-23", "2026-11-20", "2026-12-18"]
+
+
+def _fake_yfinance(throttled=()):
+    """بديل yf.download: شمعتان لكل رمز، و 429 مبتلع في shared._ERRORS للرموز المخنوقة."""
+    calls = []
+    shared = SimpleNamespace(_ERRORS={})
+
+    def download(symbols, threads=True, **kwargs):
+        calls.append((list(symbols), threads))
+        shared._ERRORS = {s: "YFRateLimitError('Too Many Requests. Rate limited.')" for s in symbols if s in throttled}
+        frames = {s: pd.DataFrame({"Close": [10.0, float(i + 1)], "Volume": [100.0, 300.0]})
+                  for i, s in enumerate(symbols) if s not in throttled}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    return SimpleNamespace(download=download, shared=shared), calls
+
+
+@pytest.fixture
+def gov(monkeypatch):
+    g = Governor(timeout=1.0, retries=2, bucket=AdaptiveTokenBucket(rate=1000, capacity=1000))
+    monkeypatch.setattr(governor, "_governor", g)
+    return g
+
+
+def test_get_quotes_downloads_in_chunks(monkeypatch, gov):
+    yf, calls = _fake_yfinance()
+    monkeypatch.setitem(sys.modules, "yfinance", yf)
+    symbols = [f"S{i}" for i in range(23)]
+
+    quotes = providers.YFinanceProvider().get_quotes(symbols)
+
+    assert [len(chunk) for chunk, _ in calls] == [10, 10, 3]
+    assert not any(threads for _, threads in calls)
+    assert quotes["S0"] == {"price": 1.0, "avg_volume": 200.0}
+    assert set(quotes) == set(symbols)
+
+
+def test_swallowed_throttle_slows_governor_and_drops_chunk(monkeypatch, gov, capsys):
+    yf, calls = _fake_yfinance(throttled={"S12"})
+    monkeypatch.setitem(sys.modules, "yfinance", yf)
+    rate = gov.bucket.rate
+
+    quotes = providers.YFinanceProvider().get_quotes([f"S{i}" for i in range(15)])
+
+    # بلا إعادة محاولة: الدفعة المخنوقة تُطلب مرة واحدة وتغيب رموزها
+    assert len(calls) == 2
+    assert gov.bucket.rate < rate
+    assert set(quotes) == {f"S{i}" for i in range(10)}
+    assert "⚠️" in capsys.readouterr().out
+
+
+def _side(expiration: str, option_type: str) -> pd.DataFrame:
+    strikes = np.arange(90.0, 111.0, 5.0) + (1 if option_type == "put" else 0)
+    offset = EXPIRATIONS.index(expiration)
+    return pd.DataFrame({
+        "contractSymbol": [f"TEST{expiration}{option_type}{k}" for k in strikes],
+        "strike": strikes,
+        "lastPrice": strikes / 50 + offset,
+        "bid": strikes / 60 + offset,
+        "ask": strikes / 55 + offset,
+        "volume": [10, 0, np.nan, 300, 7][:len(strikes)],
+        "openInterest": np.arange(len(strikes)) * 100 + offset,
+        "impliedVolatility": np.linspace(0.2, 0.4, len(strikes)),
+    })
+
+
+class _Source(MarketDataProvider):
+    """مصدر في الذاكرة بتاريخ جلسة ثابت (بديل yfinance لتسجيل اللقطات)."""
+
+    def today(self):
+        return date(2026, 10, 19)
+
+    def get_expirations(self, symbol):
+        return list(EXPIRATIONS)
+
+    def get_bars(self, symbol, period="6mo"):
+        index = pd.date_range("2026-09-01", periods=35, freq="B", tz="America/New_York", name="Date")
+        close = np.linspace(95.0, 101.5, len(index))
+        return pd.DataFrame({"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close,
+                             "Volume": np.full(len(index), 1e6), "Dividends": 0.0}, index=index)
+
+    def get_chain(self, symbol, expiration):
+        return _side(expiration, "call"), _side(expiration, "put")
+
+
+def _assert_chain_matches(replayed: pd.DataFrame, original: pd.DataFrame):
+    assert list(replayed.columns) == CHAIN_COLUMNS
+    expected = original[CHAIN_COLUMNS].astype(float).reset_index(drop=True)
+    pd.testing.assert_frame_equal(replayed.astype(float), expected)
+
+
+def test_snapshot_round_trip(tmp_path):
+    source = _Source()
+
+    record_snapshot(str(tmp_path), "test", source)
+    replay = ReplayProvider(str(tmp_path))
+
+    assert replay.today() == date(2026, 10, 19)
+    assert replay.get_expirations("TEST") == EXPIRATIONS
+    assert isinstance(replay._load("TEST")["chain"]["strike"], np.memmap)
+    for expiration in EXPIRATIONS:
+        calls, puts = replay.get_chain("TEST", expiration)
+        _assert_chain_matches(calls, _side(expiration, "call"))
+        _assert_chain_matches(puts, _side(expiration, "put"))
+    assert replay.get_spot("TEST") == 101.5
+    bars = replay.get_bars("TEST", "5d")
+    assert list(bars.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert bars.index[-1] == pd.Timestamp(source.get_bars("TEST").index[-1].date())
+    assert replay.get_quotes(["TEST"]) == {"TEST": {"price": 101.5, "avg_volume": 1e6}}
+
+
+def test_snapshot_skips_missing_chains_and_columns(tmp_path):
+    calls = _side(EXPIRATIONS[0], "call").drop(columns=["impliedVolatility"])
+    empty = pd.DataFrame(columns=CHAIN_COLUMNS)
+
+    write_snapshot(str(tmp_path), "TEST", "2026-10-19", EXPIRATIONS, _Source().get_bars("TEST"),
+                   {EXPIRATIONS[0]: (calls, empty)})
+    replay = ReplayProvider(str(tmp_path))
+
+    assert replay.get_expirations("test") == EXPIRATIONS[:1]
+    replayed_calls, replayed_puts = replay.get_chain("TEST", EXPIRATIONS[0])
+    assert replayed_calls["impliedVolatility"].isna().all()
+    assert replayed_calls["strike"].tolist() == calls["strike"].tolist()
+    assert replayed_puts.empty
+    with pytest.raises(ValueError):
+        replay.get_chain("TEST", EXPIRATIONS[1])
+
+
+def test_replay_unknown_symbol(tmp_path):
+    replay = ReplayProvider(str(tmp_path), session=date(2026, 10, 19))
+
+    assert replay.today() == date(2026, 10, 19)
+    assert replay.get_expirations("NOPE") == []
+    assert replay.get_spot("NOPE") == 0.0
+    assert replay.get_bars("NOPE").empty
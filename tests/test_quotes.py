@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core import metrics, quotes
+from core.providers import MarketDataProvider, set_provider
+
+FILTERS = {"min_price": 5.0, "max_price": 2000.0, "min_avg_volume": 500000}
+
+
+class _Quotes(MarketDataProvider):
+    """مصدر أسعار ثابت؛ الرموز غير الموجودة لا تُرجع سعرًا (فشل شبكة)."""
+
+    QUOTES = {
+        "GOOD": {"price": 150.0, "avg_volume": 2e6},
+        "PENNY": {"price": 2.5, "avg_volume": 5e6},
+        "PRICEY": {"price": 5000.0, "avg_volume": 1e6},
+        "THIN": {"price": 40.0, "avg_volume": 1e4},
+        "ZERO": {"price": 0.0, "avg_volume": 0.0},
+    }
+
+    def get_quotes(self, symbols):
+        return {s: self.QUOTES[s] for s in symbols if s in self.QUOTES}
+
+
+@pytest.fixture(autouse=True)
+def provider():
+    previous = set_provider(_Quotes())
+    quotes.clear()
+    was_enabled = metrics.is_enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    quotes.clear()
+    set_provider(previous)
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def test_prefilter_skips_failing_and_keeps_missing_quotes(capsys):
+    universe = ["GOOD", "PENNY", "MISSING", "PRICEY", "THIN", "ZERO"]
+    quotes.prefetch_quotes(universe)
+
+    kept = quotes.prefilter_symbols(universe, FILTERS)
+
+    # MISSING بلا سعر و ZERO بسعر 0: لا نستبعد بسبب فشل الجلب
+    assert kept == ["GOOD", "MISSING", "ZERO"]
+    assert metrics.snapshot()["counters"]["symbols.prefiltered"] == 3
+    out = capsys.readouterr().out
+    assert "PENNY" in out and "PRICEY" in out and "THIN" in out
+
+
+def test_prefilter_without_prefetch_keeps_everything():
+    assert quotes.prefilter_symbols(["GOOD", "PENNY"], FILTERS) == ["GOOD", "PENNY"]
+
+
+def test_cached_spot_expires(monkeypatch):
+    quotes.prefetch_quotes(["GOOD", "ZERO"])
+
+    assert quotes.get_cached_spot("GOOD") == 150.0
+    assert quotes.get_cached_spot("ZERO") is None
+    assert quotes.get_cached_spot("MISSING") is None
+    later = quotes.time.time() + quotes.QUOTE_TTL + 1
+    monkeypatch.setattr(quotes, "time", SimpleNamespace(time=lambda: later))
+    assert quotes.get_cached_spot("GOOD") is None
+
+
+def test_failed_batch_is_reported(monkeypatch, capsys):
+    def offline(self, symbols):
+        raise ConnectionError("offline")
+    monkeypatch.setattr(_Quotes, "get_quotes", offline)
+
+    assert quotes.prefetch_quotes(["GOOD"]) == {}
+    assert quotes.prefilter_symbols(["GOOD"], FILTERS) == ["GOOD"]
+    assert "⚠️" in capsys.readouterr().out
@@ -0,0 +1,71 @@
+import contextlib
+import io
+import json
+
+import pytest
+
+from benchmarks.fixtures import replay
+from core import negative_cache, quotes, rerank, rules, top10
+
+SYMBOLS = ["SPY", "QQQ", "AAPL", "MSFT", "NVDA", "TSLA"]
+
+
+def _key(contracts: list) -> list:
+    return [(c["underlying_symbol"], c["strike"], c["expiration_date"], round(c["score"], 9)) for c in contracts]
+
+
+@pytest.fixture
+def scan(tmp_path, monkeypatch):
+    """فحص Top 10 على اللقطات المسجلة، مع أوزان مخصصة لـ SPY في ملف القواعد."""
+    with open(rules.RULES_FILE, encoding="utf-8") as f:
+        spec = json.load(f)
+    spec["symbols"]["SPY"]["scoring"] = {"weights": {"liquidity": 0.2, "spread": 0.2, "iv": 0.6}}
+    path = tmp_path / "scoring_rules.json"
+    path.write_text(json.dumps(spec), encoding="utf-8")
+    monkeypatch.setattr(rules, "RULES_FILE", str(path))
+    negative_cache.disable()
+    top10.reset_incremental_state()
+
+    with replay(SYMBOLS), contextlib.redirect_stdout(io.StringIO()):
+        yield top10.get_top_10_across_symbols("up", SYMBOLS)
+
+    top10.reset_incremental_state()
+    top10._contribution.clear()
+    rerank.clear()
+    quotes.clear()
+    negative_cache.enable()
+
+
+def test_rerank_without_overrides_reproduces_scan(scan):
+    assert _key(rerank.rerank("up")) == _key(scan)
+    assert rerank.last_scan_info("up")["up"]["symbols"] == len(SYMBOLS)
+
+
+def test_untouched_form_sends_no_overrides(scan):
+    scoring = rules.get_rules().spec["scoring"]
+    shown = {"scoring": {"weights": dict(scoring["weights"]), "iv_target": scoring["iv_target"]}}
+
+    overrides = rerank.changed_overrides(shown, {"scoring": scoring})
+
+    # الأوزان الافتراضية المعروضة لا تستبدل أوزان SPY المخصصة
+    assert overrides == {}
+    everything = _key(rerank.rerank("up", k=100))
+    assert _key(rerank.rerank("up", overrides, k=100)) == everything
+    assert _key(rerank.rerank("up", shown, k=100)) != everything
+    assert any(c[0] == "SPY" for c in everything)
+
+
+def test_changed_weight_reorders_and_keeps_other_fields():
+    scoring = rules.DEFAULT_RULES["scoring"]
+    values = {"scoring": {"weights": dict(scoring["weights"], iv=0.9), "iv_target": scoring["iv_target"]}}
+
+    assert rerank.changed_overrides(values, {"scoring": scoring}) == {"scoring": {"weights": {"iv": 0.9}}}
+
+
+def test_changing_a_weight_reorders_results(scan):
+    reranked = rerank.rerank("up", {"scoring": {"weights": {"liquidity": 0.0, "spread": 1.0, "iv": 0.0}}})
+
+    assert len(reranked) == len(scan)
+    assert [c[:3] for c in _key(reranked)] != [c[:3] for c in _key(scan)]
+    assert all(a["score"] >= b["score"] for a, b in zip(reranked, reranked[1:]))
+
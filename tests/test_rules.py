@@ -0,0 +1,119 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from core.rules import DEFAULT_RULES, CompiledRules, _merge, to_arrays
+
+TODAY = date(2026, 10, 19)
+
+
+def _scalar_score(c: dict, today: date) -> float:
+    """التقييم العددي الأصلي (scoring._score_option قبل القواعد المترجمة)."""
+    bid, ask = c.get("bid", 0), c.get("ask", 0)
+    volume, oi, iv = c.get("volume", 0), c.get("open_interest", 0), c.get("implied_volatility", 0)
+    spread = ((ask - bid) / bid * 100) if bid > 0.01 else 999
+    try:
+        from datetime import datetime
+        days_to_exp = (datetime.strptime(c.get("expiration_date", ""), "%Y-%m-%d").date() - today).days
+    except ValueError:
+        days_to_exp = 30
+    liquidity_score = (
+        (50 if volume >= 300 else 30 if volume >= 100 else 10) +
+        (50 if oi >= 1000 else 30 if oi >= 500 else 10) +
+        (20 if days_to_exp <= 7 else 0)
+    )
+    spread_score = max(0, 100 - spread)
+    iv_score = max(0, 100 - abs(iv - 0.40) * 100)
+    return liquidity_score * 0.5 + spread_score * 0.3 + iv_score * 0.2
+
+
+def _contracts(n: int = 500, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    contracts = []
+    for _ in range(n):
+        bid = rng.choice([0.0, 0.01, 0.02, round(rng.uniform(0.05, 10), 2)])
+        contracts.append({
+            "option_type": rng.choice(["call", "put"]),
+            "strike": round(rng.uniform(80, 120), 1),
+            "underlying_price": 100.0,
+            "bid": bid,
+            "ask": round(bid + rng.uniform(0, 2), 2),
+            "volume": rng.choice([0, 99, 100, 299, 300, rng.randint(0, 5000)]),
+            "open_interest": rng.choice([0, 499, 500, 999, 1000, rng.randint(0, 50000)]),
+            "implied_volatility": rng.uniform(0, 2),
+            "expiration_date": rng.choice([(TODAY + timedelta(days=d)).isoformat() for d in (0, 6, 7, 8, 45)]
+                                          + ["", "bad-date"]),
+        })
+    return contracts
+
+
+def test_compiled_score_matches_scalar_scoring():
+    contracts = _contracts()
+    rules = CompiledRules(DEFAULT_RULES)
+
+    scores = rules.score(to_arrays(contracts, TODAY))
+
+    np.testing.assert_allclose(scores, [_scalar_score(c, TODAY) for c in contracts], rtol=1e-12)
+
+
+@pytest.mark.parametrize("direction, low, high", [("up", 0.95, 1.15), ("down", 0.85, 1.05)])
+def test_pick_range_matches_scalar_bounds(direction, low, high):
+    contracts = _contracts()
+    rules = CompiledRules(DEFAULT_RULES)
+
+    mask = rules.in_pick_range(to_arrays(contracts, TODAY), direction)
+
+    expected = [not (c["strike"] < c["underlying_price"] * low or c["strike"] > c["underlying_price"] * high)
+                for c in contracts]
+    assert mask.tolist() == expected
+
+
+def test_filter_mask_matches_min_volume_and_oi():
+    contracts = _contracts()
+    rules = CompiledRules(DEFAULT_RULES)
+
+    mask = rules.filter_mask(to_arrays(contracts, TODAY))
+
+    assert mask.tolist() == [c["volume"] >= 300 and c["open_interest"] >= 1000 for c in contracts]
+
+
+def test_tolerance_tiers_pick_narrowest_band():
+    rules = CompiledRules(DEFAULT_RULES)
+    contracts = [{"option_type": "call", "strike": k, "bid": 1.0, "ask": 1.2, "volume": 500,
+                  "implied_volatility": 0.3} for k in (100, 104, 108, 114, 130)]
+    contracts.append({"option_type": "put", "strike": 100, "bid": 1.0, "ask": 1.2, "volume": 500,
+                      "implied_volatility": 0.3})
+
+    tiers = rules.tolerance_tiers(to_arrays(contracts, TODAY), "up", 100.0)
+
+    assert tiers.tolist() == [0, 0, 1, 2, -1, -1]
+
+
+def test_unusual_weight_adds_capped_points():
+    base = CompiledRules(DEFAULT_RULES)
+    weighted = CompiledRules(_merge(DEFAULT_RULES, {"scoring": {"weights": {"unusual": 0.5}}}))
+    contracts = _contracts(20)
+    for c, z in zip(contracts, [0, 1, 3, 10] * 5):
+        c["unusual_z"] = z
+    a = to_arrays(contracts, TODAY)
+
+    extra = weighted.score(a) - base.score(a)
+
+    np.testing.assert_allclose(extra, [min(z * 20, 100) * 0.5 for z in [0, 1, 3, 10] * 5])
+
+
+def test_merge_overrides_nested_keys_only():
+    merged = _merge(DEFAULT_RULES, {"filters": {"min_volume": 50}})
+
+    assert merged["filters"]["min_volume"] == 50
+    assert merged["filters"]["min_oi"] == DEFAULT_RULES["filters"]["min_oi"]
+    assert DEFAULT_RULES["filters"]["min_volume"] == 300
+
+
+def test_rsi_confirms_direction():
+    rules = CompiledRules(DEFAULT_RULES)
+
+    assert rules.rsi_confirms("up", 25) and not rules.rsi_confirms("up", 30)
+    assert rules.rsi_confirms("down", 75) and not rules.rsi_confirms("down", 70)
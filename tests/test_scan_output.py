@@ -0,0 +1,54 @@
+import json
+import math
+
+import pytest
+
+from core.scan_output import FIELDS, JsonlWriter, ParquetWriter, to_records
+
+CONTRACTS = [
+    {"underlying_symbol": "AAPL", "option_type": "call", "strike": 200, "expiration_date": "2026-10-23",
+     "bid": 1.2, "ask": 1.3, "volume": 500, "implied_volatility": math.nan, "score": 81.5},
+    {"underlying_symbol": "MSFT", "option_type": "put", "strike": 410.0, "expiration_date": "2026-11-20"},
+]
+
+
+def test_to_records_has_fixed_fields_and_ranks():
+    rows = to_records(CONTRACTS, "top", "up", scanned_at="2026-10-19T14:30:00+00:00")
+
+    assert [list(row) for row in rows] == [[name for name, _ in FIELDS]] * 2
+    assert [row["rank"] for row in rows] == [1, 2]
+    assert rows[0]["strike"] == 200.0 and rows[0]["implied_volatility"] is None
+    assert rows[1]["bid"] is None and rows[1]["trend"] == "up"
+
+
+def test_jsonl_writer_owns_and_closes_its_file(tmp_path):
+    path = tmp_path / "scan.jsonl"
+    writer = JsonlWriter(str(path))
+    writer.write(to_records(CONTRACTS, "symbol", "up"))
+    writer.close()
+
+    assert writer.stream.closed
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["underlying_symbol"] for line in lines] == ["AAPL", "MSFT"]
+
+
+def test_jsonl_writer_leaves_stdout_open(capsys):
+    writer = JsonlWriter()
+    writer.write(to_records(CONTRACTS[:1], "top", "down"))
+    writer.close()
+
+    assert not writer.stream.closed
+    assert json.loads(capsys.readouterr().out)["record"] == "top"
+
+
+def test_parquet_writer_round_trip(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "scan.parquet")
+    writer = ParquetWriter(path)
+    writer.write(to_records(CONTRACTS, "symbol", "up"))
+    writer.write([])
+    writer.close()
+
+    table = pq.read_table(path)
+    assert table.num_rows == 2
+    assert table.column("underlying_symbol").to_pylist() == ["AAPL", "MSFT"]
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from core.singleflight import Group
+
+
+def _concurrent(n: int, fn) -> list:
+    start = threading.Barrier(n)
+    results = [None] * n
+
+    def run(i):
+        start.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_callers_share_one_call():
+    group = Group("test", share=list)
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        time.sleep(0.1)
+        return [symbol]
+
+    results = _concurrent(8, lambda: group.do(("AAPL", "2026-10-23"), fetch, "AAPL"))
+
+    assert calls == ["AAPL"]
+    assert results == [["AAPL"]] * 8
+    # كل مستدعٍ يأخذ كائنًا مستقلًا
+    assert len({id(r) for r in results}) == 8
+    assert group.in_flight() == 0
+
+
+def test_waiters_get_result_before_leader_mutates_it():
+    group = Group("test", share=dict)
+    release = threading.Event()
+
+    def fetch():
+        release.wait()
+        return {"iv": 0.3}
+
+    leader_result = {}
+
+    def leader():
+        result = group.do("k", fetch)
+        result["iv"] = "mutated"
+        leader_result.update(result)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    while not group.in_flight():
+        time.sleep(0.001)
+    waiter_result = {}
+    waiter = threading.Thread(target=lambda: waiter_result.update(group.do("k", fetch)))
+    waiter.start()
+    time.sleep(0.05)
+    release.set()
+    thread.join()
+    waiter.join()
+
+    assert leader_result == {"iv": "mutated"}
+    assert waiter_result == {"iv": 0.3}
+
+
+def test_errors_reach_every_waiter():
+    group = Group("test")
+
+    def fetch():
+        time.sleep(0.1)
+        raise ConnectionError("upstream down")
+
+    results = _concurrent(4, lambda: group.do("k", fetch))
+
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert group.in_flight() == 0
+
+
+def test_no_caching_between_sequential_calls():
+    group = Group("test")
+    counter = iter(range(10))
+
+    assert group.do("k", lambda: next(counter)) == 0
+    assert group.do("k", lambda: next(counter)) == 1
+
+
+def test_different_keys_run_independently():
+    group = Group("test")
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        time.sleep(0.05)
+        return key
+
+    results = _concurrent(4, lambda: group.do(threading.get_ident(), fetch, threading.get_ident()))
+
+    assert len(calls) == 4 and sorted(results) == sorted(calls)
+
+
+def test_leader_error_propagates_to_leader():
+    group = Group("test")
+
+    with pytest.raises(KeyError):
+        group.do("k", lambda: {}["missing"])
+    assert group.in_flight() == 0
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+
+from core import fetcher, top10
+from core.providers import MarketDataProvider, set_provider
+
+TODAY = date(2026, 10, 19)
+
+
+def _day(days: int) -> str:
+    return (TODAY + timedelta(days=days)).isoformat()
+
+
+class _Expirations(MarketDataProvider):
+    """مصدر بتواريخ انتهاء ثابتة (بترتيب غير مرتب وبتاريخ تالف)."""
+
+    calls = 0
+
+    def today(self):
+        return TODAY
+
+    def get_expirations(self, symbol):
+        self.calls += 1
+        return [_day(45), _day(-1), _day(0), "2026-13-01", _day(7), _day(8), _day(100), _day(101), _day(21)]
+
+
+@pytest.fixture
+def provider():
+    source = _Expirations()
+    previous = set_provider(source)
+    fetcher.clear_expiration_cache()
+    yield source
+    fetcher.clear_expiration_cache()
+    set_provider(previous)
+
+
+@pytest.mark.parametrize("max_dte, expected", [
+    (0, [0]),
+    (7, [0, 7]),
+    (8, [0, 7, 8]),
+    (45, [0, 7, 8, 21, 45]),
+    (100, [0, 7, 8, 21, 45, 100]),
+    (365, [0, 7, 8, 21, 45, 100, 101]),
+])
+def test_expirations_within_max_dte(provider, max_dte, expected):
+    assert fetcher.get_expirations_within("TEST", max_dte) == [_day(d) for d in expected]
+
+
+def test_expirations_within_reads_daily_cache(provider):
+    fetcher.get_expirations_within("TEST", 30)
+    fetcher.get_expirations_within("TEST", 90)
+
+    assert provider.calls == 1
+
+
+@pytest.mark.parametrize("days, bucket", [
+    (0, "weekly"), (7, "weekly"),
+    (8, "near"), (21, "near"),
+    (22, "monthly"), (45, "monthly"),
+    (46, "quarterly"), (100, "quarterly"),
+    (101, "long"), (400, "long"),
+])
+def test_tag_buckets_boundaries(days, bucket):
+    contracts = [{"expiration_date": _day(days), "strike": 100.0}, {"expiration_date": _day(days), "strike": 105.0}]
+
+    top10._tag_buckets(contracts, TODAY)
+
+    assert [c["bucket"] for c in contracts] == [bucket, bucket]
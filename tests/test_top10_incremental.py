@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from core import metrics, top10
+from core.rules import get_rules
+
+
+def _chain(spot: float, n: int = 120, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    contracts = []
+    for i in range(n):
+        option_type = "call" if i % 2 == 0 else "put"
+        contracts.append({
+            "underlying_symbol": "TEST",
+            "option_type": option_type,
+            "strike": round(spot * (0.7 + 0.6 * i / n), 1),
+            "expiration_date": "2026-10-23",
+            "bid": round(rng.uniform(0.5, 4.0), 2),
+            "ask": round(rng.uniform(4.1, 6.0), 2),
+            "volume": rng.randint(100, 5000),
+            "open_interest": rng.randint(500, 20000),
+            "implied_volatility": rng.uniform(0.2, 0.6),
+            "underlying_price": spot,
+        })
+    return contracts
+
+
+def _boundary_prices(contracts: list, trend: str) -> list:
+    """أسعار يقع عندها Strike على حد مستوى بالضبط."""
+    bounds = {b for t in get_rules("TEST").tolerances for b in (t[:2] if trend == "up" else t[2:]) if b > 0}
+    return [c["strike"] / b for c in contracts[:10] for b in bounds]
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    top10._contract_state.clear()
+    was_enabled = metrics.is_enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    top10._contract_state.clear()
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+@pytest.mark.parametrize("trend", ["up", "down"])
+def test_incremental_filter_matches_full_filter_over_price_walk(trend):
+    contracts = _chain(100.0)
+    rng = random.Random(7)
+    prices = [100.0 * (1 + rng.uniform(-0.08, 0.08)) for _ in range(60)] + _boundary_prices(contracts, trend)
+    rng.shuffle(prices)
+
+    for price in prices:
+        expected = top10._filter_near_the_money(contracts, trend, price)
+        assert top10._filter_incremental("TEST", trend, contracts, price) == expected, price
+
+
+def test_small_price_moves_do_not_retier_every_contract():
+    contracts = _chain(100.0)
+    top10._filter_incremental("TEST", "up", contracts, 100.0)
+    first = metrics.snapshot()["counters"]["contracts.retiered"]
+
+    top10._filter_incremental("TEST", "up", contracts, 100.01)
+    retiered = metrics.snapshot()["counters"]["contracts.retiered"] - first
+
+    assert first == len(contracts)
+    assert retiered < len(contracts) // 10
+
+
+def test_changed_inputs_are_retiered():
+    contracts = _chain(100.0)
+    # سعر لا يقع عنده أي Strike على حد بالضبط (تلك العقود يُعاد حسابها دائمًا)
+    top10._filter_incremental("TEST", "down", contracts, 100.037)
+    contracts[3] = dict(contracts[3], ask=0.0)
+    before = metrics.snapshot()["counters"]["contracts.retiered"]
+
+    result = top10._filter_incremental("TEST", "down", contracts, 100.037)
+
+    assert metrics.snapshot()["counters"]["contracts.retiered"] - before == 1
+    assert result == top10._filter_near_the_money(contracts, "down", 100.037)
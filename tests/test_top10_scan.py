@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from core import metrics, top10
+from core import universe as universe_index
+
+UNIVERSE = ["AAA", "BBB", "CCC", "DDD"]
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    top10.reset_incremental_state()
+    top10._contribution.clear()
+    top10._last_coverage.clear()
+    top10._last_candidates.clear()
+    monkeypatch.setattr(universe_index, "get_index", lambda rebuild=True, force=False: None)
+    monkeypatch.setattr(top10.quotes, "prefetch_quotes", lambda universe: {})
+    monkeypatch.setattr(top10.quotes, "prefilter_symbols", lambda universe: list(universe))
+    was_enabled = metrics.is_enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    top10.reset_incremental_state()
+    top10._contribution.clear()
+    top10._last_coverage.clear()
+    top10._last_candidates.clear()
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def _contract(symbol: str, score: float) -> dict:
+    return {"underlying_symbol": symbol, "option_type": "call", "strike": 100.0, "expiration_date": "2026-10-23",
+            "underlying_price": 100.0, "bid": 1.0, "ask": 1.1, "volume": 100, "open_interest": 1000,
+            "implied_volatility": 0.3, "score": score}
+
+
+def _fake_process(slow: dict, finished: list):
+    """process_symbol بديل: الرموز في slow تنتظر الحدث المرافق قبل أن تكتمل."""
+    def process_symbol(symbol, trend, max_dte=0):
+        if symbol in slow:
+            slow[symbol].wait(2)
+        top2 = [_contract(symbol, 10.0 + UNIVERSE.index(symbol))]
+        top10._last_candidates[(symbol, trend)] = top2
+        finished.append(symbol)
+        return top2
+    return process_symbol
+
+
+def test_prioritise_by_contribution_then_liquidity(monkeypatch):
+    top10._contribution.update({"AAA": 0.0, "DDD": 4.0, "BBB": 1.0})
+    index = {"symbols": [{"symbol": "CCC", "score": 100.0}, {"symbol": "AAA", "score": 50.0}]}
+    monkeypatch.setattr(universe_index, "get_index", lambda rebuild=True, force=False: index)
+
+    # DDD: 0.6، CCC: 0.4، AAA: 0.2، BBB: 0.15، EEE: 0
+    assert top10._prioritise(UNIVERSE + ["EEE"]) == ["DDD", "CCC", "AAA", "BBB", "EEE"]
+
+
+def test_prioritise_keeps_order_without_history():
+    assert top10._prioritise(UNIVERSE) == UNIVERSE
+
+
+def test_record_contribution_decays_only_processed_symbols():
+    top10._contribution.update({"AAA": 2.0, "BBB": 2.0})
+
+    top10._record_contribution({"AAA", "CCC"}, [_contract("CCC", 1.0), _contract("CCC", 2.0)])
+
+    assert top10._contribution == {"AAA": 2.0 * top10.CONTRIBUTION_DECAY, "BBB": 2.0, "CCC": 2.0}
+
+
+def test_full_scan_coverage_is_complete(monkeypatch):
+    finished = []
+    monkeypatch.setattr(top10, "process_symbol", _fake_process({}, finished))
+
+    top = top10.get_top_10_across_symbols("up", UNIVERSE, workers=2)
+
+    coverage = top10.get_coverage("up")
+    assert coverage["complete"] and not coverage["timed_out"]
+    assert (coverage["scanned"], coverage["total"], coverage["skipped"]) == (4, 4, [])
+    assert [c["underlying_symbol"] for c in top] == ["DDD", "CCC", "BBB", "AAA"]
+    assert top10.format_coverage(coverage) == ""
+
+
+def test_budget_reports_skipped_and_waits_for_running_symbols(monkeypatch, capsys):
+    release = threading.Event()
+    finished = []
+    monkeypatch.setattr(top10, "process_symbol", _fake_process({"CCC": release}, finished))
+    threading.Timer(0.4, release.set).start()
+
+    top = top10.get_top_10_across_symbols("up", UNIVERSE, workers=1, budget=0.2)
+
+    coverage = top10.get_coverage("up")
+    # CCC بدأ قبل الموعد: يُنتظر قبل العودة لكن نتيجته لا تدخل الفحص؛ DDD لم يبدأ
+    assert finished == ["AAA", "BBB", "CCC"]
+    assert [c["underlying_symbol"] for c in top] == ["BBB", "AAA"]
+    assert coverage["skipped"] == ["CCC", "DDD"]
+    assert coverage["timed_out"] and not coverage["complete"]
+    assert coverage["scanned"] == 2 and coverage["elapsed"] >= 0.4
+    assert "لم يُفحص: CCC, DDD" in capsys.readouterr().out
+    counters = metrics.snapshot()["counters"]
+    assert counters["symbols.deadline_skipped"] == 2 and counters["symbols.late_drained"] == 1
+
+
+def test_late_drain_is_capped(monkeypatch):
+    monkeypatch.setattr(top10, "LATE_DRAIN_S", 0.05)
+    release = threading.Event()
+    finished = []
+    monkeypatch.setattr(top10, "process_symbol", _fake_process({"AAA": release}, finished))
+
+    started = time.time()
+    top10.get_top_10_across_symbols("up", UNIVERSE, workers=1, budget=0.05)
+    elapsed = time.time() - started
+
+    release.set()
+    while not finished:  # السهم المتروك يكمل في الخلفية؛ ننتظره حتى لا يكتب في الاختبار التالي
+        time.sleep(0.01)
+    assert elapsed < 1.0
+    assert top10.get_coverage("up")["skipped"] == UNIVERSE
+    assert metrics.snapshot()["counters"]["symbols.abandoned"] == 1
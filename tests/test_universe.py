@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+
+from core import universe
+
+
+def test_percentiles_rank_and_handle_missing():
+    values = np.array([10.0, np.nan, 30.0, 20.0, np.inf])
+
+    assert universe._percentiles(values).tolist() == [0.0, 0.0, 1.0, 0.5, 0.0]
+    assert universe._percentiles(values, higher_is_better=False).tolist() == [1.0, 0.0, 0.0, 0.5, 0.0]
+
+
+def test_percentiles_single_and_empty():
+    assert universe._percentiles(np.array([5.0])).tolist() == [0.0]
+    assert universe._percentiles(np.array([])).tolist() == []
+
+
+def test_rank_orders_by_weighted_liquidity():
+    stats = {
+        "THIN": (100.0, 500.0, 0.30),
+        "DEEP": (90_000.0, 400_000.0, 0.01),
+        "MID": (5_000.0, 20_000.0, 0.05),
+        "NONE": None,
+    }
+
+    entries = universe.rank(stats)
+
+    assert [e["symbol"] for e in entries] == ["DEEP", "MID", "THIN", "NONE"]
+    assert entries[0]["score"] == 100.0
+    assert entries[-1] == {"symbol": "NONE", "score": 0.0, "volume": None, "open_interest": None, "spread": None}
+
+
+def test_chain_stats_weights_near_money_spreads():
+    strike = np.array([90.0, 100.0, 101.0, 150.0])
+    bid = np.array([10.0, 1.0, 0.9, 0.01])
+    ask = np.array([10.5, 1.1, 1.1, 0.5])
+    volume = np.array([5.0, 100.0, np.nan, 1000.0])
+    oi = np.array([1.0, 2.0, 3.0, np.nan])
+
+    total_volume, total_oi, spread = universe._chain_stats(strike, bid, ask, volume, oi, 100.0)
+
+    assert (total_volume, total_oi) == (1105.0, 6.0)
+    # 90 و 150 خارج ±10%؛ الباقيان بوزن volume + 1
+    expected = (0.1 / 1.05 * 101 + 0.2 / 1.0 * 1) / 102
+    assert math.isclose(spread, expected)
+
+
+def test_front_expiration():
+    assert universe._front_expiration(["2026-11-20", "2026-10-23", "2026-10-16"], "2026-10-19") == "2026-10-23"
+    assert universe._front_expiration(["2026-10-16"], "2026-10-19") is None
+
+
+def test_index_round_trip(tmp_path):
+    path = str(tmp_path / "index.json")
+    index = {"built": "2026-10-19", "symbols": universe.rank({"SPY": (1.0, 2.0, 0.01)})}
+
+    universe.save_index(index, path)
+
+    assert universe.load_index(path) == index
+    assert universe.load_index(str(tmp_path / "missing.json")) is None
+
+
+def test_load_index_rejects_bad_files(tmp_path, capsys):
+    path = tmp_path / "index.json"
+    path.write_text("{not json", encoding="utf-8")
+
+    assert universe.load_index(str(path)) is None
+    assert "⚠️" in capsys.readouterr().out
+
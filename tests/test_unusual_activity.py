@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from core import unusual_activity as ua
+
+DAY = date(2026, 10, 5)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    ua.reset()
+    ua._loaded = True  # بدون MAZ_UNUSUAL_STORE
+    yield
+    ua.reset()
+
+
+def _chain(volume_scale=1.0, spike=None):
+    contracts = []
+    for i, strike in enumerate(range(90, 111)):
+        for option_type in ("call", "put"):
+            volume = int((100 + 10 * i) * volume_scale)
+            if spike == (option_type, strike):
+                volume *= 40
+            contracts.append({
+                "underlying_symbol": "TEST", "option_type": option_type, "strike": float(strike),
+                "expiration_date": "2026-12-18", "bid": 2.0, "ask": 2.2,
+                "volume": volume, "open_interest": 1000, "underlying_price": 100.0,
+            })
+    return contracts
+
+
+def test_save_and_load_empty_store(tmp_path):
+    path = str(tmp_path / "empty.npz")
+    ua.save(path)
+    ua.load(path)
+    assert len(ua._symbols) == 0
+    assert ua._contracts == {}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    for d in range(4):
+        ua.observe("TEST", _chain(), DAY + timedelta(days=d))
+    table = ua._contracts["TEST"]
+    mean, count = table.mean.copy(), table.count.copy()
+
+    path = str(tmp_path / "store.npz")
+    ua.save(path)
+    ua.reset()
+    ua.load(path)
+
+    loaded = ua._contracts["TEST"]
+    assert loaded.keys == table.keys
+    np.testing.assert_allclose(loaded.mean, mean)
+    np.testing.assert_array_equal(loaded.count, count)
+    assert ua._symbols.keys == ["TEST"]
+
+
+def test_rescans_on_the_same_day_do_not_update_the_baseline():
+    ua.observe("TEST", _chain(), DAY)
+    ua.observe("TEST", _chain(), DAY + timedelta(days=1))
+    count = ua._contracts["TEST"].count.copy()
+    ua.observe("TEST", _chain(volume_scale=3.0), DAY + timedelta(days=1))
+    np.testing.assert_array_equal(ua._contracts["TEST"].count, count)
+
+
+def test_spike_against_history_is_flagged():
+    for d in range(5):
+        ua.observe("TEST", _chain(), DAY + timedelta(days=d))
+    found = ua.observe("TEST", _chain(spike=("call", 100)), DAY + timedelta(days=5))
+
+    assert [(c["option_type"], c["strike"]) for c in found] == [("call", 100.0)]
+    assert found[0]["unusual_z"] >= ua.Z_THRESHOLD
+    assert ua.flag_id(found[0]) in {ua.flag_id(c) for c in ua.flags()}
+    assert ua.format_line(found[0]).startswith("🚨")
+
+
+def test_quiet_chain_is_not_flagged():
+    for d in range(5):
+        assert ua.observe("TEST", _chain(), DAY + timedelta(days=d)) == []
@@ -0,0 +1,123 @@
+import math
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from core import vol_targets
+from core.utils import SL_MULTIPLIER, TP_MULTIPLIER
+
+TODAY = date(2026, 10, 19)
+
+
+def _bs_scalar(spot, strike, t, sigma, is_call):
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    vol_t = sigma * math.sqrt(t)
+    d1 = (math.log(spot / strike) + 0.5 * vol_t ** 2) / vol_t
+    call = spot * cdf(d1) - strike * cdf(d1 - vol_t)
+    return call if is_call else call - spot + strike
+
+
+def test_norm_cdf_accuracy():
+    x = np.linspace(-8, 8, 2001)
+
+    expected = [0.5 * (1 + math.erf(v / math.sqrt(2))) for v in x]
+
+    np.testing.assert_allclose(vol_targets._norm_cdf(x), expected, atol=1.5e-7)
+
+
+def test_black_scholes_price_and_parity():
+    rng = random.Random(2)
+    cases = [(rng.uniform(50, 150), rng.uniform(50, 150), rng.uniform(1, 120) / 365, rng.uniform(0.1, 1.2))
+             for _ in range(200)]
+    spot, strike, t, sigma = (np.array(v) for v in zip(*cases))
+
+    calls, call_delta = vol_targets._bs(spot, strike, t, sigma, np.full(len(spot), True))
+    puts, put_delta = vol_targets._bs(spot, strike, t, sigma, np.full(len(spot), False))
+
+    # خطأ تقريب التوزيع التراكمي (1.5e-7) مضروبًا في S + K
+    np.testing.assert_allclose(calls, [_bs_scalar(*c, True) for c in cases], atol=1.5e-7 * 300)
+    np.testing.assert_allclose(calls - puts, spot - strike, atol=1e-9)
+    np.testing.assert_allclose(call_delta - put_delta, 1.0)
+
+
+def test_barrier_inverts_black_scholes():
+    rng = random.Random(4)
+    n = 300
+    spot = np.full(n, 100.0)
+    strike = np.array([rng.uniform(85, 115) for _ in range(n)])
+    t_end = np.array([rng.uniform(2, 60) / 365 for _ in range(n)])
+    t_mid = t_end + 1 / 365
+    sigma = np.array([rng.uniform(0.15, 0.9) for _ in range(n)])
+    is_call = np.array([rng.random() < 0.5 for _ in range(n)])
+    scale = np.array([rng.uniform(0.9, 1.1) for _ in range(n)])
+    # كما في compute(): الهدف قيمة العقد بعد حركة معروفة في نهاية الأفق، والحل في منتصفه
+    # بدءًا من نفس الحركة
+    move = np.array([rng.uniform(-0.08, 0.08) for _ in range(n)])
+    target = scale * vol_targets._bs(spot * np.exp(move), strike, t_end, sigma, is_call)[0]
+    usable = target > 0.05
+
+    x = vol_targets._barrier(target, spot, strike, t_mid, sigma, is_call, scale, move)
+
+    solved = scale * vol_targets._bs(spot * np.exp(x), strike, t_mid, sigma, is_call)[0]
+    assert usable.sum() > n // 2
+    np.testing.assert_allclose(solved[usable], target[usable], rtol=1e-6)
+
+
+def _contract(**overrides):
+    c = {"option_type": "call", "strike": 100.0, "underlying_price": 100.0, "bid": 2.4, "ask": 2.5,
+         "volume": 500, "open_interest": 2000, "implied_volatility": 0.35,
+         "expiration_date": (TODAY + timedelta(days=14)).isoformat()}
+    c.update(overrides)
+    return c
+
+
+def test_annotate_targets_bracket_entry_with_valid_probabilities():
+    contracts = [_contract(option_type=t, strike=k, expiration_date=(TODAY + timedelta(days=d)).isoformat())
+                 for t in ("call", "put") for k in (95.0, 100.0, 105.0) for d in (1, 7, 30, 90)]
+
+    vol_targets.annotate(contracts, TODAY)
+
+    for c in contracts:
+        assert c["vol_sl"] < c["ask"] < c["vol_tp"]
+        assert c["vol_sl"] >= 0.01
+        assert 0 <= c["p_tp"] <= 1 and 0 <= c["p_sl"] <= 1
+        assert 0 < c["hold_days"] <= vol_targets.MAX_HOLD_DAYS
+
+
+def test_hold_and_move_scale_with_days_to_expiry():
+    weekly, monthly = _contract(expiration_date=(TODAY + timedelta(days=4)).isoformat()), _contract(
+        expiration_date=(TODAY + timedelta(days=40)).isoformat())
+
+    vol_targets.annotate([weekly, monthly], TODAY)
+
+    assert (weekly["hold_days"], monthly["hold_days"]) == (2, vol_targets.MAX_HOLD_DAYS)
+    assert math.isclose(weekly["implied_move"], 0.35 * math.sqrt(2 / 365))
+
+
+@pytest.mark.parametrize("days", [0, 1])
+def test_short_dated_hold_stays_inside_contract_life(days):
+    # SPY 570C قرب الانتهاء: الأفق لا يتخطى الانتهاء فلا تنفجر الأهداف
+    contracts = [_contract(option_type=t, strike=570.0, underlying_price=571.0, bid=1.28, ask=1.32,
+                           implied_volatility=0.12, expiration_date=(TODAY + timedelta(days=days)).isoformat())
+                 for t in ("call", "put")]
+
+    vol_targets.annotate(contracts, TODAY)
+
+    for c in contracts:
+        assert 0 < c["hold_days"] <= max(days, 0.25) / 2
+        assert c["ask"] < c["vol_tp"] <= 3 * c["ask"]
+        assert 0.1 * c["ask"] <= c["vol_sl"] < c["ask"]
+        assert "خلال 1 يوم" not in vol_targets.format_line(c)
+
+
+def test_invalid_contracts_fall_back_to_fixed_multipliers():
+    contracts = [_contract(implied_volatility=0.0), _contract(underlying_price=float("nan")), _contract(ask=0)]
+
+    vol_targets.annotate(contracts, TODAY)
+
+    assert contracts[0]["vol_tp"] == round(2.5 * TP_MULTIPLIER, 2)
+    assert contracts[0]["vol_sl"] == round(2.5 * SL_MULTIPLIER, 2)
+    assert all(c["p_tp"] is None and c["hold_days"] is None for c in contracts)
+    assert vol_targets.format_line(contracts[2]).startswith("TP/SL")
@@ -0,0 +1,266 @@
+"""
+watcher.py
+----------
+مراقب خلفي يعمل باستمرار بدون واجهة:
+
+- يجلب أسعار الرموز بطلبات مجمّعة كل --interval ثانية (فقط أثناء ساعات التداول).
+- يُقيّم المستويات السعرية (core/level_watch) ويرسل الاختراقات والاقترابات.
+- يعيد فحص أفضل 10 عقود كل --top10-every دورة ويرسل التغييرات فقط. الفحص يعمل في خيط منفصل
+  فلا يؤخر دورات المستويات، ولا يبدأ فحص جديد قبل انتهاء السابق.
+- يرسل العقود ذات النشاط غير الاعتيادي (core/unusual_activity) المرصودة في نفس الفحص، مرة واحدة لكل عقد في اليوم.
+- الرموز الأقل سيولة تُسأل بتكرار أقل (مستويات حسب متوسط حجم التداول).
+- يتوقف بأمان عند SIGINT/SIGTERM (فحص أفضل 10 الجاري يُلغى: لا يبدأ سهم جديد) ويحفظ حالته
+  ليستأنف من حيث توقف.
+
+الاستخدام:
+    python watcher.py --interval 60 --trend both
+    python watcher.py --dry-run --ignore-market-hours    # طباعة التنبيهات فقط
+"""
+
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+
+from core import negative_cache, quotes
+from core.expiry_calendar import is_trading_day
+from core.level_watch import LevelWatch, format_level_event
+from core.settings import get_settings
+from data.price_levels import price_levels
+from data.symbols_filtered import filtered_symbols
+
+NEW_YORK = ZoneInfo("America/New_York")
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+# مستويات السيولة: (أقل متوسط حجم يومي، كل كم دورة يُسأل الرمز)
+LIQUIDITY_TIERS = [
+    (5_000_000, 1),
+    (1_000_000, 2),
+    (0, 5),
+]
+
+
+def is_market_open(now: datetime = None) -> bool:
+    now = (now or datetime.now(NEW_YORK)).astimezone(NEW_YORK)
+    return is_trading_day(now.date()) and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def _log(message: str):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+def _contract_id(c: dict) -> str:
+    return f"{c.get('underlying_symbol')}|{c.get('option_type') or c.get('direction')}|{c.get('strike')}|{c.get('expiration_date')}"
+
+
+class Watcher:
+    def __init__(self, interval: float = 60.0, top10_every: int = 10, trends=("up",),
+                 state_path: str = "watcher_state.json", telegram: bool = True,
+                 discord: bool = True, dry_run: bool = False, ignore_market_hours: bool = False):
+        self.interval = interval
+        self.top10_every = top10_every
+        self.trends = trends
+        self.state_path = state_path
+        self.telegram = telegram and not dry_run
+        self.discord = discord and not dry_run
+        self.ignore_market_hours = ignore_market_hours
+
+        self.universe = list(dict.fromkeys(list(price_levels) + list(filtered_symbols)))
+        self.levels = LevelWatch.from_price_levels()
+        self.avg_volume = {}           # symbol -> آخر متوسط حجم معروف (لتحديد مستوى السيولة)
+        self.last_top10 = {}           # trend -> [contract ids]
+        self.sent_unusual = {"day": None, "ids": []}   # عقود النشاط غير الاعتيادي المرسلة اليوم
+        self.cycle_count = 0
+        self._stop = threading.Event()
+        self._state_lock = threading.Lock()   # last_top10 / sent_unusual يعدلهما خيط الفحص
+        self._top10_thread = None
+
+    # ==================== الحالة ====================
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            _log(f"⚠️ تعذّر تحميل الحالة من {self.state_path}: {e}")
+            return
+        self.levels.restore(state.get("levels", {}))
+        self.avg_volume = state.get("avg_volume", {})
+        self.last_top10 = state.get("last_top10", {})
+        self.sent_unusual = state.get("sent_unusual", self.sent_unusual)
+        self.cycle_count = state.get("cycle_count", 0)
+        negative_cache.restore(state.get("negative_cache", {}))
+        _log(f"📂 تم استئناف الحالة (الدورة {self.cycle_count})")
+
+    def save_state(self):
+        with self._state_lock:
+            state = {
+                "saved_at": time.time(),
+                "cycle_count": self.cycle_count,
+                "levels": self.levels.state(),
+                "avg_volume": self.avg_volume,
+                "last_top10": self.last_top10,
+                "sent_unusual": self.sent_unusual,
+                "negative_cache": negative_cache.entries(),
+            }
+            payload = json.dumps(state)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.state_path)
+
+    # ==================== الإرسال ====================
+
+    def _send(self, text: str):
+        _log(text)
+        if self.telegram:
+            from core.alerts import send_telegram_message
+            send_telegram_message(text)
+        if self.discord:
+            from core.discord_alerts import send_discord_message_simple
+            send_discord_message_simple(text)
+
+    # ==================== الدورة ====================
+
+    def _due_symbols(self) -> list:
+        """الرموز المطلوب سؤالها في هذه الدورة حسب مستوى السيولة."""
+        due = []
+        for symbol in self.universe:
+            volume = self.avg_volume.get(symbol)
+            every = 1
+            if volume is not None:
+                every = next(e for threshold, e in LIQUIDITY_TIERS if volume >= threshold)
+            # رموز المستويات تُسأل في كل دورة حتى لا يفوتنا عبور
+            if symbol in price_levels or self.cycle_count % every == 0:
+                due.append(symbol)
+        return due
+
+    def _check_levels(self, batch: dict):
+        prices = {s: q["price"] for s, q in batch.items() if q.get("price")}
+        events = self.levels.update(prices)
+        for event in events:
+            self._send(format_level_event(event))
+
+    def _start_top10(self):
+        """تشغيل فحص أفضل 10 في خيط منفصل (يُتخطى إذا كان الفحص السابق ما زال جاريًا)."""
+        if self._top10_thread is not None and self._top10_thread.is_alive():
+            _log("⏳ فحص أفضل 10 السابق ما زال جاريًا — تخطي هذه الدورة")
+            return
+        self._top10_thread = threading.Thread(target=self._run_top10, name="watcher-top10", daemon=True)
+        self._top10_thread.start()
+
+    def _run_top10(self):
+        try:
+            self._check_top10()
+        except Exception as e:
+            _log(f"💥 خطأ في فحص أفضل 10: {e}")
+
+    def _check_top10(self):
+        from core.top10 import get_top_10_across_symbols, build_top10_alert
+
+        for trend in self.trends:
+            top10 = get_top_10_across_symbols(trend, self.universe, cancel=self._stop)
+            if self._stop.is_set():
+                # فحص ناقص: لا نقارنه بالسابق ولا نحفظه
+                return
+            ids = [_contract_id(c) for c in top10]
+            with self._state_lock:
+                previous = set(self.last_top10.get(trend, []))
+                self.last_top10[trend] = ids
+            new_entries = [c for c, cid in zip(top10, ids) if cid not in previous]
+            if new_entries:
+                self._send(f"🔄 تغيّر أفضل 10 ({trend.upper()}): {len(new_entries)} عقد جديد\n\n"
+                           + build_top10_alert(new_entries))
+        self._check_unusual()
+
+    def _check_unusual(self):
+        from core import unusual_activity
+
+        today = datetime.now(NEW_YORK).date().isoformat()
+        with self._state_lock:
+            if self.sent_unusual.get("day") != today:
+                self.sent_unusual = {"day": today, "ids": []}
+            sent = set(self.sent_unusual["ids"])
+            new_flags = [c for c in unusual_activity.flags() if unusual_activity.flag_id(c) not in sent]
+            self.sent_unusual["ids"].extend(unusual_activity.flag_id(c) for c in new_flags)
+        if new_flags:
+            self._send(unusual_activity.build_alert(new_flags))
+
+    def cycle(self):
+        due = self._due_symbols()
+        batch = quotes.prefetch_quotes(due)
+        for symbol, quote in batch.items():
+            if quote.get("avg_volume"):
+                self.avg_volume[symbol] = quote["avg_volume"]
+        self._check_levels(batch)
+
+        if self.top10_every and self.cycle_count % self.top10_every == 0:
+            self._start_top10()
+
+        self.cycle_count += 1
+        _log(f"✅ الدورة {self.cycle_count}: {len(due)} رمز")
+
+    def run(self):
+        self.load_state()
+        _log(f"🚀 بدء المراقبة: {len(self.universe)} رمز، {self.levels.level_count()} مستوى، كل {self.interval:.0f} ث")
+
+        while not self._stop.is_set():
+            started = time.monotonic()
+            if self.ignore_market_hours or is_market_open():
+                try:
+                    self.cycle()
+                    self.save_state()
+                except Exception as e:
+                    _log(f"💥 خطأ في الدورة: {e}")
+            else:
+                _log("💤 السوق مغلق — لا استعلام")
+            # الانتظار قابل للمقاطعة فورًا عند طلب الإيقاف
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+        if self._top10_thread is not None and self._top10_thread.is_alive():
+            _log("⏳ انتظار انتهاء الأسهم الجارية في فحص أفضل 10...")
+            self._top10_thread.join()
+        self.save_state()
+        _log("🛑 تم الإيقاف وحفظ الحالة")
+
+    def stop(self, *_):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مراقب خلفي للمستويات السعرية وأفضل 10 عقود")
+    parser.add_argument("--interval", type=float, default=get_settings().watcher_interval,
+                        help="ثوانٍ بين الدورات")
+    parser.add_argument("--top10-every", type=int, default=10, help="فحص أفضل 10 كل N دورة (0 للتعطيل)")
+    parser.add_argument("--trend", choices=["up", "down", "both"], default="up")
+    parser.add_argument("--state", default="watcher_state.json", help="ملف حفظ الحالة")
+    parser.add_argument("--no-telegram", action="store_true")
+    parser.add_argument("--no-discord", action="store_true")
+    parser.add_argument("--dry-run", action="store_true", help="طباعة التنبيهات بدون إرسال")
+    parser.add_argument("--ignore-market-hours", action="store_true")
+    args = parser.parse_args()
+
+    watcher = Watcher(
+        interval=args.interval,
+        top10_every=args.top10_every,
+        trends=("up", "down") if args.trend == "both" else (args.trend,),
+        state_path=args.state,
+        telegram=not args.no_telegram,
+        discord=not args.no_discord,
+        dry_run=args.dry_run,
+        ignore_market_hours=args.ignore_market_hours,
+    )
+    signal.signal(signal.SIGINT, watcher.stop)
+    signal.signal(signal.SIGTERM, watcher.stop)
+    watcher.run()
+
+
+if __name__ == "__main__":
+    main()